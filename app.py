@@ -4,18 +4,34 @@ A Flask-based chatbot with voice assistance using Gemini API
 """
 
 import os
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, Response, stream_with_context, abort
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 from dotenv import load_dotenv
+import json
 import logging
 from datetime import datetime
 
 # Import custom modules
 from src.api.gemini_client import GeminiClient
+from src.api.batch import BatchSessionResolver, MAX_OWNED_SESSIONS, parse_parallelism, prepare_batch_items
 from src.voice.speech_processor import SpeechProcessor
+from src.voice.stt_backends import ROUTING_RULES
+from src.voice.streaming import serve_voice_stream
+from src.voice.audio_decoder import AudioTooLongError
+from src.voice.transcoder import TranscoderBusyError
+from src.voice.tts_streaming import TTSStreamError
+from src.voice.upload_validation import UploadTooLargeError, max_upload_bytes, read_upload
 from src.database.db_manager import DatabaseManager
 from src.models.chat_session import ChatSession
 from src.utils.logger import setup_logger
+from src.utils.disk_janitor import create_disk_janitor
+
+# WebSocket support for streaming voice input is optional
+try:
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
 
 # Load environment variables
 load_dotenv()
@@ -34,6 +50,9 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', f'sqlite:///{os.path.join(app.instance_path, "chatbot.db")}')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
+    # Werkzeug rejects larger request bodies with 413 (audio cap plus multipart overhead)
+    app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', max_upload_bytes() + 64 * 1024))
+    
     # Print the database URI for debugging
     print(f"Database URI: {app.config['SQLALCHEMY_DATABASE_URI']}")
     
@@ -45,9 +64,14 @@ def create_app():
     
     # Initialize components
     gemini_client = GeminiClient()
-    speech_processor = SpeechProcessor()
+    speech_processor = SpeechProcessor(server_mode=True)
     db_manager = DatabaseManager(app)
     
+    # Remove old generated audio in the background
+    disk_janitor = create_disk_janitor()
+    if disk_janitor:
+        disk_janitor.start()
+    
     @app.route('/')
     def index():
         """Main page"""
@@ -56,8 +80,9 @@ def create_app():
     @app.route('/api/chat', methods=['POST'])
     def chat():
         """Handle text chat requests"""
+        # Body errors (too large, malformed) go to the error handlers
+        data = request.get_json()
         try:
-            data = request.get_json()
             user_message = data.get('message', '')
             
             if not user_message:
@@ -74,7 +99,7 @@ def create_app():
             db_manager.save_message(session_id, 'user', user_message)
             
             # Get response from Gemini
-            bot_response = gemini_client.get_response(user_message)
+            bot_response = gemini_client.get_response(user_message, session_id=session_id)
             
             # Save bot response
             db_manager.save_message(session_id, 'bot', bot_response)
@@ -91,6 +116,144 @@ def create_app():
             logger.error(f"Error in chat endpoint: {str(e)}")
             return jsonify({'error': 'Internal server error'}), 500
     
+    @app.route('/api/chat/stream', methods=['POST'])
+    def chat_stream():
+        """Handle text chat requests, streaming the reply as Server-Sent Events"""
+        # Body errors (too large, malformed) go to the error handlers
+        data = request.get_json()
+        try:
+            user_message = data.get('message', '')
+            
+            if not user_message:
+                return jsonify({'error': 'Message is required'}), 400
+            
+            # Get or create session
+            session_id = session.get('session_id')
+            if not session_id:
+                chat_session = db_manager.create_session()
+                session['session_id'] = chat_session.id
+                session_id = chat_session.id
+            
+            # Save user message
+            db_manager.save_message(session_id, 'user', user_message)
+            
+        except Exception as e:
+            logger.error(f"Error in chat stream endpoint: {str(e)}")
+            return jsonify({'error': 'Internal server error'}), 500
+        
+        def generate():
+            chunks = []
+            try:
+                for chunk in gemini_client.stream_response(user_message, session_id=session_id):
+                    chunks.append(chunk)
+                    yield f"data: {json.dumps({'text': chunk})}\n\n"
+                
+                # Save the full bot response once the stream has finished
+                bot_response = "".join(chunks).strip()
+                db_manager.save_message(session_id, 'bot', bot_response)
+                
+                logger.info(f"Chat session {session_id}: Streamed response")
+                
+                done = {
+                    'response': bot_response,
+                    'session_id': session_id,
+                    'timestamp': datetime.now().isoformat()
+                }
+                yield f"event: done\ndata: {json.dumps(done)}\n\n"
+                
+            except Exception as e:
+                logger.error(f"Error while streaming chat response: {str(e)}")
+                yield f"event: error\ndata: {json.dumps({'error': 'Internal server error'})}\n\n"
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    
+    @app.route('/api/chat/batch', methods=['POST'])
+    def chat_batch():
+        """Handle many chat messages in one request"""
+        # Body errors (too large, malformed) go to the error handlers
+        data = request.get_json() or {}
+        try:
+            items = data.get('items')
+            
+            if not isinstance(items, list) or not items:
+                return jsonify({'error': 'A non-empty list of items is required'}), 400
+            
+            max_items = int(os.getenv('BATCH_MAX_ITEMS', 500))
+            if len(items) > max_items:
+                return jsonify({'error': f'Too many items (max {max_items})'}), 400
+            
+            try:
+                parallelism = parse_parallelism(
+                    data.get('parallelism'),
+                    int(os.getenv('BATCH_PARALLELISM', 8)),
+                    int(os.getenv('BATCH_MAX_PARALLELISM', 32))
+                )
+            except ValueError:
+                return jsonify({'error': 'parallelism must be an integer'}), 400
+            
+            def default_session_id():
+                # Items without a session id use the caller's session
+                if not session.get('session_id'):
+                    session['session_id'] = db_manager.create_session().id
+                return session['session_id']
+            
+            # Items may only use the caller's sessions; unknown ids get new sessions
+            owned_session_ids = [session.get('session_id')] + session.get('batch_session_ids', [])
+            resolver = BatchSessionResolver(db_manager, owned_session_ids, default_session_id)
+            results, pending = prepare_batch_items(items, resolver)
+            if resolver.created:
+                session['batch_session_ids'] = (session.get('batch_session_ids', []) + resolver.created)[-MAX_OWNED_SESSIONS:]
+            
+            # Fan out to Gemini with bounded parallelism
+            responses = gemini_client.get_responses_batch(
+                [(item.session_id, item.message) for item in pending],
+                parallelism=parallelism
+            )
+            
+            messages = []
+            for item, bot_response in zip(pending, responses):
+                messages.append((item.session_id, 'user', item.message))
+                messages.append((item.session_id, 'bot', bot_response))
+                results[item.index] = {
+                    'index': item.index,
+                    'session_id': item.session_id,
+                    'response': bot_response
+                }
+            
+            # Persist all messages in one transaction; the replies are returned even if that fails
+            saved = True
+            if messages:
+                try:
+                    db_manager.save_messages(messages)
+                except Exception as e:
+                    logger.error(f"Could not save chat batch messages: {str(e)}")
+                    saved = False
+            
+            logger.info(f"Chat batch: processed {len(pending)} of {len(items)} items")
+            
+            return jsonify({
+                'results': results,
+                'saved': saved,
+                'timestamp': datetime.now().isoformat()
+            })
+            
+        except Exception as e:
+            logger.error(f"Error in chat batch endpoint: {str(e)}")
+            return jsonify({'error': 'Internal server error'}), 500
+    
+    @app.route('/api/chat/stats')
+    def chat_stats():
+        """Chat metrics: response cache, request coalescing, retries and circuit breaker"""
+        try:
+            return jsonify(gemini_client.get_stats())
+        except Exception as e:
+            logger.error(f"Error getting chat stats: {str(e)}")
+            return jsonify({'error': 'Internal server error'}), 500
+    
     @app.route('/api/voice/record', methods=['POST'])
     def record_voice():
         """Handle voice recording and transcription"""
@@ -101,39 +264,104 @@ def create_app():
             if not audio_file:
                 return jsonify({'error': 'Audio file is required'}), 400
             
-            # Save audio file temporarily with proper extension
-            timestamp = datetime.now().timestamp()
+            # Read in chunks, stopping as soon as the size limit is passed
+            audio_bytes = read_upload(audio_file.stream)
+            
             filename = audio_file.filename or 'recording.webm'
             file_ext = filename.split('.')[-1] if '.' in filename else 'webm'
-            audio_path = f"audio_files/temp_{timestamp}.{file_ext}"
             
-            # Ensure audio_files directory exists
-            os.makedirs('audio_files', exist_ok=True)
-            audio_file.save(audio_path)
+            # Optional per-request engine routing (e.g. local_first for short commands)
+            routing = request.form.get('stt_routing')
+            if routing and routing not in ROUTING_RULES:
+                return jsonify({'error': f"Invalid stt_routing (use one of: {', '.join(ROUTING_RULES)})"}), 400
             
-            logger.info(f"Saved audio file: {audio_path} (size: {os.path.getsize(audio_path)} bytes)")
+            # Transcribe audio to text in memory (no temporary files)
+            result = speech_processor.transcribe_bytes(audio_bytes, file_ext, routing)
+            transcribed_text = result['text']
             
-            # Transcribe audio to text
-            transcribed_text = speech_processor.speech_to_text(audio_path)
+            if result.get('speech_detected') is False:
+                return jsonify({
+                    'transcription': None,
+                    'speech_detected': False,
+                    'error': 'No speech detected. Please try again.',
+                    'success': False
+                })
             
-            # Clean up temporary file
-            if os.path.exists(audio_path):
-                os.remove(audio_path)
+            logger.info(f"Transcribed voice upload ({len(audio_bytes)} bytes)")
             
             return jsonify({
                 'transcription': transcribed_text,
+                'cached': result.get('cached', False),
                 'success': True
             })
             
+        except (UploadTooLargeError, RequestEntityTooLarge):
+            abort(413)
+        except AudioTooLongError as e:
+            logger.info(f"Voice upload rejected: {str(e)}")
+            return jsonify({'error': f'Audio too long (max {e.limit:g} seconds)'}), 400
+        except TranscoderBusyError as e:
+            logger.warning(f"Voice upload rejected, transcoding queue full (retry after {e.retry_after}s)")
+            response = jsonify({'error': 'Server busy, please retry shortly', 'retry_after': e.retry_after})
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response, 503
         except Exception as e:
             logger.error(f"Error in voice recording: {str(e)}")
             return jsonify({'error': 'Voice processing failed'}), 500
     
+    @app.route('/api/voice/speak/stream')
+    def text_to_speech_stream():
+        """Stream speech as MP3, sentence by sentence, so playback can start early"""
+        text = request.args.get('text', '').strip()
+        lang = request.args.get('lang', 'en')
+        
+        if not text:
+            return jsonify({'error': 'Text is required'}), 400
+        
+        try:
+            # Wait for the first segment so a total failure is still a JSON error
+            audio = speech_processor.text_to_speech_stream(text, lang)
+        except TTSStreamError as e:
+            logger.error(f"Streaming text-to-speech failed: {str(e)}")
+            return jsonify({'error': 'Failed to generate audio'}), 500
+        
+        response = Response(stream_with_context(audio), mimetype='audio/mpeg')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+    
+    @app.route('/api/voice/stats')
+    def voice_stats():
+        """Voice pipeline metrics: transcoding queue, transcription cache and recognition"""
+        return jsonify({
+            'transcoder': speech_processor.get_transcoder_stats(),
+            'transcription_cache': speech_processor.get_transcription_cache_stats(),
+            'tts_cache': speech_processor.get_tts_cache_stats(),
+            'recognition': speech_processor.get_recognition_stats(),
+            'startup': speech_processor.get_startup_stats(),
+            'disk': disk_janitor.stats() if disk_janitor else {'enabled': False}
+        })
+    
+    if Sock is not None:
+        sock = Sock(app)
+        
+        @sock.route('/api/voice/stream')
+        def voice_stream(ws):
+            """Stream voice input over a WebSocket, transcribing each utterance as it ends"""
+            routing = request.args.get('stt_routing')
+            if routing and routing not in ROUTING_RULES:
+                ws.send(json.dumps({'type': 'error', 'error': 'Invalid stt_routing'}))
+                return
+            serve_voice_stream(ws, speech_processor, routing)
+    else:
+        logger.info("flask-sock not installed, streaming voice input disabled")
+    
     @app.route('/api/voice/speak', methods=['POST'])
     def text_to_speech():
         """Convert text to speech"""
+        # Body errors (too large, malformed) go to the error handlers
+        data = request.get_json()
         try:
-            data = request.get_json()
             text = data.get('text', '')
             
             if not text:
@@ -144,7 +372,7 @@ def create_app():
             
             if audio_path:
                 return jsonify({
-                    'audio_url': f'/static/audio/{os.path.basename(audio_path)}',
+                    'audio_url': '/' + os.path.relpath(audio_path).replace(os.sep, '/'),
                     'success': True
                 })
             else:
@@ -183,6 +411,10 @@ def create_app():
             'version': '1.0.0'
         })
     
+    @app.errorhandler(400)
+    def bad_request(error):
+        return jsonify({'error': 'Invalid request body'}), 400
+    
     @app.errorhandler(404)
     def not_found(error):
         return jsonify({'error': 'Endpoint not found'}), 404
@@ -191,6 +423,18 @@ def create_app():
     def internal_error(error):
         return jsonify({'error': 'Internal server error'}), 500
     
+    @app.errorhandler(413)
+    def request_entity_too_large(error):
+        """Bodies over MAX_CONTENT_LENGTH (raised by Werkzeug as they are read) and audio over AUDIO_MAX_BYTES"""
+        if request.path == '/api/voice/record':
+            return jsonify({'error': f'Audio file too large (max {max_upload_bytes() // (1024 * 1024)}MB)'}), 413
+        return jsonify({'error': 'Request entity too large'}), 413
+    
+    @app.errorhandler(415)
+    def unsupported_media_type(error):
+        """JSON endpoints called without a JSON Content-Type (raised by get_json)"""
+        return jsonify({'error': 'Request body must be JSON (Content-Type: application/json)'}), 415
+    
     return app
 
 if __name__ == '__main__':
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Chat Throughput Benchmark
+Measures /api/chat throughput and tail latency against the local stub LLM backend
+"""
+import sys
+import os
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Run fully offline unless a backend is chosen explicitly
+os.environ.setdefault('LLM_BACKEND', 'stub')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+
+
+def percentile(values, pct):
+    """Get a percentile from a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_benchmark(requests_total, concurrency, sessions):
+    """Send chat requests concurrently and report latency statistics"""
+    from app import create_app
+    from src.database.db_manager import db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+
+    # One test client per simulated user keeps session cookies separate
+    local = threading.local()
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def send(index):
+        clients = local.__dict__.setdefault('clients', {})
+        user = index % sessions
+        if user not in clients:
+            clients[user] = app.test_client()
+
+        start = time.perf_counter()
+        response = clients[user].post('/api/chat', json={'message': f"benchmark message {index}"})
+        elapsed = time.perf_counter() - start
+
+        with lock:
+            latencies.append(elapsed)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+
+    print(f"🚀 Sending {requests_total} requests ({concurrency} concurrent, {sessions} sessions) "
+          f"to the {os.environ['LLM_BACKEND']} backend...")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, range(requests_total)))
+    wall_time = time.perf_counter() - start
+
+    print(f"\n📊 Results")
+    print("=" * 50)
+    print(f"Throughput: {requests_total / wall_time:.1f} req/s ({wall_time:.2f}s total)")
+    print(f"Latency p50: {percentile(latencies, 50) * 1000:.1f} ms")
+    print(f"Latency p95: {percentile(latencies, 95) * 1000:.1f} ms")
+    print(f"Latency p99: {percentile(latencies, 99) * 1000:.1f} ms")
+    print(f"Latency max: {max(latencies) * 1000:.1f} ms")
+    print(f"Errors: {len(errors)}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the /api/chat endpoint')
+    parser.add_argument('-n', '--requests', type=int, default=500, help='Total requests to send')
+    parser.add_argument('-c', '--concurrency', type=int, default=32, help='Concurrent requests')
+    parser.add_argument('-s', '--sessions', type=int, default=100, help='Distinct chat sessions')
+    args = parser.parse_args()
+
+    run_benchmark(args.requests, args.concurrency, args.sessions)
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Speech Processor Startup Benchmark
+Compares SpeechProcessor initialization time in server (headless) and device mode
+"""
+import sys
+import os
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(server_mode, runs):
+    """Construct the processor several times and return per-run seconds"""
+    from src.voice.speech_processor import SpeechProcessor
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        processor = SpeechProcessor(server_mode=server_mode)
+        timings.append(time.perf_counter() - start)
+        processor.cleanup()
+    return timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark SpeechProcessor startup')
+    parser.add_argument('-n', '--runs', type=int, default=3, help='Initializations per mode')
+    parser.add_argument('--server-only', action='store_true', help='Skip device mode (no audio hardware access)')
+    args = parser.parse_args()
+
+    # Importing the module is part of every worker's startup cost
+    start = time.perf_counter()
+    import src.voice.speech_processor  # noqa: F401
+    print(f"📦 Module import: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    modes = [True] if args.server_only else [True, False]
+    for server_mode in modes:
+        timings = measure(server_mode, args.runs)
+        label = "Server mode" if server_mode else "Device mode"
+        print(f"⏱️  {label}: first {timings[0] * 1000:.1f} ms, "
+              f"best {min(timings) * 1000:.1f} ms over {len(timings)} runs")
@@ -0,0 +1,309 @@
+"""
+LLM Backends
+Pluggable model backends used by the Gemini client
+"""
+
+import os
+import math
+import random
+import asyncio
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class LLMBackendError(Exception):
+    """Error raised by a backend call"""
+
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class LLMChat(ABC):
+    """
+    Base class for native multi-turn chat sessions
+
+    History is a list of (role, text) turns where role is "user" or "model".
+    """
+
+    @abstractmethod
+    async def send(self, message: str, params: Dict[str, Any]) -> str:
+        """Send a message and return the reply; the turn is kept only on success"""
+
+    @abstractmethod
+    async def stream(self, message: str, params: Dict[str, Any]) -> AsyncIterator[str]:
+        """Send a message and stream the reply as text chunks"""
+
+    @abstractmethod
+    def trim(self, keep_turns: int, pinned_turns: int = 0):
+        """
+        Drop old turns from the chat history
+
+        Args:
+            keep_turns: Most recent turns to keep
+            pinned_turns: Leading turns (such as instructions) that are always kept
+        """
+
+    @abstractmethod
+    def history_length(self) -> int:
+        """Number of turns in the chat history"""
+
+
+class LLMBackend(ABC):
+    """Base class for model backends"""
+
+    name = 'base'
+    model_name = 'unknown'
+
+    @abstractmethod
+    async def generate(self, prompt: str, params: Dict[str, Any]) -> str:
+        """
+        Generate a complete reply
+
+        Args:
+            prompt: Full prompt text
+            params: Generation parameters (max_output_tokens, temperature)
+
+        Returns:
+            Reply text
+        """
+
+    @abstractmethod
+    async def stream(self, prompt: str, params: Dict[str, Any]) -> AsyncIterator[str]:
+        """Generate a reply as a stream of text chunks"""
+
+    @abstractmethod
+    def start_chat(self, history: List[Tuple[str, str]]) -> LLMChat:
+        """Start a native chat session seeded with (role, text) turns"""
+
+
+class GeminiChat(LLMChat):
+    """Native Gemini chat session (ChatSession from start_chat)"""
+
+    def __init__(self, backend: 'GeminiBackend', history: List[Tuple[str, str]]):
+        self.backend = backend
+        self.chat = backend.model.start_chat(
+            history=[{'role': role, 'parts': [text]} for role, text in history]
+        )
+
+    async def send(self, message: str, params: Dict[str, Any]) -> str:
+        response = await self.chat.send_message_async(
+            message,
+            generation_config=self.backend._generation_config(params)
+        )
+        return response.text.strip()
+
+    async def stream(self, message: str, params: Dict[str, Any]) -> AsyncIterator[str]:
+        response = await self.chat.send_message_async(
+            message,
+            generation_config=self.backend._generation_config(params),
+            stream=True
+        )
+        async for chunk in response:
+            text = chunk.text
+            if text:
+                yield text
+
+    def trim(self, keep_turns: int, pinned_turns: int = 0):
+        history = self.chat.history
+        if len(history) > pinned_turns + keep_turns:
+            self.chat.history = history[:pinned_turns] + history[len(history) - keep_turns:]
+
+    def history_length(self) -> int:
+        return len(self.chat.history)
+
+
+class GeminiBackend(LLMBackend):
+    """Backend calling Google's Gemini API"""
+
+    name = 'gemini'
+
+    def __init__(self):
+        """Initialize the Gemini backend"""
+        import google.generativeai as genai
+
+        self.genai = genai
+        self.api_key = os.getenv('GEMINI_API_KEY')
+        self.model_name = os.getenv('GEMINI_MODEL', 'gemini-pro')
+
+        if not self.api_key:
+            raise ValueError("GEMINI_API_KEY environment variable is required")
+
+        # Configure the API
+        genai.configure(api_key=self.api_key)
+
+        # Initialize the model; its async transport is created on first use and reused
+        self.model = genai.GenerativeModel(self.model_name)
+
+    def _generation_config(self, params: Dict[str, Any]):
+        return self.genai.types.GenerationConfig(**params) if params else None
+
+    def start_chat(self, history: List[Tuple[str, str]]) -> LLMChat:
+        return GeminiChat(self, history)
+
+    async def generate(self, prompt: str, params: Dict[str, Any]) -> str:
+        response = await self.model.generate_content_async(
+            prompt,
+            generation_config=self._generation_config(params)
+        )
+        return response.text.strip()
+
+    async def stream(self, prompt: str, params: Dict[str, Any]) -> AsyncIterator[str]:
+        response = await self.model.generate_content_async(
+            prompt,
+            generation_config=self._generation_config(params),
+            stream=True
+        )
+        async for chunk in response:
+            text = chunk.text
+            if text:
+                yield text
+
+
+class StubChat(LLMChat):
+    """Chat session for the stub backend, flattening turns into a prompt"""
+
+    def __init__(self, backend: 'StubBackend', history: List[Tuple[str, str]]):
+        self.backend = backend
+        self.history = list(history)
+
+    def _prompt(self, message: str) -> str:
+        lines = [f"{'User' if role == 'user' else 'Assistant'}: {text}" for role, text in self.history]
+        lines.append(f"User: {message}")
+        return "\n" + "\n".join(lines) + "\nAssistant:"
+
+    async def send(self, message: str, params: Dict[str, Any]) -> str:
+        reply = await self.backend.generate(self._prompt(message), params)
+        self.history += [('user', message), ('model', reply)]
+        return reply
+
+    async def stream(self, message: str, params: Dict[str, Any]) -> AsyncIterator[str]:
+        chunks = []
+        async for chunk in self.backend.stream(self._prompt(message), params):
+            chunks.append(chunk)
+            yield chunk
+        self.history += [('user', message), ('model', "".join(chunks))]
+
+    def trim(self, keep_turns: int, pinned_turns: int = 0):
+        if len(self.history) > pinned_turns + keep_turns:
+            self.history = self.history[:pinned_turns] + self.history[len(self.history) - keep_turns:]
+
+    def history_length(self) -> int:
+        return len(self.history)
+
+
+class StubBackend(LLMBackend):
+    """
+    Deterministic local backend for offline load testing
+
+    Replies are derived from the prompt, and timing follows a configurable
+    latency distribution for the first token plus a fixed token rate, with an
+    optional failure rate. Given the same seed and request sequence, runs are
+    reproducible.
+    """
+
+    name = 'stub'
+    model_name = 'stub'
+
+    DISTRIBUTIONS = ('fixed', 'uniform', 'exponential', 'lognormal')
+
+    def __init__(self, latency_ms: Optional[float] = None, distribution: Optional[str] = None,
+                 tokens_per_second: Optional[float] = None, failure_rate: Optional[float] = None,
+                 reply_tokens: Optional[int] = None, seed: Optional[int] = None):
+        """
+        Initialize the stub backend
+
+        Args:
+            latency_ms: Mean time to first token (default: STUB_LATENCY_MS or 200)
+            distribution: fixed, uniform, exponential or lognormal (default: STUB_LATENCY_DISTRIBUTION or lognormal)
+            tokens_per_second: Generation rate after the first token (default: STUB_TOKENS_PER_SECOND or 50)
+            failure_rate: Fraction of calls that fail (default: STUB_FAILURE_RATE or 0)
+            reply_tokens: Words per reply before max_output_tokens applies (default: STUB_REPLY_TOKENS or 40)
+            seed: Random seed (default: STUB_SEED or 0)
+        """
+        self.latency_ms = latency_ms if latency_ms is not None else float(os.getenv('STUB_LATENCY_MS', 200))
+        self.distribution = (distribution or os.getenv('STUB_LATENCY_DISTRIBUTION', 'lognormal')).lower()
+        self.latency_sigma = float(os.getenv('STUB_LATENCY_SIGMA', 0.5))
+        self.tokens_per_second = tokens_per_second or float(os.getenv('STUB_TOKENS_PER_SECOND', 50))
+        self.failure_rate = failure_rate if failure_rate is not None else float(os.getenv('STUB_FAILURE_RATE', 0))
+        self.reply_tokens = reply_tokens or int(os.getenv('STUB_REPLY_TOKENS', 40))
+
+        if self.distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown stub latency distribution: {self.distribution}")
+
+        self._random = random.Random(seed if seed is not None else int(os.getenv('STUB_SEED', 0)))
+
+        logger.info(f"Stub LLM backend: {self.distribution} latency ~{self.latency_ms}ms, "
+                    f"{self.tokens_per_second} tokens/s, failure rate {self.failure_rate}")
+
+    def _first_token_delay(self) -> float:
+        """Sample the time to first token in seconds"""
+        mean = self.latency_ms / 1000
+        if self.distribution == 'fixed':
+            return mean
+        if self.distribution == 'uniform':
+            return self._random.uniform(0, 2 * mean)
+        if self.distribution == 'exponential':
+            return self._random.expovariate(1 / mean) if mean > 0 else 0.0
+
+        # Lognormal with the configured mean
+        sigma = self.latency_sigma
+        mu = math.log(mean) - sigma ** 2 / 2 if mean > 0 else 0.0
+        return self._random.lognormvariate(mu, sigma) if mean > 0 else 0.0
+
+    def _reply_words(self, prompt: str, params: Dict[str, Any]) -> list:
+        """Build a deterministic reply for a prompt"""
+        last_line = prompt.rstrip().rsplit("\nUser: ", 1)[-1].split("\n", 1)[0]
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+        words = f"Stub reply {digest[:8]} to: {last_line}".split()
+        filler = "lorem ipsum dolor sit amet consectetur adipiscing elit".split()
+        while len(words) < self.reply_tokens:
+            words.append(filler[len(words) % len(filler)])
+
+        limit = params.get('max_output_tokens') or len(words)
+        return words[:min(len(words), self.reply_tokens, limit)]
+
+    def _maybe_fail(self):
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            raise LLMBackendError("Stub backend injected failure", retryable=True)
+
+    async def generate(self, prompt: str, params: Dict[str, Any]) -> str:
+        words = self._reply_words(prompt, params)
+        await asyncio.sleep(self._first_token_delay() + len(words) / self.tokens_per_second)
+        self._maybe_fail()
+        return " ".join(words)
+
+    async def stream(self, prompt: str, params: Dict[str, Any]) -> AsyncIterator[str]:
+        words = self._reply_words(prompt, params)
+        await asyncio.sleep(self._first_token_delay())
+        self._maybe_fail()
+
+        for index, word in enumerate(words):
+            if index:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            yield word if index == 0 else f" {word}"
+
+    def start_chat(self, history: List[Tuple[str, str]]) -> LLMChat:
+        return StubChat(self, history)
+
+
+def create_backend(name: Optional[str] = None) -> LLMBackend:
+    """
+    Create the backend selected by LLM_BACKEND ("gemini" or "stub")
+
+    Args:
+        name: Backend name overriding the environment
+    """
+    name = (name or os.getenv('LLM_BACKEND', 'gemini')).lower()
+
+    if name == 'gemini':
+        return GeminiBackend()
+    if name == 'stub':
+        return StubBackend()
+
+    raise ValueError(f"Unknown LLM backend: {name}")
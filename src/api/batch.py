@@ -0,0 +1,151 @@
+"""
+Chat Batch Requests
+Validates the items of a chat batch and resolves the session each one belongs to
+"""
+
+import logging
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Length of ChatSession.id / Message.session_id
+SESSION_ID_MAX_LENGTH = 36
+
+# Sessions created by batches that a browser session keeps access to
+MAX_OWNED_SESSIONS = 32
+
+# Longest chat message accepted, as for a single /api/chat request
+MESSAGE_MAX_LENGTH = 1000
+
+
+class BatchItem(NamedTuple):
+    """A batch item ready to be answered"""
+    index: int
+    session_id: str
+    message: str
+
+
+def parse_parallelism(value: Any, default: int, maximum: int) -> int:
+    """
+    Read the requested batch parallelism
+
+    Args:
+        value: Value sent by the client (None or empty uses the default)
+        default: Parallelism when none is requested
+        maximum: Highest parallelism allowed
+
+    Returns:
+        Parallelism between 1 and ``maximum``
+
+    Raises:
+        ValueError: If the value is not an integer
+    """
+    if value is None or value == '':
+        parallelism = default
+    elif isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError("parallelism must be an integer")
+    else:
+        parallelism = int(value)
+    return max(1, min(parallelism, maximum))
+
+
+class BatchSessionResolver:
+    """
+    Maps the session ids sent with batch items to sessions the caller may use
+
+    An item may name its own session or one created by an earlier batch of
+    the same browser session. Any other id that exists belongs to someone
+    else and is refused. An id that does not exist is a label: the first
+    item using it gets a new session, and the other items with that label
+    join it. Items without an id use the caller's own session.
+    """
+
+    def __init__(self, db_manager, owned_session_ids: Iterable[str], default_session_id: Callable[[], str]):
+        """
+        Initialize the resolver
+
+        Args:
+            db_manager: DatabaseManager used to look up and create sessions
+            owned_session_ids: Sessions the caller already owns
+            default_session_id: Returns the caller's session id, creating it if needed
+        """
+        self.db_manager = db_manager
+        self.owned = {session_id for session_id in owned_session_ids if session_id}
+        self.default_session_id = default_session_id
+        self.created: List[str] = []
+        self._labels: Dict[str, str] = {}
+        self._known: Dict[str, bool] = {}
+
+    def _exists(self, session_id: str) -> bool:
+        if session_id not in self._known:
+            self._known[session_id] = self.db_manager.get_session(session_id) is not None
+        return self._known[session_id]
+
+    def resolve(self, session_id: Any) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Resolve the session id of one item
+
+        Returns:
+            Tuple of (session id to use, or None; error message, or None)
+        """
+        if session_id is None or session_id == '':
+            return self.default_session_id(), None
+
+        if not isinstance(session_id, str) or len(session_id) > SESSION_ID_MAX_LENGTH:
+            return None, f'session_id must be a string of at most {SESSION_ID_MAX_LENGTH} characters'
+
+        if session_id in self._labels:
+            return self._labels[session_id], None
+
+        if self._exists(session_id):
+            if session_id in self.owned:
+                return session_id, None
+            return None, 'Unknown session_id'
+
+        try:
+            chat_session = self.db_manager.create_session()
+        except Exception as e:
+            logger.error(f"Could not create batch session: {str(e)}")
+            return None, 'Could not create session'
+
+        self._labels[session_id] = chat_session.id
+        self.owned.add(chat_session.id)
+        self.created.append(chat_session.id)
+        return chat_session.id, None
+
+
+def prepare_batch_items(items: List[Any], resolver: BatchSessionResolver,
+                        max_message_length: int = MESSAGE_MAX_LENGTH) -> Tuple[List[Optional[Dict[str, Any]]], List[BatchItem]]:
+    """
+    Validate batch items and resolve their sessions
+
+    Args:
+        items: Items from the request body
+        resolver: Session resolver for the caller
+        max_message_length: Longest message accepted
+
+    Returns:
+        Tuple of (results with an error entry for every rejected item and
+        None elsewhere; items to answer, in order)
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    pending: List[BatchItem] = []
+
+    for index, item in enumerate(items):
+        item = item if isinstance(item, dict) else {}
+        message = str(item.get('message') or '').strip()
+        if not message:
+            results[index] = {'index': index, 'error': 'Message is required'}
+            continue
+        if len(message) > max_message_length:
+            results[index] = {'index': index, 'error': f'Message too long (max {max_message_length} characters)'}
+            continue
+
+        session_id, error = resolver.resolve(item.get('session_id'))
+        if error:
+            results[index] = {'index': index, 'error': error}
+            continue
+
+        pending.append(BatchItem(index, session_id, message))
+
+    return results, pending
@@ -0,0 +1,169 @@
+"""
+Context Builder
+Builds token-budgeted prompts, folding older turns into a rolling summary
+"""
+
+import os
+import json
+import hashlib
+import logging
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+from src.api.context_store import ConversationContextStore, DEFAULT_SESSION_ID
+from src.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+BASE_PROMPT = """You are a helpful voice assistant chatbot. You provide clear, concise, and friendly responses.
+Keep your responses conversational and natural for voice interaction.
+"""
+
+# Summarizer callback: (previous summary, turns to fold) -> new summary
+Summarizer = Callable[[Optional[str], List[Tuple[str, str]]], Awaitable[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (about four characters per token for English)"""
+    return len(text) // 4 + 1
+
+
+def format_turns(turns: List[Tuple[str, str]]) -> str:
+    """Render (role, text) records as "Role: text" lines"""
+    return "\n".join(f"{role}: {text}" for role, text in turns)
+
+
+class ContextBuilder:
+    """
+    Builds conversation context within a token budget
+
+    Recent turns are included newest-first until the budget is spent. Once a
+    session's unsummarized history outgrows the budget, its oldest turns are
+    folded, one chunk at a time, into a rolling summary kept in the context
+    store, so prompt size stays flat however long the conversation runs.
+    """
+
+    def __init__(self, context_store: ConversationContextStore, token_budget: Optional[int] = None,
+                 fold_chunk_turns: Optional[int] = None):
+        """
+        Initialize the context builder
+
+        Args:
+            context_store: Store holding per-session turns and summaries
+            token_budget: Tokens allowed for history (default: CONTEXT_TOKEN_BUDGET or 1500)
+            fold_chunk_turns: Turns folded into the summary at once (default: CONTEXT_FOLD_CHUNK_TURNS or 4)
+        """
+        self.context_store = context_store
+        self.token_budget = token_budget or int(os.getenv('CONTEXT_TOKEN_BUDGET', 1500))
+        self.fold_chunk_turns = fold_chunk_turns or int(os.getenv('CONTEXT_FOLD_CHUNK_TURNS', 4))
+
+        # Sessions with a fold in progress (owned by the event loop thread)
+        self._folding: Set[str] = set()
+
+        # Conversation summaries keyed on a hash of the summarized content
+        self._summaries = TTLCache(max_entries=1024, ttl=0)
+
+    def build(self, session_id: str = DEFAULT_SESSION_ID) -> str:
+        """Build conversation context for the AI"""
+        _, summary, turns = self.context_store.get_snapshot(session_id)
+
+        context = BASE_PROMPT
+
+        system_prompt = self.context_store.get_system_prompt(session_id)
+        if system_prompt:
+            context = f"System: {system_prompt}\n" + context
+
+        budget = self.token_budget
+        if summary:
+            context += f"\nSummary of earlier conversation:\n{summary}\n"
+            budget -= estimate_tokens(summary)
+
+        # Take the newest turns that fit; always keep the latest one
+        recent_turns = []
+        for role, text in reversed(turns):
+            cost = estimate_tokens(text) + 2
+            if recent_turns and cost > budget:
+                break
+            recent_turns.append((role, text))
+            budget -= cost
+        recent_turns.reverse()
+
+        context += "\nRecent conversation:\n" + format_turns(recent_turns)
+        return context
+
+    def needs_fold(self, session_id: str) -> bool:
+        """Check whether a session's history has outgrown the budget"""
+        _, summary, turns = self.context_store.get_snapshot(session_id)
+        if len(turns) <= self.fold_chunk_turns:
+            return False
+
+        # Fold before the ring buffer starts dropping turns unsummarized
+        if len(turns) > self.context_store.max_turns - self.fold_chunk_turns:
+            return True
+
+        tokens = sum(estimate_tokens(text) + 2 for _, text in turns)
+        if summary:
+            tokens += estimate_tokens(summary)
+        return tokens > self.token_budget
+
+    async def fold(self, session_id: str, summarize: Summarizer) -> bool:
+        """
+        Fold the oldest chunk of turns into the session's rolling summary
+
+        Args:
+            session_id: Session to compact
+            summarize: Produces the new summary from the old one and a chunk
+
+        Returns:
+            True if the summary was updated
+        """
+        if session_id in self._folding:
+            return False
+
+        self._folding.add(session_id)
+        try:
+            _, summary, turns = self.context_store.get_snapshot(session_id)
+            chunk = turns[:self.fold_chunk_turns]
+            if not chunk:
+                return False
+
+            new_summary = await summarize(summary, chunk)
+            if not new_summary:
+                return False
+
+            folded = self.context_store.fold(session_id, chunk, new_summary)
+            if folded:
+                logger.debug(f"Folded {len(chunk)} turns into summary for session {session_id}")
+            return folded
+
+        except Exception as e:
+            logger.warning(f"Failed to fold conversation history: {str(e)}")
+            return False
+        finally:
+            self._folding.discard(session_id)
+
+    def summary_prompt(self, previous_summary: Optional[str], turns: List[Tuple[str, str]]) -> str:
+        """Build the prompt that updates a rolling summary with new turns"""
+        prompt = "Update the running summary of a conversation with the new messages below. " \
+                 "Keep names, facts and open questions; reply with the summary only.\n\n"
+        prompt += f"Current summary:\n{previous_summary or '(none)'}\n\n"
+        prompt += f"New messages:\n{format_turns(turns)}"
+        return prompt
+
+    def get_cached_summary(self, session_id: str) -> Tuple[Optional[str], str]:
+        """
+        Look up the cached conversation summary for a session's current state
+
+        The key is a hash of the rolling summary and turns, so it stays valid
+        however the session got there (cleared, evicted or folded meanwhile).
+
+        Returns:
+            Tuple of (cached summary or None, cache key to store a new one under)
+        """
+        _, summary, turns = self.context_store.get_snapshot(session_id)
+        content = json.dumps([summary, turns], ensure_ascii=False)
+        key = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        return self._summaries.get(key), key
+
+    def cache_summary(self, key: str, summary: str):
+        """Remember the conversation summary for a session state"""
+        self._summaries.set(key, summary)
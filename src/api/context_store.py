@@ -0,0 +1,256 @@
+"""
+Conversation Context Store
+Keeps a bounded, per-session window of recent conversation turns
+"""
+
+import os
+import time
+import threading
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Session used when a caller does not supply its own id (CLI tools, scripts)
+DEFAULT_SESSION_ID = 'default'
+
+# Rough per-record bookkeeping cost on top of the text itself
+RECORD_OVERHEAD_BYTES = 64
+
+
+def _record_size(text: str) -> int:
+    """Approximate memory cost of one (role, text) record"""
+    return len(text.encode('utf-8')) + RECORD_OVERHEAD_BYTES
+
+
+class SessionContext:
+    """Recent turns and metadata for a single session"""
+
+    __slots__ = ('turns', 'system_prompt', 'summary', 'chat', 'version', 'nbytes', 'last_access')
+
+    def __init__(self, max_turns: int):
+        self.turns = deque(maxlen=max_turns)
+        self.system_prompt: Optional[str] = None
+        self.summary: Optional[str] = None
+        self.chat: Any = None
+        self.version = 0
+        self.nbytes = 0
+        self.last_access = time.monotonic()
+
+
+class ConversationContextStore:
+    """
+    Session-keyed ring buffers of (role, text) records
+
+    Each session keeps at most ``max_turns`` records. Sessions are kept in
+    least-recently-used order and are evicted when idle for longer than
+    ``idle_timeout`` seconds, when there are more than ``max_sessions`` of
+    them, or when the total size of all records exceeds ``max_bytes``.
+    """
+
+    def __init__(self, max_turns: Optional[int] = None, max_sessions: Optional[int] = None,
+                 max_bytes: Optional[int] = None, idle_timeout: Optional[float] = None):
+        """
+        Initialize the context store
+
+        Args:
+            max_turns: Records kept per session (default: CONTEXT_MAX_TURNS or 20)
+            max_sessions: Sessions kept in memory (default: CONTEXT_MAX_SESSIONS or 10000)
+            max_bytes: Memory cap for all records (default: CONTEXT_MAX_BYTES or 64MB)
+            idle_timeout: Seconds before an idle session is dropped (default: CONTEXT_IDLE_SECONDS or 3600)
+        """
+        self.max_turns = max_turns or int(os.getenv('CONTEXT_MAX_TURNS', 20))
+        self.max_sessions = max_sessions or int(os.getenv('CONTEXT_MAX_SESSIONS', 10000))
+        self.max_bytes = max_bytes or int(os.getenv('CONTEXT_MAX_BYTES', 64 * 1024 * 1024))
+        self.idle_timeout = idle_timeout or float(os.getenv('CONTEXT_IDLE_SECONDS', 3600))
+
+        self._sessions: "OrderedDict[str, SessionContext]" = OrderedDict()
+        self._total_bytes = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def append(self, session_id: str, role: str, text: str):
+        """Append a record to a session, evicting old data as needed"""
+        with self._lock:
+            context = self._touch(session_id, create=True)
+
+            if len(context.turns) == context.turns.maxlen:
+                # The deque drops its oldest record on append
+                _, dropped = context.turns[0]
+                self._resize(context, -_record_size(dropped))
+
+            context.turns.append((role, text))
+            context.version += 1
+            self._resize(context, _record_size(text))
+
+            self._evict(keep=session_id)
+
+    def get_turns(self, session_id: str, limit: Optional[int] = None) -> List[Tuple[str, str]]:
+        """Get the most recent records for a session (oldest first)"""
+        with self._lock:
+            context = self._touch(session_id)
+            if context is None:
+                return []
+
+            turns = list(context.turns)
+            return turns[-limit:] if limit else turns
+
+    def get_snapshot(self, session_id: str) -> Tuple[int, Optional[str], List[Tuple[str, str]]]:
+        """
+        Get a consistent view of a session
+
+        Returns:
+            Tuple of (version, rolling summary, records oldest first)
+        """
+        with self._lock:
+            context = self._touch(session_id)
+            if context is None:
+                return 0, None, []
+            return context.version, context.summary, list(context.turns)
+
+    def fold(self, session_id: str, folded_turns: List[Tuple[str, str]], summary: str) -> bool:
+        """
+        Replace the oldest records of a session with a rolling summary
+
+        The records are only removed if they are still the oldest ones in the
+        session, so a summary computed from a stale snapshot is discarded.
+
+        Args:
+            session_id: Session to update
+            folded_turns: Records the summary covers, oldest first
+            summary: New rolling summary including those records
+
+        Returns:
+            True if the summary was applied
+        """
+        with self._lock:
+            context = self._sessions.get(session_id)
+            if context is None or len(context.turns) < len(folded_turns):
+                return False
+
+            if any(context.turns[i] != turn for i, turn in enumerate(folded_turns)):
+                return False
+
+            for _ in folded_turns:
+                _, text = context.turns.popleft()
+                self._resize(context, -_record_size(text))
+
+            if context.summary:
+                self._resize(context, -_record_size(context.summary))
+            context.summary = summary
+            context.version += 1
+            self._resize(context, _record_size(summary))
+            return True
+
+    def discard_last(self, session_id: str, role: str, text: str) -> bool:
+        """
+        Remove the newest record of a session if it is still the given one
+
+        Returns:
+            True if the record was removed
+        """
+        with self._lock:
+            context = self._sessions.get(session_id)
+            if context is None or not context.turns or context.turns[-1] != (role, text):
+                return False
+
+            context.turns.pop()
+            context.version += 1
+            self._resize(context, -_record_size(text))
+            return True
+
+    def get_system_prompt(self, session_id: str) -> Optional[str]:
+        """Get the custom system prompt for a session, if any"""
+        with self._lock:
+            context = self._touch(session_id)
+            return context.system_prompt if context else None
+
+    def set_system_prompt(self, session_id: str, prompt: str):
+        """Set a custom system prompt for a session"""
+        with self._lock:
+            context = self._touch(session_id, create=True)
+            if context.system_prompt:
+                self._resize(context, -_record_size(context.system_prompt))
+            context.system_prompt = prompt
+            context.version += 1
+            self._resize(context, _record_size(prompt))
+            self._evict(keep=session_id)
+
+    def get_chat(self, session_id: str) -> Any:
+        """Get the native chat state attached to a session, if any"""
+        with self._lock:
+            context = self._sessions.get(session_id)
+            return context.chat if context else None
+
+    def set_chat(self, session_id: str, chat: Any):
+        """Attach native chat state to a session; it is dropped when the session is evicted"""
+        with self._lock:
+            context = self._touch(session_id, create=True)
+            context.chat = chat
+
+    def clear(self, session_id: str):
+        """Drop all records for a session"""
+        with self._lock:
+            self._drop(session_id)
+
+    def stats(self) -> Dict[str, int]:
+        """Get store size and eviction counters"""
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'evictions': self._evictions
+            }
+
+    def _touch(self, session_id: str, create: bool = False) -> Optional[SessionContext]:
+        """Look up a session and mark it as most recently used (lock held)"""
+        self._expire_idle()
+
+        context = self._sessions.get(session_id)
+        if context is None:
+            if not create:
+                return None
+            context = SessionContext(self.max_turns)
+            self._sessions[session_id] = context
+        else:
+            self._sessions.move_to_end(session_id)
+
+        context.last_access = time.monotonic()
+        return context
+
+    def _resize(self, context: SessionContext, delta: int):
+        """Adjust byte accounting for a session (lock held)"""
+        context.nbytes += delta
+        self._total_bytes += delta
+
+    def _drop(self, session_id: str) -> bool:
+        """Remove a session and release its bytes (lock held)"""
+        context = self._sessions.pop(session_id, None)
+        if context is None:
+            return False
+        self._total_bytes -= context.nbytes
+        return True
+
+    def _expire_idle(self):
+        """Drop sessions idle for longer than the timeout (lock held)"""
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._sessions:
+            session_id, context = next(iter(self._sessions.items()))
+            if context.last_access >= cutoff:
+                break
+            self._drop(session_id)
+            self._evictions += 1
+
+    def _evict(self, keep: str):
+        """Evict least recently used sessions until within limits (lock held)"""
+        while (len(self._sessions) > self.max_sessions or self._total_bytes > self.max_bytes) \
+                and len(self._sessions) > 1:
+            session_id = next(iter(self._sessions))
+            if session_id == keep:
+                # The active session is always the most recent; only reachable with one entry
+                break
+            self._drop(session_id)
+            self._evictions += 1
+            logger.debug(f"Evicted conversation context for session {session_id}")
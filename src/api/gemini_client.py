@@ -4,113 +4,595 @@ Handles communication with Google's Gemini AI model
 """
 
 import os
-import google.generativeai as genai
-from typing import Optional
+import queue
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Iterator, List, Optional, Tuple
 import logging
 
+from src.api.backends import LLMBackend, create_backend
+from src.api.context_builder import ContextBuilder
+from src.api.context_store import ConversationContextStore, DEFAULT_SESSION_ID
+from src.api.resilience import CircuitOpenError, ResilientCaller, is_retryable
+from src.api.native_chat import NativeChatManager
+from src.api.response_cache import create_response_cache, make_cache_key
+from src.api.single_flight import SingleFlight
+from src.utils.event_loop import BackgroundEventLoop
+
 logger = logging.getLogger(__name__)
 
-class GeminiClient:
-    """Client for interacting with Gemini AI API"""
-    
-    def __init__(self):
-        """Initialize the Gemini client"""
-        self.api_key = os.getenv('GEMINI_API_KEY')
-        self.model_name = os.getenv('GEMINI_MODEL', 'gemini-pro')
-        
-        if not self.api_key:
-            raise ValueError("GEMINI_API_KEY environment variable is required")
-        
-        # Configure the API
-        genai.configure(api_key=self.api_key)
-        
-        # Initialize the model
-        self.model = genai.GenerativeModel(self.model_name)
-        
-        # Conversation history for context
-        self.conversation_history = []
-        
-        logger.info(f"Gemini client initialized with model: {self.model_name}")
-    
-    def get_response(self, user_input: str, max_tokens: int = 1000) -> str:
+# Reply sent to the user when the model cannot produce one
+ERROR_RESPONSE = "I apologize, but I'm having trouble processing your request right now. Please try again."
+
+# Marks the end of a stream handed from the event loop to a sync consumer
+_STREAM_END = object()
+
+
+class AsyncGeminiClient:
+    """Asyncio client for interacting with Gemini AI API"""
+
+    def __init__(self, max_concurrency: Optional[int] = None, timeout: Optional[float] = None,
+                 backend: Optional[LLMBackend] = None):
+        """
+        Initialize the async Gemini client
+
+        Args:
+            max_concurrency: Maximum in-flight model calls (default: LLM_MAX_CONCURRENCY or 64)
+            timeout: Per-call deadline in seconds, including retries (default: LLM_TIMEOUT_SECONDS or 30)
+            backend: Model backend (default: selected by LLM_BACKEND)
+        """
+        self.max_concurrency = max_concurrency or int(os.getenv('LLM_MAX_CONCURRENCY', 64))
+        self.timeout = timeout or float(os.getenv('LLM_TIMEOUT_SECONDS', 30))
+
+        # Model backend (Gemini, or the local stub for offline testing)
+        self.backend = backend or create_backend()
+        self.model_name = self.backend.model_name
+
+        # Bounds the number of calls waiting on the upstream at once
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        # Deadlines, retries, hedging and circuit breaking around upstream calls
+        self.resilience = ResilientCaller(deadline=self.timeout)
+
+        # Per-session conversation history for context
+        self.context_store = ConversationContextStore()
+
+        # Token-budgeted prompts with rolling summaries of older turns
+        self.context_builder = ContextBuilder(self.context_store)
+        self.summary_max_tokens = int(os.getenv('CONTEXT_SUMMARY_MAX_TOKENS', 256))
+        self._background_tasks = set()
+
+        # Optional cache of replies to repeated prompts
+        self.response_cache = create_response_cache()
+
+        # Concurrent identical requests share one upstream call
+        self.single_flight = SingleFlight() if os.getenv('LLM_SINGLE_FLIGHT', 'True').lower() == 'true' else None
+
+        # Optionally keep a native chat per session instead of re-sending a flattened prompt
+        self.native_chats = None
+        if os.getenv('LLM_NATIVE_CHAT', 'False').lower() == 'true':
+            self.native_chats = NativeChatManager(self.backend, self.context_store)
+
+        logger.info(f"Async Gemini client initialized with {self.backend.name} backend, model: {self.model_name} "
+                    f"(max concurrency: {self.max_concurrency}, timeout: {self.timeout}s)")
+
+    async def get_response(self, user_input: str, max_tokens: int = 1000,
+                           session_id: Optional[str] = None) -> str:
         """
         Get response from Gemini AI
-        
+
         Args:
             user_input: User's message
             max_tokens: Maximum tokens in response
-            
+            session_id: Conversation the message belongs to
+
         Returns:
             AI response text
         """
+        session_id = session_id or DEFAULT_SESSION_ID
+
         try:
+            prompt, request_key = self._prepare_request(session_id, user_input, max_tokens)
+
             # Add user input to conversation history
-            self.conversation_history.append(f"User: {user_input}")
-            
-            # Create context from recent conversation
-            context = self._build_context()
-            
-            # Generate response
-            response = self.model.generate_content(
-                context + f"\nUser: {user_input}\nAssistant:",
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=max_tokens,
-                    temperature=0.7,
+            self.context_store.append(session_id, 'User', user_input)
+
+            cached_response = await self._cached_response(request_key)
+            if cached_response is not None:
+                self.context_store.append(session_id, 'Assistant', cached_response)
+                logger.info(f"Served cached response for user input: {user_input[:50]}...")
+                return cached_response
+
+            if self.native_chats:
+                # Send the message as a structured turn of the session's chat
+                ai_response = await self.native_chats.send(
+                    session_id, user_input, self._generation_params(max_tokens), self._upstream
+                )
+            elif self.single_flight:
+                # Share the call with identical in-flight requests
+                ai_response = await self.single_flight.do(
+                    request_key, lambda: self._generate(prompt, max_tokens)
                 )
-            )
-            
-            ai_response = response.text.strip()
-            
-            # Add AI response to conversation history
-            self.conversation_history.append(f"Assistant: {ai_response}")
-            
-            # Keep only recent conversation (last 10 exchanges)
-            if len(self.conversation_history) > 20:
-                self.conversation_history = self.conversation_history[-20:]
-            
+            else:
+                ai_response = await self._generate(prompt, max_tokens)
+
+            # Add AI response to conversation history (the store keeps it bounded)
+            self.context_store.append(session_id, 'Assistant', ai_response)
+            if self.native_chats:
+                self.native_chats.sync(session_id)
+            await self._cache_response(request_key, ai_response)
+            self._schedule_fold(session_id)
+
             logger.info(f"Generated response for user input: {user_input[:50]}...")
             return ai_response
-            
+
+        except CircuitOpenError:
+            logger.warning("Upstream circuit open, failing fast")
+            return ERROR_RESPONSE
+        except asyncio.TimeoutError:
+            logger.error(f"Gemini request timed out after {self.timeout}s")
+            return ERROR_RESPONSE
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}")
-            return "I apologize, but I'm having trouble processing your request right now. Please try again."
-    
-    def _build_context(self) -> str:
+            return ERROR_RESPONSE
+
+    async def get_responses_batch(self, items: List[Tuple[Optional[str], str]], max_tokens: int = 1000,
+                                  parallelism: Optional[int] = None) -> List[str]:
+        """
+        Get responses for many messages concurrently
+
+        Messages for the same session are answered one after another so each
+        sees the previous reply in its context; different sessions run in
+        parallel.
+
+        Args:
+            items: (session_id, message) pairs
+            max_tokens: Maximum tokens in each response
+            parallelism: Sessions processed at once (default: BATCH_PARALLELISM or 8)
+
+        Returns:
+            Responses in the same order as ``items``
+        """
+        parallelism = parallelism or int(os.getenv('BATCH_PARALLELISM', 8))
+        limit = asyncio.Semaphore(parallelism)
+        responses: List[Optional[str]] = [None] * len(items)
+
+        # Group item indexes by session, keeping their order
+        sessions = {}
+        for index, (session_id, _) in enumerate(items):
+            sessions.setdefault(session_id or DEFAULT_SESSION_ID, []).append(index)
+
+        async def run_session(session_id: str, indexes: List[int]):
+            async with limit:
+                for index in indexes:
+                    responses[index] = await self.get_response(items[index][1], max_tokens, session_id)
+
+        await asyncio.gather(*(run_session(session_id, indexes) for session_id, indexes in sessions.items()))
+
+        logger.info(f"Generated {len(items)} batch responses across {len(sessions)} sessions")
+        return responses
+
+    async def _generate(self, prompt: str, max_tokens: int) -> str:
+        """Get a reply to a flattened prompt"""
+        params = self._generation_params(max_tokens)
+        return await self._upstream(lambda: self.backend.generate(prompt, params))
+
+    async def _upstream(self, attempt: Callable[[], Awaitable[str]], hedge: bool = True) -> str:
+        """Run an upstream call through the concurrency limit and the resilience layer"""
+        async def limited_attempt() -> str:
+            async with self._semaphore:
+                return await attempt()
+
+        return await self.resilience.call(limited_attempt, hedge=hedge)
+
+    async def stream_response(self, user_input: str, max_tokens: int = 1000,
+                              session_id: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Stream a response from Gemini AI as it is generated
+
+        Args:
+            user_input: User's message
+            max_tokens: Maximum tokens in response
+            session_id: Conversation the message belongs to
+
+        Yields:
+            Partial response text chunks (ERROR_RESPONSE if the call fails
+            before any text is produced)
+
+        Raises:
+            Exception: If the upstream fails after some text was yielded
+        """
+        session_id = session_id or DEFAULT_SESSION_ID
+        chunks = []
+
+        try:
+            prompt, request_key = self._prepare_request(session_id, user_input, max_tokens)
+
+            self.context_store.append(session_id, 'User', user_input)
+
+            cached_response = await self._cached_response(request_key)
+            if cached_response is not None:
+                self.context_store.append(session_id, 'Assistant', cached_response)
+                yield cached_response
+                return
+
+            # Streams are not retried or hedged once text has been sent, but they
+            # still respect the circuit breaker
+            breaker = self.resilience.breaker
+            if not breaker.allow():
+                raise CircuitOpenError("Upstream circuit is open")
+
+            outcome_recorded = False
+            try:
+                async with self._semaphore:
+                    # The timeout applies to each gap between chunks, not the whole stream
+                    params = self._generation_params(max_tokens)
+                    if self.native_chats:
+                        response_chunks = self.native_chats.stream(session_id, user_input, params)
+                    else:
+                        response_chunks = self.backend.stream(prompt, params)
+                    try:
+                        while True:
+                            try:
+                                text = await asyncio.wait_for(response_chunks.__anext__(), timeout=self.timeout)
+                            except StopAsyncIteration:
+                                break
+
+                            chunks.append(text)
+                            yield text
+                    except Exception as e:
+                        if is_retryable(e):
+                            breaker.record_failure()
+                        else:
+                            breaker.record_success()
+                        outcome_recorded = True
+                        raise
+                    finally:
+                        await response_chunks.aclose()
+
+                breaker.record_success()
+                outcome_recorded = True
+            finally:
+                if not outcome_recorded:
+                    # Cancelled, or the consumer closed the stream early
+                    breaker.release()
+
+            ai_response = "".join(chunks).strip()
+            self.context_store.append(session_id, 'Assistant', ai_response)
+            if self.native_chats:
+                self.native_chats.sync(session_id)
+            await self._cache_response(request_key, ai_response)
+            self._schedule_fold(session_id)
+
+            logger.info(f"Streamed response for user input: {user_input[:50]}...")
+
+        except CircuitOpenError:
+            logger.warning("Upstream circuit open, failing fast")
+            if not chunks:
+                yield ERROR_RESPONSE
+        except asyncio.TimeoutError:
+            logger.error(f"Gemini stream timed out after {self.timeout}s")
+            if chunks:
+                self._abandon_turn(session_id, user_input)
+                raise
+            yield ERROR_RESPONSE
+        except Exception as e:
+            logger.error(f"Error streaming response: {str(e)}")
+            if chunks:
+                self._abandon_turn(session_id, user_input)
+                raise
+            yield ERROR_RESPONSE
+
+    def _abandon_turn(self, session_id: str, user_input: str):
+        """
+        Forget a user message whose reply failed part-way through
+
+        The consumer has already received some text, so the failure is raised
+        to it instead of being replaced by ERROR_RESPONSE; the partial reply is
+        not recorded and the message is dropped from the history so the next
+        turn does not follow an unanswered one.
+        """
+        self.context_store.discard_last(session_id, 'User', user_input)
+        if self.native_chats:
+            self.native_chats.invalidate(session_id)
+
+    def _generation_params(self, max_tokens: int) -> dict:
+        """Get the generation parameters for a request"""
+        return {
+            'max_output_tokens': max_tokens,
+            'temperature': 0.7,
+        }
+
+    def _prepare_request(self, session_id: str, user_input: str, max_tokens: int) -> Tuple[str, str]:
+        """
+        Build the prompt for a user message and the key identifying the request
+
+        Call before the message is added to the history, so the prompt carries
+        it once. The key covers the user input, the context and the generation
+        config; it is used both for the response cache and for coalescing.
+
+        Returns:
+            Tuple of (prompt, request key)
+        """
+        context = self._build_context(session_id)
+        prompt = context + f"\nUser: {user_input}\nAssistant:"
+
+        params = dict(self._generation_params(max_tokens), model=self.model_name)
+        request_key = make_cache_key(user_input, context, params)
+
+        return prompt, request_key
+
+    async def _cached_response(self, request_key: str) -> Optional[str]:
+        """Look up a cached reply"""
+        if not self.response_cache:
+            return None
+        if self.response_cache.blocking:
+            # Keep disk reads off the event loop
+            return await asyncio.to_thread(self.response_cache.get, request_key)
+        return self.response_cache.get(request_key)
+
+    async def _cache_response(self, request_key: str, response: str):
+        """Store a reply in the cache"""
+        if not self.response_cache or not response:
+            return
+        if self.response_cache.blocking:
+            await asyncio.to_thread(self.response_cache.set, request_key, response)
+        else:
+            self.response_cache.set(request_key, response)
+
+    def get_cache_stats(self) -> dict:
+        """Get response cache hit/miss counters"""
+        if not self.response_cache:
+            return {'enabled': False}
+        return dict(self.response_cache.stats(), enabled=True)
+
+    def get_resilience_stats(self) -> dict:
+        """Get retry, hedging and circuit breaker counters"""
+        return self.resilience.stats()
+
+    def get_coalescing_stats(self) -> dict:
+        """Get counts of upstream calls saved by request coalescing"""
+        if not self.single_flight:
+            return {'enabled': False}
+        return dict(self.single_flight.stats(), enabled=True)
+
+    def get_native_chat_stats(self) -> dict:
+        """Get native chat counters"""
+        if not self.native_chats:
+            return {'enabled': False}
+        return dict(self.native_chats.stats(), enabled=True)
+
+    def get_stats(self) -> dict:
+        """Get every client counter, keyed by component"""
+        return {
+            'model': self.model_name,
+            'response_cache': self.get_cache_stats(),
+            'coalescing': self.get_coalescing_stats(),
+            'resilience': self.get_resilience_stats(),
+            'native_chat': self.get_native_chat_stats(),
+            'context_store': self.context_store.stats()
+        }
+
+    def _build_context(self, session_id: str = DEFAULT_SESSION_ID) -> str:
         """Build conversation context for the AI"""
-        context = """You are a helpful voice assistant chatbot. You provide clear, concise, and friendly responses. 
-Keep your responses conversational and natural for voice interaction.
+        return self.context_builder.build(session_id)
 
-Recent conversation:
-"""
-        
-        # Add recent conversation history
-        recent_history = self.conversation_history[-10:] if len(self.conversation_history) > 10 else self.conversation_history
-        context += "\n".join(recent_history)
-        
-        return context
-    
-    def clear_conversation(self):
+    def _schedule_fold(self, session_id: str):
+        """Fold older turns into the rolling summary in the background"""
+        if not self.context_builder.needs_fold(session_id):
+            return
+
+        task = asyncio.ensure_future(self.context_builder.fold(session_id, self._summarize))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _summarize(self, previous_summary: Optional[str], turns: list) -> str:
+        """Update a rolling summary with a chunk of turns"""
+        prompt = self.context_builder.summary_prompt(previous_summary, turns)
+        return await self._generate(prompt, self.summary_max_tokens)
+
+    def clear_conversation(self, session_id: Optional[str] = None):
         """Clear conversation history"""
-        self.conversation_history = []
+        self.context_store.clear(session_id or DEFAULT_SESSION_ID)
         logger.info("Conversation history cleared")
-    
-    def set_system_prompt(self, prompt: str):
+
+    def set_system_prompt(self, prompt: str, session_id: Optional[str] = None):
         """Set a custom system prompt"""
-        self.conversation_history.insert(0, f"System: {prompt}")
+        self.context_store.set_system_prompt(session_id or DEFAULT_SESSION_ID, prompt)
         logger.info("System prompt updated")
-    
-    def get_conversation_summary(self) -> str:
+
+    def get_conversation_history(self, session_id: Optional[str] = None) -> list:
+        """Get the recent conversation history as "Role: text" lines"""
+        turns = self.context_store.get_turns(session_id or DEFAULT_SESSION_ID)
+        return [f"{role}: {text}" for role, text in turns]
+
+    async def get_conversation_summary(self, session_id: Optional[str] = None) -> str:
         """Get a summary of the current conversation"""
-        if not self.conversation_history:
+        session_id = session_id or DEFAULT_SESSION_ID
+        _, rolling_summary, turns = self.context_store.get_snapshot(session_id)
+        if not turns and not rolling_summary:
             return "No conversation history available."
-        
+
+        cached_summary, cache_key = self.context_builder.get_cached_summary(session_id)
+        if cached_summary is not None:
+            return cached_summary
+
         try:
-            history_text = "\n".join(self.conversation_history)
-            summary_prompt = f"Please provide a brief summary of this conversation:\n\n{history_text}"
-            
-            response = self.model.generate_content(summary_prompt)
-            return response.text.strip()
-            
+            if not turns:
+                summary = rolling_summary
+            else:
+                # Only the rolling summary and the turns not yet folded into it are sent
+                summary = await self._summarize(rolling_summary, turns)
+
+            self.context_builder.cache_summary(cache_key, summary)
+            return summary
+
         except Exception as e:
             logger.error(f"Error generating conversation summary: {str(e)}")
             return "Unable to generate conversation summary."
+
+
+class GeminiClient:
+    """
+    Client for interacting with Gemini AI API
+
+    A thin synchronous wrapper over AsyncGeminiClient. Calls from any number
+    of worker threads are multiplexed onto one background event loop, so they
+    share the model's transport and the concurrency limit.
+    """
+
+    def __init__(self):
+        """Initialize the Gemini client"""
+        self._runner = BackgroundEventLoop(name='gemini-client')
+
+        try:
+            # Create the async client on the loop it will run on
+            self.async_client = self._runner.run(self._create_async_client())
+        except Exception:
+            self._runner.stop()
+            raise
+
+        logger.info(f"Gemini client initialized with model: {self.model_name}")
+
+    @staticmethod
+    async def _create_async_client() -> AsyncGeminiClient:
+        return AsyncGeminiClient()
+
+    @property
+    def model_name(self) -> str:
+        return self.async_client.model_name
+
+    @property
+    def backend(self) -> LLMBackend:
+        return self.async_client.backend
+
+    @property
+    def model(self):
+        return getattr(self.async_client.backend, 'model', None)
+
+    @property
+    def context_store(self) -> ConversationContextStore:
+        return self.async_client.context_store
+
+    @property
+    def response_cache(self):
+        return self.async_client.response_cache
+
+    def get_response(self, user_input: str, max_tokens: int = 1000,
+                     session_id: Optional[str] = None) -> str:
+        """
+        Get response from Gemini AI
+
+        Args:
+            user_input: User's message
+            max_tokens: Maximum tokens in response
+            session_id: Conversation the message belongs to
+
+        Returns:
+            AI response text
+        """
+        return self._runner.run(self.async_client.get_response(user_input, max_tokens, session_id))
+
+    def get_responses_batch(self, items: List[Tuple[Optional[str], str]], max_tokens: int = 1000,
+                            parallelism: Optional[int] = None) -> List[str]:
+        """
+        Get responses for many messages concurrently
+
+        Args:
+            items: (session_id, message) pairs
+            max_tokens: Maximum tokens in each response
+            parallelism: Sessions processed at once
+
+        Returns:
+            Responses in the same order as ``items``
+        """
+        return self._runner.run(self.async_client.get_responses_batch(items, max_tokens, parallelism))
+
+    def stream_response(self, user_input: str, max_tokens: int = 1000,
+                        session_id: Optional[str] = None) -> Iterator[str]:
+        """
+        Stream a response from Gemini AI as it is generated
+
+        Args:
+            user_input: User's message
+            max_tokens: Maximum tokens in response
+            session_id: Conversation the message belongs to
+
+        Yields:
+            Partial response text chunks
+
+        Raises:
+            Exception: If the upstream fails after some text was yielded
+        """
+        chunks = queue.Queue()
+
+        async def pump():
+            try:
+                async for chunk in self.async_client.stream_response(user_input, max_tokens, session_id):
+                    chunks.put(chunk)
+            finally:
+                chunks.put(_STREAM_END)
+
+        future = self._runner.submit(pump())
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is _STREAM_END:
+                    break
+                yield chunk
+            future.result()
+        finally:
+            # Stop generating if the consumer went away early
+            future.cancel()
+
+    def get_cache_stats(self) -> dict:
+        """Get response cache hit/miss counters"""
+        return self.async_client.get_cache_stats()
+
+    def get_coalescing_stats(self) -> dict:
+        """Get counts of upstream calls saved by request coalescing"""
+        return self._runner.run(self._coalescing_stats())
+
+    async def _coalescing_stats(self) -> dict:
+        # Read on the loop thread, which owns the single-flight state
+        return self.async_client.get_coalescing_stats()
+
+    def get_resilience_stats(self) -> dict:
+        """Get retry, hedging and circuit breaker counters"""
+        return self._runner.run(self._resilience_stats())
+
+    async def _resilience_stats(self) -> dict:
+        return self.async_client.get_resilience_stats()
+
+    def get_native_chat_stats(self) -> dict:
+        """Get native chat counters"""
+        return self._runner.run(self._native_chat_stats())
+
+    async def _native_chat_stats(self) -> dict:
+        return self.async_client.get_native_chat_stats()
+
+    def get_stats(self) -> dict:
+        """Get response cache, coalescing, resilience and native chat counters in one snapshot"""
+        return self._runner.run(self._stats())
+
+    async def _stats(self) -> dict:
+        return self.async_client.get_stats()
+
+    def clear_conversation(self, session_id: Optional[str] = None):
+        """Clear conversation history"""
+        self.async_client.clear_conversation(session_id)
+
+    def set_system_prompt(self, prompt: str, session_id: Optional[str] = None):
+        """Set a custom system prompt"""
+        self.async_client.set_system_prompt(prompt, session_id)
+
+    def get_conversation_history(self, session_id: Optional[str] = None) -> list:
+        """Get the recent conversation history as "Role: text" lines"""
+        return self.async_client.get_conversation_history(session_id)
+
+    def get_conversation_summary(self, session_id: Optional[str] = None) -> str:
+        """Get a summary of the current conversation"""
+        return self._runner.run(self.async_client.get_conversation_summary(session_id))
+
+    def close(self):
+        """Stop the background event loop"""
+        self._runner.stop()
@@ -0,0 +1,150 @@
+"""
+Native Chat Sessions
+Keeps one backend chat object per conversation so turns are sent as structured history
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.api.backends import LLMBackend, LLMBackendError, LLMChat
+from src.api.context_builder import BASE_PROMPT
+from src.api.context_store import ConversationContextStore
+
+logger = logging.getLogger(__name__)
+
+# Store record roles mapped to backend chat roles
+CHAT_ROLES = {'User': 'user', 'Assistant': 'model'}
+
+# Instruction exchange placed at the start of every chat (system prompts are
+# not supported natively by the API version in use)
+PINNED_TURNS = 2
+
+# Wraps one upstream attempt with retries/deadlines (see AsyncGeminiClient._upstream);
+# called with hedge=False
+Caller = Callable[..., Awaitable[str]]
+
+
+class NativeChatState:
+    """A backend chat object and the conversation state it was built from"""
+
+    __slots__ = ('chat', 'seed', 'turns', 'lock')
+
+    def __init__(self, chat: LLMChat, seed: Tuple[Optional[str], Optional[str]], turns: List[Tuple[str, str]]):
+        self.chat = chat
+        self.seed = seed
+        self.turns = turns
+        self.lock = asyncio.Lock()
+
+
+class NativeChatManager:
+    """
+    Maintains per-session native chat objects
+
+    Chat objects live in the conversation context store, so they are evicted
+    together with the session. Before each turn the chat is checked against
+    the store's records; if they have diverged (a cached or coalesced reply,
+    a rolling-summary fold, a new system prompt) the chat is rebuilt from the
+    records, which needs no upstream call.
+    """
+
+    def __init__(self, backend: LLMBackend, context_store: ConversationContextStore):
+        self.backend = backend
+        self.context_store = context_store
+        self.rebuilds = 0
+
+    def _instructions(self, system_prompt: Optional[str], summary: Optional[str]) -> str:
+        instructions = BASE_PROMPT
+        if system_prompt:
+            instructions = f"{system_prompt}\n{instructions}"
+        if summary:
+            instructions += f"\nSummary of earlier conversation:\n{summary}\n"
+        return instructions
+
+    def _state(self, session_id: str) -> NativeChatState:
+        """Get a chat in sync with the session's records, excluding the pending user message"""
+        _, summary, turns = self.context_store.get_snapshot(session_id)
+        system_prompt = self.context_store.get_system_prompt(session_id)
+        history = turns[:-1]
+        seed = (system_prompt, summary)
+
+        state = self.context_store.get_chat(session_id)
+        if state is not None and state.seed == seed and state.turns == history:
+            return state
+
+        chat_history = [
+            ('user', self._instructions(system_prompt, summary)),
+            ('model', "Understood."),
+        ] + [(CHAT_ROLES.get(role, 'user'), text) for role, text in history]
+
+        new_state = NativeChatState(self.backend.start_chat(chat_history), seed, history)
+        if state is not None:
+            # Keep serializing turns for this session behind the existing lock
+            new_state.lock = state.lock
+            self.rebuilds += 1
+        self.context_store.set_chat(session_id, new_state)
+        return new_state
+
+    def _lock(self, session_id: str) -> asyncio.Lock:
+        state = self.context_store.get_chat(session_id)
+        if state is None:
+            state = self._state(session_id)
+        return state.lock
+
+    async def send(self, session_id: str, message: str, params: Dict[str, Any], call: Caller) -> str:
+        """
+        Send the pending user message of a session through its chat
+
+        The chat object is stateful, so attempts are never hedged, and a
+        failed attempt is only retried if it left the chat history untouched
+        (sending again after the turn was recorded would duplicate it).
+
+        Args:
+            session_id: Conversation the message belongs to (already recorded in the store)
+            message: User's message
+            params: Generation parameters
+            call: Runs the upstream attempt with retries and deadlines
+
+        Returns:
+            Reply text
+        """
+        async with self._lock(session_id):
+            state = self._state(session_id)
+            history_length = state.chat.history_length()
+
+            async def attempt() -> str:
+                if state.chat.history_length() != history_length:
+                    raise LLMBackendError("Chat history changed by a failed attempt, not retrying")
+                return await state.chat.send(message, params)
+
+            return await call(attempt, hedge=False)
+
+    async def stream(self, session_id: str, message: str, params: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream the reply to the pending user message of a session"""
+        async with self._lock(session_id):
+            state = self._state(session_id)
+            async for chunk in state.chat.stream(message, params):
+                yield chunk
+
+    def sync(self, session_id: str):
+        """Record that the chat now matches the store after a completed turn"""
+        state = self.context_store.get_chat(session_id)
+        if state is None:
+            return
+
+        _, summary, turns = self.context_store.get_snapshot(session_id)
+        if state.seed[1] != summary:
+            # A fold happened meanwhile; the next turn rebuilds the chat
+            return
+
+        state.turns = turns
+        state.chat.trim(len(turns), pinned_turns=PINNED_TURNS)
+
+    def invalidate(self, session_id: str):
+        """Make the next turn rebuild the chat, e.g. after a reply failed part-way"""
+        state = self.context_store.get_chat(session_id)
+        if state is not None:
+            state.turns = None
+
+    def stats(self) -> Dict[str, int]:
+        return {'rebuilds': self.rebuilds}
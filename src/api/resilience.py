@@ -0,0 +1,291 @@
+"""
+Resilience Layer
+Deadlines, retries, hedged requests and a circuit breaker for upstream LLM calls
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from src.api.backends import LLMBackendError
+
+logger = logging.getLogger(__name__)
+
+# google.api_core exception names that indicate a transient upstream problem
+RETRYABLE_ERROR_NAMES = {
+    'ServiceUnavailable', 'ResourceExhausted', 'TooManyRequests', 'DeadlineExceeded',
+    'InternalServerError', 'GatewayTimeout', 'Aborted', 'Unknown'
+}
+
+
+class CircuitOpenError(LLMBackendError):
+    """Raised when the circuit breaker is rejecting calls"""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Check whether an upstream error is worth retrying"""
+    if isinstance(error, LLMBackendError):
+        return error.retryable
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+
+class CircuitBreaker:
+    """
+    Fails fast while the upstream is degraded
+
+    Opens after ``failure_threshold`` consecutive failures and rejects calls
+    for ``reset_timeout`` seconds. It then lets a single trial call through
+    (half-open); success closes the circuit, failure opens it again. A trial
+    that ends with neither (cancelled, or a stream the client abandoned) is
+    handed back with ``release``; one that never reports at all is replaced
+    after another ``reset_timeout``.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None):
+        """
+        Initialize the circuit breaker
+
+        Args:
+            failure_threshold: Consecutive failures before opening (default: CIRCUIT_FAILURE_THRESHOLD or 5)
+            reset_timeout: Seconds to stay open (default: CIRCUIT_RESET_SECONDS or 30)
+        """
+        self.failure_threshold = failure_threshold or int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5))
+        self.reset_timeout = reset_timeout or float(os.getenv('CIRCUIT_RESET_SECONDS', 30))
+
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started_at = 0.0
+        self.rejected = 0
+        self.opened = 0
+
+    def allow(self) -> bool:
+        """Check whether a call may go upstream"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+
+        if self.state == self.HALF_OPEN:
+            now = time.monotonic()
+            if self._trial_in_flight and now - self._trial_started_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            self._trial_in_flight = True
+            self._trial_started_at = now
+
+        return True
+
+    def release(self):
+        """Give back an allowed call that ended without an outcome, so the next one can be the trial"""
+        self._trial_in_flight = False
+
+    def record_success(self):
+        """Record a successful upstream call"""
+        if self.state != self.CLOSED:
+            logger.info("Circuit breaker closed, upstream recovered")
+        self.state = self.CLOSED
+        self._failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        """Record a failed upstream call"""
+        self._failures += 1
+        self._trial_in_flight = False
+
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opened += 1
+                logger.warning(f"Circuit breaker opened after {self._failures} failures")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'consecutive_failures': self._failures,
+            'times_opened': self.opened,
+            'rejected_calls': self.rejected
+        }
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self._samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Get a latency percentile, or None until enough samples exist"""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(pct / 100 * len(ordered)))
+        return ordered[index]
+
+
+class ResilientCaller:
+    """
+    Runs upstream calls with a deadline, retries, hedging and a circuit breaker
+
+    Each call gets an overall deadline. Retryable errors are retried with
+    exponential backoff and full jitter while time remains. When an attempt
+    is slower than the recent p95 latency, a duplicate (hedged) request is
+    started and whichever finishes first wins. Must be used from a single
+    event loop.
+    """
+
+    def __init__(self, deadline: Optional[float] = None, max_retries: Optional[int] = None,
+                 backoff_base: Optional[float] = None, backoff_max: Optional[float] = None,
+                 hedging: Optional[bool] = None, breaker: Optional[CircuitBreaker] = None):
+        """
+        Initialize the resilient caller
+
+        Args:
+            deadline: Seconds allowed per call including retries (default: 30)
+            max_retries: Retries after the first attempt (default: LLM_MAX_RETRIES or 2)
+            backoff_base: First backoff in seconds (default: LLM_RETRY_BACKOFF_MS / 1000 or 0.2)
+            backoff_max: Longest backoff in seconds (default: 5)
+            hedging: Send a duplicate request once p95 latency is exceeded (default: LLM_HEDGING or True)
+            breaker: Circuit breaker guarding the upstream
+        """
+        self.deadline = deadline or 30.0
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('LLM_MAX_RETRIES', 2))
+        self.backoff_base = backoff_base or float(os.getenv('LLM_RETRY_BACKOFF_MS', 200)) / 1000
+        self.backoff_max = backoff_max or 5.0
+        if hedging is None:
+            hedging = os.getenv('LLM_HEDGING', 'True').lower() == 'true'
+        self.hedging = hedging
+
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failures = 0
+
+    async def call(self, attempt: Callable[[], Awaitable[Any]], hedge: bool = True) -> Any:
+        """
+        Run an upstream call
+
+        Args:
+            attempt: Factory returning a fresh awaitable for each attempt
+            hedge: Allow a duplicate request when the attempt runs slow (disable
+                for calls that change state, which must never run twice at once)
+
+        Returns:
+            Result of the first successful attempt
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            Exception: The last error once retries or the deadline run out
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        self.calls += 1
+
+        for attempt_number in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError("Upstream circuit is open", retryable=False)
+
+            remaining = deadline - loop.time()
+            try:
+                result = await self._run_attempt(attempt, remaining, hedge)
+                self.breaker.record_success()
+                return result
+
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                retryable = is_retryable(e)
+
+                # Only transient upstream errors count against the circuit
+                if retryable:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+
+                backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt_number))
+                if not retryable or attempt_number >= self.max_retries \
+                        or loop.time() + backoff >= deadline:
+                    self.failures += 1
+                    raise
+
+                self.retries += 1
+                logger.warning(f"Retrying upstream call after error: {str(e) or type(e).__name__} "
+                               f"(attempt {attempt_number + 1}, backoff {backoff:.2f}s)")
+                await asyncio.sleep(backoff)
+
+    async def _run_attempt(self, attempt: Callable[[], Awaitable[Any]], timeout: float, hedge: bool = True) -> Any:
+        """Run one attempt within the remaining time, hedging if it runs slow"""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        hedge_after = self.latency.percentile(95) if self.hedging and hedge else None
+        if hedge_after is None or hedge_after >= timeout:
+            result = await asyncio.wait_for(attempt(), timeout=timeout)
+            self.latency.record(loop.time() - started)
+            return result
+
+        primary = asyncio.ensure_future(attempt())
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                self.hedges += 1
+                tasks.add(asyncio.ensure_future(attempt()))
+
+            # Take the first successful attempt; fail only once all of them have
+            last_error: Optional[BaseException] = None
+            end = started + timeout
+            while tasks:
+                done, tasks = await asyncio.wait(
+                    tasks, timeout=max(0.0, end - loop.time()), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise asyncio.TimeoutError()
+
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        self.latency.record(loop.time() - started)
+                        return task.result()
+                    last_error = task.exception()
+
+            raise last_error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.latency.percentile(95)
+        return {
+            'calls': self.calls,
+            'retries': self.retries,
+            'hedged_requests': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'failed_calls': self.failures,
+            'p95_latency_ms': round(p95 * 1000, 1) if p95 is not None else None,
+            'circuit': self.breaker.stats()
+        }
@@ -0,0 +1,257 @@
+"""
+Response Cache
+Caches Gemini replies keyed on the prompt, its context and the generation config
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+from src.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(text: str) -> str:
+    """Normalize user input so trivially different openers share a cache entry"""
+    text = re.sub(r'\s+', ' ', text.strip().lower())
+    return text.rstrip('.!?')
+
+
+def make_cache_key(user_input: str, context: str, generation_config: Dict[str, Any]) -> str:
+    """
+    Build a cache key for a request
+
+    Args:
+        user_input: User's message
+        context: Conversation context sent with the message
+        generation_config: Parameters passed to the model
+
+    Returns:
+        Hex digest identifying the request
+    """
+    context_hash = hashlib.sha256(context.encode('utf-8')).hexdigest()
+    config = json.dumps(generation_config, sort_keys=True)
+    material = "\x1f".join([normalize_prompt(user_input), context_hash, config])
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class ResponseCache(ABC):
+    """Base class for response cache backends"""
+
+    # Whether get/set do I/O and should run off the event loop
+    blocking = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached response, or None on a miss"""
+
+    @abstractmethod
+    def set(self, key: str, response: str):
+        """Store a response"""
+
+    @abstractmethod
+    def clear(self):
+        """Remove all cached responses"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters"""
+
+
+class MemoryResponseCache(ResponseCache):
+    """In-process response cache"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600):
+        self._cache = TTLCache(max_entries=max_entries, ttl=ttl)
+
+    def get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    def set(self, key: str, response: str):
+        self._cache.set(key, response)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._cache.stats()
+        stats['backend'] = 'memory'
+        return stats
+
+
+class SQLiteResponseCache(ResponseCache):
+    """
+    On-disk response cache
+
+    Entries survive restarts and are shared by every worker on the host
+    that points at the same database file. Expired and least recently used
+    entries are removed in a batch every ``evict_interval`` writes, so the
+    table may briefly hold up to that many entries over ``max_entries``.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl: float = 3600, evict_interval: int = 100):
+        """
+        Initialize the SQLite cache
+
+        Args:
+            path: Database file path
+            max_entries: Maximum number of entries kept
+            ttl: Seconds an entry stays valid (0 disables expiry)
+            evict_interval: Writes between eviction passes
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evict_interval = max(1, evict_interval)
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connection() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS response_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_response_cache_access ON response_cache (last_access)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the calling thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            now = time.time()
+            with self._connection() as conn:
+                row = conn.execute(
+                    "SELECT response, created_at FROM response_cache WHERE key = ?", (key,)
+                ).fetchone()
+
+                if row is None:
+                    self._count(False)
+                    return None
+
+                response, created_at = row
+                if self.ttl and created_at + self.ttl < now:
+                    conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                    self._count(False)
+                    return None
+
+                conn.execute("UPDATE response_cache SET last_access = ? WHERE key = ?", (now, key))
+
+            self._count(True)
+            return response
+
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache read failed: {str(e)}")
+            self._count(False)
+            return None
+
+    def set(self, key: str, response: str):
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % self.evict_interval == 0
+
+        try:
+            now = time.time()
+            with self._connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, response, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, response, now, now)
+                )
+            if evict:
+                self.evict()
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache write failed: {str(e)}")
+
+    def evict(self):
+        """Remove expired entries and trim the table to ``max_entries``"""
+        now = time.time()
+        with self._connection() as conn:
+            if self.ttl:
+                conn.execute("DELETE FROM response_cache WHERE created_at < ?", (now - self.ttl,))
+            conn.execute(
+                "DELETE FROM response_cache WHERE key IN ("
+                "SELECT key FROM response_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM response_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            entries = self._connection().execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': 'sqlite',
+                'entries': entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+def create_response_cache() -> Optional[ResponseCache]:
+    """
+    Create the response cache configured in the environment
+
+    RESPONSE_CACHE selects the backend: "off" (default), "memory" or "sqlite".
+    """
+    backend = os.getenv('RESPONSE_CACHE', 'off').lower()
+    ttl = float(os.getenv('RESPONSE_CACHE_TTL', 3600))
+    max_entries = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+
+    if backend == 'memory':
+        logger.info("Using in-memory response cache")
+        return MemoryResponseCache(max_entries=max_entries, ttl=ttl)
+
+    if backend == 'sqlite':
+        path = os.getenv('RESPONSE_CACHE_PATH', os.path.join('instance', 'response_cache.db'))
+        logger.info(f"Using SQLite response cache: {path}")
+        return SQLiteResponseCache(path, max_entries=max_entries, ttl=ttl)
+
+    if backend not in ('off', 'none', ''):
+        logger.warning(f"Unknown RESPONSE_CACHE backend '{backend}', caching disabled")
+    return None
@@ -0,0 +1,64 @@
+"""
+Single-Flight Request Coalescing
+Lets concurrent identical requests share one upstream call
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key
+
+    The first caller for a key (the leader) starts the upstream call as a
+    task; callers arriving while it is in flight wait on the same task and
+    receive its result or exception. Must be used from a single event loop.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run ``call`` once for all concurrent callers with the same key
+
+        Args:
+            key: Identifies equivalent requests
+            call: Factory returning the upstream awaitable
+
+        Returns:
+            Result of the shared upstream call
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(call())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+            logger.debug("Coalesced request with an in-flight upstream call")
+
+        # Shield so one caller being cancelled does not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        """Drop a finished call so later requests start a fresh one"""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get counts of upstream calls made and saved"""
+        requests = self.leaders + self.coalesced
+        return {
+            'in_flight': len(self._in_flight),
+            'upstream_calls': self.leaders,
+            'coalesced_requests': self.coalesced,
+            'calls_saved_ratio': self.coalesced / requests if requests else 0.0
+        }
@@ -7,7 +7,7 @@ import os
 import logging
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -84,6 +84,41 @@ class DatabaseManager:
             db.session.rollback()
             raise
     
+    def save_messages(self, messages: List[Tuple[str, str, str]]) -> int:
+        """
+        Save many messages in a single transaction
+        
+        Args:
+            messages: (session_id, sender, content) tuples, in conversation order
+            
+        Returns:
+            Number of messages saved
+        """
+        try:
+            from src.models.chat_session import Message
+            from datetime import timedelta
+            
+            # Space timestamps by a microsecond so ordering by timestamp keeps list order
+            base_time = datetime.utcnow()
+            db.session.add_all([
+                Message(
+                    session_id=session_id,
+                    sender=sender,
+                    content=content,
+                    timestamp=base_time + timedelta(microseconds=index)
+                )
+                for index, (session_id, sender, content) in enumerate(messages)
+            ])
+            db.session.commit()
+            
+            logger.info(f"Saved {len(messages)} messages in bulk")
+            return len(messages)
+            
+        except Exception as e:
+            logger.error(f"Error saving messages in bulk: {str(e)}")
+            db.session.rollback()
+            raise
+    
     def get_session_messages(self, session_id: str):
         """Get all messages for a session"""
         try:
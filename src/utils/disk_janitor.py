@@ -0,0 +1,274 @@
+"""
+Disk Janitor
+Background cleanup of generated audio files with age and size budgets
+"""
+
+import os
+import time
+import hashlib
+import fnmatch
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process election, every process sweeps
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def shard_for(name: str) -> str:
+    """Two hex characters spreading files over 256 subdirectories"""
+    return hashlib.md5(name.encode('utf-8')).hexdigest()[:2]
+
+
+def sharded_path(directory: str, filename: str, shard: Optional[str] = None) -> str:
+    """
+    Build a path inside a sharded directory, creating the shard if needed
+
+    Args:
+        directory: Base directory
+        filename: File name
+        shard: Subdirectory to use (default: derived from the file name)
+
+    Returns:
+        directory/<shard>/filename
+    """
+    shard_dir = os.path.join(directory, shard or shard_for(filename))
+    os.makedirs(shard_dir, exist_ok=True)
+    return os.path.join(shard_dir, filename)
+
+
+class DirectoryPolicy:
+    """Retention rules for one directory tree"""
+
+    def __init__(self, path: str, max_age: Optional[float] = None, max_bytes: Optional[int] = None,
+                 pattern: str = '*'):
+        """
+        Initialize the policy
+
+        Args:
+            path: Directory to clean (including its subdirectories)
+            max_age: Seconds after the last modification before a file is deleted
+            max_bytes: Total size above which the oldest files are deleted
+            pattern: Only files whose name matches this glob are managed
+        """
+        self.path = path
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.pattern = pattern
+
+        self.files = 0
+        self.bytes = 0
+        self.files_deleted = 0
+        self.bytes_reclaimed = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'files': self.files,
+            'bytes': self.bytes,
+            'max_age_seconds': self.max_age,
+            'max_bytes': self.max_bytes,
+            'files_deleted': self.files_deleted,
+            'bytes_reclaimed': self.bytes_reclaimed
+        }
+
+
+class DiskJanitor:
+    """
+    Periodically enforces retention policies in a daemon thread
+
+    Each sweep deletes files older than the policy's age budget, then the
+    oldest remaining files until the tree fits its size budget.
+
+    When several server processes share the directories, only the one
+    holding an exclusive lock on ``lock_path`` sweeps; the others keep
+    trying, so another process takes over if that one exits.
+    """
+
+    def __init__(self, policies: List[DirectoryPolicy], interval: Optional[float] = None,
+                 lock_path: Optional[str] = None):
+        """
+        Initialize the janitor
+
+        Args:
+            policies: Directories to manage
+            interval: Seconds between sweeps (default: JANITOR_INTERVAL_SECONDS or 300)
+            lock_path: File locked by the sweeping process (default: JANITOR_LOCK_FILE
+                or instance/disk_janitor.lock)
+        """
+        self.policies = policies
+        self.interval = interval or float(os.getenv('JANITOR_INTERVAL_SECONDS', 300))
+        self.lock_path = lock_path or os.getenv('JANITOR_LOCK_FILE', os.path.join('instance', 'disk_janitor.lock'))
+        self._lock_file = None
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.sweeps = 0
+        self.last_sweep_at: Optional[float] = None
+        self.last_sweep_seconds = 0.0
+
+    def _scan(self, policy: DirectoryPolicy) -> List[tuple]:
+        """List (mtime, size, path) for managed files, descending one level of shards at a time"""
+        files = []
+        pending = [policy.path]
+        while pending:
+            directory = pending.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False) and fnmatch.fnmatch(entry.name, policy.pattern):
+                        stat = entry.stat(follow_symlinks=False)
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+                except FileNotFoundError:
+                    continue
+        return files
+
+    def _delete(self, policy: DirectoryPolicy, path: str, size: int) -> bool:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.warning(f"Janitor could not delete {path}: {str(e)}")
+            return False
+        policy.files_deleted += 1
+        policy.bytes_reclaimed += size
+        return True
+
+    def sweep_policy(self, policy: DirectoryPolicy):
+        """Apply one policy"""
+        files = sorted(self._scan(policy))
+        now = time.time()
+
+        kept = []
+        for mtime, size, path in files:
+            if policy.max_age and now - mtime > policy.max_age:
+                self._delete(policy, path, size)
+            else:
+                kept.append((mtime, size, path))
+
+        total = sum(size for _, size, _ in kept)
+        if policy.max_bytes:
+            # Oldest first
+            index = 0
+            while total > policy.max_bytes and index < len(kept):
+                _, size, path = kept[index]
+                if self._delete(policy, path, size):
+                    total -= size
+                index += 1
+            kept = kept[index:]
+
+        policy.files = len(kept)
+        policy.bytes = total
+
+    def sweep(self):
+        """Apply every policy once"""
+        with self._lock:
+            started = time.perf_counter()
+            reclaimed_before = sum(policy.bytes_reclaimed for policy in self.policies)
+            for policy in self.policies:
+                try:
+                    self.sweep_policy(policy)
+                except Exception as e:
+                    logger.error(f"Janitor sweep of {policy.path} failed: {str(e)}")
+
+            self.sweeps += 1
+            self.last_sweep_at = time.time()
+            self.last_sweep_seconds = time.perf_counter() - started
+            reclaimed = sum(policy.bytes_reclaimed for policy in self.policies) - reclaimed_before
+            if reclaimed:
+                logger.info(f"Janitor reclaimed {reclaimed} bytes in {self.last_sweep_seconds:.2f}s")
+
+    def _acquire_leadership(self) -> bool:
+        """Try to become the one process that sweeps"""
+        if self._lock_file is not None or fcntl is None:
+            return True
+        try:
+            directory = os.path.dirname(self.lock_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            lock_file = open(self.lock_path, 'a')
+        except OSError as e:
+            logger.warning(f"Janitor lock file unavailable, sweeping anyway: {str(e)}")
+            return True
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        # Held (and so exclusive) until this process exits
+        self._lock_file = lock_file
+        logger.info(f"Disk janitor sweeping in process {os.getpid()}")
+        return True
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lock_file is not None or fcntl is None
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._acquire_leadership():
+                self.sweep()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Start sweeping in the background"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='disk-janitor', daemon=True)
+            self._thread.start()
+            logger.info(f"Disk janitor started (every {self.interval:g}s)")
+
+    def stop(self):
+        self._stop.set()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': True,
+            'sweeping_process': self.is_leader,
+            'sweeps': self.sweeps,
+            'last_sweep_at': self.last_sweep_at,
+            'last_sweep_ms': round(self.last_sweep_seconds * 1000, 1),
+            'directories': {policy.path: policy.stats() for policy in self.policies}
+        }
+
+
+def create_disk_janitor() -> Optional[DiskJanitor]:
+    """
+    Create the janitor for generated audio unless disabled with JANITOR_ENABLED=False
+
+    Uncached TTS output (static/audio/**/tts_output_*) is kept for
+    JANITOR_AUDIO_MAX_AGE_HOURS (default 24) within JANITOR_AUDIO_MAX_BYTES
+    (default 1GB); the TTS cache's own files are left to its budget.
+    Leftover audio_files/temp_* files are removed after
+    JANITOR_TEMP_MAX_AGE_MINUTES (default 60).
+    """
+    if os.getenv('JANITOR_ENABLED', 'True').lower() != 'true':
+        return None
+
+    policies = [
+        DirectoryPolicy(
+            os.path.join('static', 'audio'),
+            max_age=float(os.getenv('JANITOR_AUDIO_MAX_AGE_HOURS', 24)) * 3600,
+            max_bytes=int(os.getenv('JANITOR_AUDIO_MAX_BYTES', 1024 * 1024 * 1024)),
+            pattern='tts_output_*'
+        ),
+        DirectoryPolicy(
+            'audio_files',
+            max_age=float(os.getenv('JANITOR_TEMP_MAX_AGE_MINUTES', 60)) * 60,
+            pattern='temp_*'
+        ),
+    ]
+    return DiskJanitor(policies)
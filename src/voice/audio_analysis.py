@@ -0,0 +1,160 @@
+"""
+Audio Analysis
+Vectorized NumPy helpers for measuring PCM16 audio
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Default analysis frame length in milliseconds
+FRAME_MS = 30
+
+
+def pcm_to_samples(pcm: bytes) -> np.ndarray:
+    """View little-endian PCM16 bytes as an int16 array (no copy)"""
+    usable = len(pcm) - len(pcm) % 2
+    return np.frombuffer(memoryview(pcm)[:usable], dtype='<i2')
+
+
+def frame_samples(samples: np.ndarray, sample_rate: int, frame_ms: int = FRAME_MS) -> np.ndarray:
+    """Split samples into a 2-D array of whole frames (the trailing partial frame is dropped)"""
+    frame_length = max(1, int(sample_rate * frame_ms / 1000))
+    frame_count = len(samples) // frame_length
+    return samples[:frame_count * frame_length].reshape(frame_count, frame_length)
+
+
+def frame_rms(samples: np.ndarray, sample_rate: int, frame_ms: int = FRAME_MS) -> np.ndarray:
+    """
+    Compute the RMS energy of every frame in one pass
+
+    Uses the same scale as speech_recognition's energy threshold (RMS of
+    raw 16-bit sample values).
+    """
+    frames = frame_samples(samples, sample_rate, frame_ms).astype(np.float32)
+    if not len(frames):
+        return np.zeros(0, dtype=np.float32)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+def estimate_energy_threshold(energies: np.ndarray, percentile: float = 15.0,
+                              ratio: float = 1.5, minimum: float = 50.0,
+                              max_noise_floor: float = 300.0) -> float:
+    """
+    Derive a speech energy threshold from the noise floor of a clip
+
+    The quietest frames approximate the background noise; the threshold sits
+    ``ratio`` times above that level, like the recognizer's dynamic mode.
+    A clip with no quiet section (a held tone, speech from start to end)
+    has no noise floor to measure, so the estimate is capped at
+    ``max_noise_floor`` and loud audio still clears the threshold.
+
+    Args:
+        energies: Per-frame RMS energies
+        percentile: Percentile of frame energies treated as the noise floor
+        ratio: Multiplier applied to the noise floor
+        minimum: Lowest threshold returned, for digitally silent input
+        max_noise_floor: Highest noise level assumed, on the same scale as the energies
+
+    Returns:
+        Energy threshold
+    """
+    if not len(energies):
+        return minimum
+    noise_floor = min(float(np.percentile(energies, percentile)), max_noise_floor)
+    return max(noise_floor * ratio, minimum)
+
+
+def zero_crossing_rate(samples: np.ndarray, sample_rate: int, frame_ms: int = FRAME_MS) -> np.ndarray:
+    """Compute the fraction of adjacent sample pairs that change sign in every frame"""
+    frames = frame_samples(samples, sample_rate, frame_ms)
+    if not len(frames) or frames.shape[1] < 2:
+        return np.zeros(len(frames), dtype=np.float32)
+    signs = np.signbit(frames)
+    return np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+
+def speech_frames(energies: np.ndarray, crossings: np.ndarray, threshold: float,
+                  max_zcr: float = 0.5) -> np.ndarray:
+    """
+    Classify frames as speech
+
+    A frame is speech when its energy clears the threshold and its
+    zero-crossing rate is below that of broadband noise (hiss, clicks and
+    wind sit close to 0.5, while voiced speech is far lower).
+
+    Returns:
+        Boolean mask with one entry per frame
+    """
+    return (energies >= threshold) & (crossings < max_zcr)
+
+
+def speech_bounds(is_speech: np.ndarray, frame_length: int, total_samples: int,
+                  min_speech_frames: int = 3, padding_frames: int = 7) -> Optional[Tuple[int, int]]:
+    """
+    Find the sample range spanning all speech in a clip
+
+    Args:
+        is_speech: Per-frame speech mask
+        frame_length: Samples per frame
+        total_samples: Samples in the clip
+        min_speech_frames: Fewest speech frames for the clip to count as speech
+        padding_frames: Frames kept on either side so soft onsets and endings survive
+
+    Returns:
+        (start, end) sample offsets, or None if the clip holds no speech
+    """
+    indices = np.flatnonzero(is_speech)
+    if len(indices) < min_speech_frames:
+        return None
+
+    start = max(0, int(indices[0]) - padding_frames) * frame_length
+    end = min(total_samples, (int(indices[-1]) + 1 + padding_frames) * frame_length)
+    return start, end
+
+
+def split_at_silence(is_speech: np.ndarray, energies: np.ndarray, max_segment_frames: int,
+                     min_silence_frames: int = 10) -> List[Tuple[int, int]]:
+    """
+    Split a clip into segments of at most ``max_segment_frames`` frames
+
+    Segments end in the middle of the latest silence run (at least
+    ``min_silence_frames`` long) that fits; where speech runs on with no such
+    pause, the cut falls on the quietest frame of the segment's second half.
+
+    Args:
+        is_speech: Per-frame speech mask
+        energies: Per-frame RMS energies
+        max_segment_frames: Longest segment in frames
+        min_silence_frames: Shortest pause treated as a boundary
+
+    Returns:
+        (start, end) frame ranges covering the clip in order
+    """
+    total = len(is_speech)
+    if total <= max_segment_frames:
+        return [(0, total)]
+
+    # Midpoints of every long enough silence run, found in one pass
+    padded = np.concatenate(([False], ~is_speech.astype(bool), [False]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    run_starts, run_ends = edges[0::2], edges[1::2]
+    long_runs = (run_ends - run_starts) >= min_silence_frames
+    cut_points = ((run_starts[long_runs] + run_ends[long_runs]) // 2).astype(int)
+
+    segments = []
+    start = 0
+    while total - start > max_segment_frames:
+        limit = start + max_segment_frames
+        candidates = cut_points[(cut_points > start) & (cut_points <= limit)]
+        if len(candidates):
+            cut = int(candidates[-1])
+        else:
+            half = start + max_segment_frames // 2
+            cut = half + int(np.argmin(energies[half:limit]))
+            cut = max(cut, start + 1)
+        segments.append((start, cut))
+        start = cut
+
+    segments.append((start, total))
+    return segments
@@ -0,0 +1,314 @@
+"""
+Audio Decoder
+Decodes uploaded audio to raw PCM in memory, reading WAV directly and piping
+everything else through ffmpeg
+"""
+
+import os
+import math
+import mmap
+import shutil
+import struct
+import threading
+import subprocess
+import logging
+from typing import BinaryIO, List, NamedTuple, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Format expected by the speech recognizer: 16kHz, mono, 16-bit little-endian PCM
+TARGET_SAMPLE_RATE = 16000
+TARGET_SAMPLE_WIDTH = 2
+
+# Bytes fed to ffmpeg per write when decoding from a stream
+PIPE_CHUNK_SIZE = 64 * 1024
+
+# WAV format tags read without ffmpeg
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class AudioDecodeError(Exception):
+    """Raised when audio cannot be decoded"""
+
+
+class AudioTooLongError(Exception):
+    """Raised when audio is longer than the allowed duration"""
+
+    def __init__(self, limit: float, duration: Optional[float] = None):
+        message = f"Audio longer than {limit:g}s"
+        if duration is not None:
+            message += f" ({duration:.1f}s)"
+        super().__init__(message)
+        self.limit = limit
+        self.duration = duration
+
+
+def ffmpeg_binary() -> str:
+    """Locate the ffmpeg executable (FFMPEG_BINARY overrides the PATH lookup)"""
+    return os.getenv('FFMPEG_BINARY') or shutil.which('ffmpeg') or 'ffmpeg'
+
+
+def decode_command(sample_rate: int = TARGET_SAMPLE_RATE, max_seconds: Optional[float] = None) -> List[str]:
+    """Build the ffmpeg command decoding stdin to mono PCM16 on stdout"""
+    # Stop decoding after max_seconds of output
+    limit = ['-t', f"{max_seconds:.3f}"] if max_seconds else []
+    return [
+        ffmpeg_binary(), '-hide_banner', '-loglevel', 'error',
+        '-i', 'pipe:0',
+        *limit,
+        '-f', 's16le', '-acodec', 'pcm_s16le',
+        '-ar', str(sample_rate), '-ac', '1',
+        '-flush_packets', '1',
+        'pipe:1'
+    ]
+
+
+def _feed(stdin, source: Union[bytes, BinaryIO]):
+    """Write the input to ffmpeg's stdin, then close it"""
+    try:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            stdin.write(source)
+        else:
+            while True:
+                chunk = source.read(PIPE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                stdin.write(chunk)
+    except (BrokenPipeError, ValueError):
+        # ffmpeg stopped reading (bad input or enough data); its exit status tells why
+        pass
+    finally:
+        try:
+            stdin.close()
+        except OSError:
+            pass
+
+
+def decode_to_pcm(source: Union[bytes, BinaryIO], sample_rate: int = TARGET_SAMPLE_RATE,
+                  timeout: Optional[float] = None, max_duration: Optional[float] = None) -> bytes:
+    """
+    Decode audio to mono 16-bit PCM without touching the filesystem
+
+    Args:
+        source: Encoded audio as bytes or a readable binary stream
+        sample_rate: Output sample rate
+        timeout: Seconds to wait for ffmpeg (default: AUDIO_DECODE_TIMEOUT or 30)
+        max_duration: Longest accepted audio in seconds; decoding stops just
+            past it instead of decoding the whole clip
+
+    Returns:
+        Raw little-endian PCM16 samples
+
+    Raises:
+        AudioDecodeError: If ffmpeg is missing or fails to decode the input
+        AudioTooLongError: If the audio is longer than max_duration
+    """
+    timeout = timeout or float(os.getenv('AUDIO_DECODE_TIMEOUT', 30))
+    # Decode one extra second so an overlong clip is recognisable as such
+    command = decode_command(sample_rate, max_duration + 1 if max_duration else None)
+
+    try:
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as e:
+        raise AudioDecodeError(f"Could not start ffmpeg: {str(e)}")
+
+    # Feed stdin and drain stderr on helper threads so no pipe can fill up and block
+    errors = []
+    feeder = threading.Thread(target=_feed, args=(process.stdin, source), daemon=True)
+    drainer = threading.Thread(target=lambda: errors.append(process.stderr.read()), daemon=True)
+    feeder.start()
+    drainer.start()
+
+    timer = threading.Timer(timeout, process.kill)
+    timer.start()
+    try:
+        pcm = process.stdout.read()
+        process.wait()
+    finally:
+        timer.cancel()
+        feeder.join()
+        drainer.join()
+        process.stdout.close()
+        process.stderr.close()
+
+    if process.returncode != 0:
+        message = errors[0].decode('utf-8', 'replace').strip() if errors and errors[0] else ''
+        raise AudioDecodeError(f"ffmpeg exited with status {process.returncode}: {message[-500:]}")
+
+    if not pcm:
+        raise AudioDecodeError("No audio decoded")
+
+    if max_duration and len(pcm) > max_duration * sample_rate * TARGET_SAMPLE_WIDTH:
+        raise AudioTooLongError(max_duration)
+
+    return pcm
+
+
+class WavInfo(NamedTuple):
+    """Layout of a RIFF/WAVE file"""
+    audio_format: int
+    channels: int
+    sample_rate: int
+    sample_width: int
+    data_offset: int
+    data_length: int
+
+
+def parse_wav_header(data: Union[bytes, memoryview, mmap.mmap]) -> Optional[WavInfo]:
+    """
+    Read the format and data location of a WAV file without decoding it
+
+    Returns:
+        WavInfo, or None if the data is not a WAV file this module can read
+        (including malformed or truncated headers, which are left to ffmpeg)
+    """
+    if len(data) < 12 or data[0:4] != b'RIFF' or data[8:12] != b'WAVE':
+        return None
+
+    fmt = None
+    position = 12
+    while position + 8 <= len(data):
+        chunk_id = bytes(data[position:position + 4])
+        chunk_size = struct.unpack_from('<I', data, position + 4)[0]
+        body = position + 8
+
+        if chunk_id == b'fmt ' and chunk_size >= 16:
+            if body + chunk_size > len(data):
+                # Truncated format chunk
+                return None
+            audio_format, channels, sample_rate, _, _, bits = struct.unpack_from('<HHIIHH', data, body)
+            if audio_format == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40:
+                # The real format is the first field of the sub-format GUID
+                audio_format = struct.unpack_from('<H', data, body + 24)[0]
+            fmt = (audio_format, channels, sample_rate, bits // 8)
+
+        elif chunk_id == b'data':
+            if fmt is None:
+                return None
+            # Streamed WAVs may leave the size unset; take whatever follows
+            length = min(chunk_size, len(data) - body)
+            audio_format, channels, sample_rate, sample_width = fmt
+            if not channels or not sample_rate or not sample_width:
+                return None
+            length -= length % (channels * sample_width)
+            return WavInfo(audio_format, channels, sample_rate, sample_width, body, length)
+
+        position = body + chunk_size + (chunk_size & 1)
+
+    return None
+
+
+def _samples_as_float(raw: Union[bytes, memoryview], info: WavInfo) -> Optional[np.ndarray]:
+    """Convert interleaved WAV samples to float32 on the PCM16 scale"""
+    width = info.sample_width
+    if info.audio_format == WAVE_FORMAT_PCM:
+        if width == 1:
+            return (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) * 256
+        if width == 2:
+            return np.frombuffer(raw, dtype='<i2').astype(np.float32)
+        if width == 3:
+            triples = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            values = triples[:, 0] | (triples[:, 1] << 8) | (triples[:, 2] << 16)
+            values = np.where(values & 0x800000, values - 0x1000000, values)
+            return values.astype(np.float32) / 256
+        if width == 4:
+            return np.frombuffer(raw, dtype='<i4').astype(np.float32) / 65536
+    elif info.audio_format == WAVE_FORMAT_IEEE_FLOAT and width in (4, 8):
+        values = np.frombuffer(raw, dtype='<f4' if width == 4 else '<f8')
+        return np.clip(values, -1.0, 1.0).astype(np.float32) * 32767
+    return None
+
+
+def resample(samples: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    """
+    Resample mono float samples by linear interpolation
+
+    When downsampling, a moving average over one output period first
+    removes most content above the new Nyquist frequency.
+    """
+    if source_rate == target_rate or not len(samples):
+        return samples
+    ratio = source_rate / target_rate
+    if ratio > 1:
+        width = int(math.ceil(ratio))
+        samples = np.convolve(samples, np.full(width, 1.0 / width, dtype=np.float32), mode='same')
+    count = int(round(len(samples) / ratio))
+    positions = np.arange(count, dtype=np.float64) * ratio
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def wav_duration(info: WavInfo) -> float:
+    """Duration of a WAV file's data chunk in seconds"""
+    return info.data_length / (info.sample_rate * info.channels * info.sample_width)
+
+
+def wav_to_pcm(data: Union[bytes, memoryview, mmap.mmap], sample_rate: int = TARGET_SAMPLE_RATE,
+               max_duration: Optional[float] = None) -> Optional[Union[bytes, memoryview]]:
+    """
+    Get mono PCM16 at ``sample_rate`` from a WAV file without ffmpeg
+
+    WAVs already in the target format are returned as a zero-copy view of
+    their data chunk. Other PCM or float WAVs are downmixed and resampled
+    in NumPy.
+
+    Args:
+        data: Complete WAV file contents
+        sample_rate: Output sample rate
+        max_duration: Longest accepted audio in seconds, checked from the header
+
+    Returns:
+        PCM16 samples, or None if the data is not a WAV this path can handle
+        (compressed WAVs still go through ffmpeg)
+
+    Raises:
+        AudioTooLongError: If the audio is longer than max_duration
+    """
+    info = parse_wav_header(data)
+    if info is None or not info.data_length:
+        return None
+
+    if max_duration and wav_duration(info) > max_duration:
+        raise AudioTooLongError(max_duration, wav_duration(info))
+
+    raw = memoryview(data)[info.data_offset:info.data_offset + info.data_length]
+    if info.audio_format == WAVE_FORMAT_PCM and info.channels == 1 \
+            and info.sample_width == TARGET_SAMPLE_WIDTH and info.sample_rate == sample_rate:
+        return raw
+
+    samples = _samples_as_float(raw, info)
+    if samples is None:
+        return None
+    if info.channels > 1:
+        samples = samples.reshape(-1, info.channels).mean(axis=1)
+    samples = resample(samples, info.sample_rate, sample_rate)
+    return np.clip(np.round(samples), -32768, 32767).astype('<i2').tobytes()
+
+
+def read_wav_file(path: str, sample_rate: int = TARGET_SAMPLE_RATE,
+                  max_duration: Optional[float] = None) -> Optional[bytes]:
+    """
+    Read mono PCM16 from a WAV file on disk via a memory map
+
+    Returns:
+        PCM16 samples, or None if the file is not a WAV this path can handle
+
+    Raises:
+        AudioTooLongError: If the audio is longer than max_duration
+    """
+    try:
+        with open(path, 'rb') as wav_file, mmap.mmap(wav_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            pcm = wav_to_pcm(mapped, sample_rate, max_duration)
+            if pcm is None:
+                return None
+            # Copy out before the map closes
+            result = bytes(pcm)
+            if isinstance(pcm, memoryview):
+                pcm.release()
+            return result
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not map WAV file {path}: {str(e)}")
+        return None
@@ -0,0 +1,172 @@
+"""
+Recognition Strategy
+Runs speech recognition candidates sequentially, in parallel or hedged
+"""
+
+import os
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import speech_recognition as sr
+
+logger = logging.getLogger(__name__)
+
+# A named recognition attempt returning raw recognizer output
+Candidate = Tuple[str, Callable[[], Any]]
+
+POLICIES = ('sequential', 'parallel', 'hedged')
+
+
+def clean_transcript(text: Any) -> Optional[str]:
+    """Normalize recognizer output to a stripped string, or None if empty"""
+    if text is None:
+        return None
+    text = text if isinstance(text, str) else str(text)
+    return text.strip() or None
+
+
+class RecognitionStrategy:
+    """
+    Picks the first non-empty transcription from a list of candidates
+
+    sequential tries candidates one after another; parallel starts them all
+    at once; hedged starts the next candidate whenever the running ones have
+    not produced a result within ``hedge_delay`` seconds (or as soon as one
+    fails). Once a winner is found, queued attempts are cancelled and
+    attempts already in flight are ignored.
+    """
+
+    def __init__(self, policy: Optional[str] = None, hedge_delay: Optional[float] = None,
+                 max_workers: Optional[int] = None):
+        """
+        Initialize the recognition strategy
+
+        Args:
+            policy: sequential, parallel or hedged (default: STT_RECOGNITION_POLICY or hedged)
+            hedge_delay: Seconds before the next candidate starts (default: STT_HEDGE_DELAY_MS / 1000 or 1.5)
+            max_workers: Threads shared by all recognitions (default: STT_MAX_WORKERS or 8)
+        """
+        self.policy = (policy or os.getenv('STT_RECOGNITION_POLICY', 'hedged')).lower()
+        if self.policy not in POLICIES:
+            raise ValueError(f"Unknown recognition policy: {self.policy}")
+
+        if hedge_delay is None:
+            hedge_delay = float(os.getenv('STT_HEDGE_DELAY_MS', 1500)) / 1000
+        self.hedge_delay = hedge_delay
+        self.max_workers = max_workers or int(os.getenv('STT_MAX_WORKERS', 8))
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        self.recognitions = 0
+        self.attempts = 0
+        self.wins: Dict[str, int] = {}
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Thread pool shared by all recognitions, created on first use"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='stt')
+            return self._executor
+
+    def _start_delay(self) -> Optional[float]:
+        """Seconds to wait for a result before starting the next candidate"""
+        if self.policy == 'parallel':
+            return 0.0
+        if self.policy == 'sequential':
+            return None
+        return self.hedge_delay
+
+    def _attempt(self, name: str, func: Callable[[], Any]) -> Optional[str]:
+        """Run one candidate, logging the usual recognition failures"""
+        try:
+            return clean_transcript(func())
+        except sr.UnknownValueError:
+            logger.warning(f"{name} could not understand audio")
+        except sr.RequestError as e:
+            logger.warning(f"{name} service error: {str(e)}")
+        except AttributeError as e:
+            logger.warning(f"{name} returned non-string that can't be processed: {e}")
+        return None
+
+    def run(self, candidates: List[Candidate]) -> Optional[str]:
+        """
+        Run candidates according to the policy
+
+        Args:
+            candidates: (name, callable) pairs in order of preference
+
+        Returns:
+            First non-empty transcription, or None if every candidate failed
+        """
+        self.recognitions += 1
+        if self.policy == 'sequential':
+            # No thread hand-off needed when nothing overlaps
+            for name, func in candidates:
+                self.attempts += 1
+                text = self._attempt(name, func)
+                if text:
+                    return self._won(name, text)
+            return None
+
+        delay = self._start_delay()
+        pending: Dict[Future, str] = {}
+        queue = list(candidates)
+
+        def start_next():
+            name, func = queue.pop(0)
+            self.attempts += 1
+            pending[self.executor.submit(self._attempt, name, func)] = name
+
+        try:
+            start_next()
+            while pending:
+                if queue and delay == 0:
+                    start_next()
+                    continue
+
+                done, _ = wait(list(pending), timeout=delay if queue else None,
+                               return_when=FIRST_COMPLETED)
+                if not done:
+                    # Running attempts are slow; hedge with the next candidate
+                    start_next()
+                    continue
+
+                for future in done:
+                    name = pending.pop(future)
+                    text = future.result()
+                    if text:
+                        return self._won(name, text)
+
+                # A candidate failed; move on without waiting for the delay
+                if queue:
+                    start_next()
+            return None
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _won(self, name: str, text: str) -> str:
+        self.wins[name] = self.wins.get(name, 0) + 1
+        logger.info(f"Successfully transcribed with {name}: {text}")
+        return text
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'policy': self.policy,
+            'hedge_delay_ms': round(self.hedge_delay * 1000),
+            'recognitions': self.recognitions,
+            'attempts': self.attempts,
+            'wins': dict(self.wins)
+        }
+
+    def shutdown(self):
+        """Stop the thread pool without waiting for abandoned attempts"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
@@ -4,22 +4,37 @@ Handles speech-to-text and text-to-speech functionality
 """
 
 import os
+import time
 import speech_recognition as sr
-from gtts import gTTS
-import pygame
-from pydub import AudioSegment
 import tempfile
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+from src.voice.audio_analysis import (
+    FRAME_MS, estimate_energy_threshold, frame_rms, pcm_to_samples,
+    speech_bounds, speech_frames, split_at_silence, zero_crossing_rate
+)
+from src.voice.audio_decoder import (
+    AudioDecodeError, AudioTooLongError, TARGET_SAMPLE_RATE, TARGET_SAMPLE_WIDTH, decode_to_pcm, read_wav_file, wav_to_pcm
+)
+from src.voice.recognition import RecognitionStrategy
+from src.voice.stt_backends import STTRouter
+from src.voice.transcoder import Transcoder, TranscoderBusyError
+from src.voice.transcription_cache import create_transcription_cache
+from src.voice.tts_cache import TTSCache, create_tts_cache, tts_key
+from src.voice.tts_streaming import StreamingTTS
+from src.utils.disk_janitor import sharded_path
 
 logger = logging.getLogger(__name__)
 
 class SpeechProcessor:
     """Handles speech recognition and text-to-speech conversion"""
     
-    def _configure_audio_environment(self):
-        """Configure audio environment to avoid errors"""
+    def _configure_audio_environment(self) -> bool:
+        """Configure audio environment to avoid errors; returns whether playback is available"""
         # Hide pygame welcome message
         os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
         
@@ -39,37 +54,98 @@ class SpeechProcessor:
             except Exception as e:
                 logger.warning(f"Error during audio environment check: {e}")
         
+        return self._init_mixer()
+    
+    def _init_mixer(self) -> bool:
+        """Initialize the pygame mixer once, falling back to the dummy driver"""
+        if self._mixer_ready:
+            return True
+        
         # Configure pygame audio with error handling
         try:
             import pygame
-            pygame.mixer.init(frequency=int(os.getenv('SAMPLE_RATE', 16000)), size=-16, channels=1)
+            pygame.mixer.init(frequency=self.sample_rate, size=-16, channels=1)
             logger.info("Pygame mixer initialized successfully")
+            self._mixer_ready = True
         except Exception as e:
             logger.warning(f"Pygame mixer initialization failed: {e}")
             logger.info("Trying with dummy driver...")
             try:
+                import pygame
                 os.environ['SDL_AUDIODRIVER'] = 'dummy'
-                pygame.mixer.init(frequency=int(os.getenv('SAMPLE_RATE', 16000)), size=-16, channels=1)
+                pygame.mixer.init(frequency=self.sample_rate, size=-16, channels=1)
                 logger.info("Pygame mixer initialized with dummy driver")
+                self._mixer_ready = True
             except Exception as dummy_error:
                 logger.error(f"Pygame mixer initialization failed with dummy driver: {dummy_error}")
+                logger.info("Text-to-speech audio playback may not work properly")
+        
+        return self._mixer_ready
     
-    def __init__(self):
-        """Initialize the speech processor"""
-        # Configure audio environment first to avoid errors
-        self._configure_audio_environment()
+    def __init__(self, server_mode: Optional[bool] = None):
+        """
+        Initialize the speech processor
         
-        # Initialize speech recognition
-        self.recognizer = sr.Recognizer()
-        self.microphone = None
-        self.microphone_available = False
+        Args:
+            server_mode: Headless mode for web servers: skip the pygame mixer,
+                microphone discovery and calibration, and import playback and
+                TTS libraries only when used (default: SPEECH_SERVER_MODE or False)
+        """
+        started = time.perf_counter()
+        if server_mode is None:
+            server_mode = os.getenv('SPEECH_SERVER_MODE', 'False').lower() == 'true'
+        self.server_mode = server_mode
+        self._mixer_ready = False
         
         # Audio configuration
         self.sample_rate = int(os.getenv('SAMPLE_RATE', 16000))
         self.chunk_size = int(os.getenv('CHUNK_SIZE', 1024))
         self.audio_format = os.getenv('AUDIO_FORMAT', 'wav')
         
+        # Longest clip accepted for transcription in seconds (0 disables the cap)
+        self.max_audio_duration = float(os.getenv('AUDIO_MAX_DURATION', 30))
+        
+        # Configure audio environment first to avoid errors
+        if not server_mode:
+            self._configure_audio_environment()
+        
+        # Initialize speech recognition
+        self.recognizer = sr.Recognizer()
+        self.recognition = RecognitionStrategy()
+        self.stt_router = STTRouter(self.recognizer, self.recognition)
+        self.transcription_cache = create_transcription_cache()
+        
+        # Caps concurrent ffmpeg processes; excess uploads are rejected, not queued forever
+        self.transcoder = Transcoder()
+        
+        # Text-to-speech output is cached on disk by content (created on first use)
+        self.tts_engine = os.getenv('TTS_PROVIDER', 'gtts')
+        self._tts_cache: Optional[TTSCache] = None
+        self._tts_cache_checked = False
+        self._tts_cache_lock = threading.Lock()
+        
+        # Long replies are spoken sentence by sentence, synthesized concurrently
+        self.tts_stream = StreamingTTS(self.text_to_speech)
+        
+        # Long clips are split at pauses and the segments transcribed concurrently
+        self.segment_seconds = float(os.getenv('STT_SEGMENT_SECONDS', 15))
+        self.segment_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('STT_SEGMENT_WORKERS', 4)),
+            thread_name_prefix='stt-segment'
+        )
+        self.microphone = None
+        self.microphone_available = False
+        
         # Try to initialize microphone (optional for voice features)
+        if not server_mode:
+            self._init_microphone()
+        
+        self.startup_seconds = time.perf_counter() - started
+        mode = "server mode" if server_mode else "device mode"
+        logger.info(f"Speech processor initialized in {self.startup_seconds * 1000:.1f} ms ({mode})")
+    
+    def _init_microphone(self):
+        """Find and calibrate a local microphone"""
         try:
             # List available microphones before attempting to use them
             try:
@@ -89,26 +165,9 @@ class SpeechProcessor:
             logger.warning(f"Microphone initialization error: {str(e)}")
             logger.info("Voice recording disabled - text-to-speech still available")
         
-        # Initialize pygame mixer for audio playback with explicit fallback options
-        try:
-            # Try different driver options if available
-            try:
-                pygame.mixer.init(frequency=self.sample_rate, size=-16, channels=1)
-                logger.info("Pygame mixer initialized with default driver")
-            except:
-                # Try with dummy driver if normal initialization fails
-                os.environ['SDL_AUDIODRIVER'] = 'dummy'
-                pygame.mixer.init(frequency=self.sample_rate, size=-16, channels=1)
-                logger.info("Pygame mixer initialized with dummy driver")
-        except Exception as e:
-            logger.warning(f"Audio playback initialization failed: {str(e)}")
-            logger.info("Text-to-speech audio playback may not work properly")
-        
         # Calibrate microphone if available
         if self.microphone_available:
             self._calibrate_microphone()
-        
-        logger.info("Speech processor initialized")
     
     def _calibrate_microphone(self):
         """Calibrate microphone for ambient noise"""
@@ -147,27 +206,41 @@ class SpeechProcessor:
             logger.error(f"Speech-to-text error: {str(e)}")
             return None
     
-    def _transcribe_audio_file(self, audio_file_path: str) -> Optional[str]:
+    def _transcribe_audio_file(self, audio_file_path: str, routing: Optional[str] = None) -> Optional[str]:
         """Transcribe an audio file"""
         try:
             logger.info(f"Transcribing audio file: {audio_file_path}")
             
+            # WAV files are memory-mapped and read without ffmpeg
+            pcm = read_wav_file(audio_file_path, max_duration=self.max_audio_duration)
+            if pcm is not None:
+                speech, threshold = self._trim_silence(pcm, TARGET_SAMPLE_RATE)
+                return self._recognize_pcm(speech, TARGET_SAMPLE_RATE, routing, threshold) if speech else None
+            
+            from pydub import AudioSegment
+            
             # Convert audio to supported format if needed
             try:
                 # Try to load the audio file
-                audio_segment = AudioSegment.from_file(audio_file_path)
+                audio_segment = self.transcoder.run(AudioSegment.from_file, audio_file_path)
+            except TranscoderBusyError:
+                raise
             except Exception as e:
                 logger.warning(f"Failed to load with pydub: {str(e)}, trying direct WAV")
                 # If pydub fails, try direct processing for WAV files
                 if audio_file_path.endswith('.wav'):
-                    return self._transcribe_wav_directly(audio_file_path)
+                    return self._transcribe_wav_directly(audio_file_path, routing)
                 else:
                     raise e
             
+            if self.max_audio_duration and len(audio_segment) / 1000 > self.max_audio_duration:
+                raise AudioTooLongError(self.max_audio_duration, len(audio_segment) / 1000)
+            
             # Convert to wav format for speech recognition
             with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
                 # Export with specific parameters for better recognition
-                audio_segment.export(
+                self.transcoder.run(
+                    audio_segment.export,
                     temp_file.name, 
                     format="wav", 
                     parameters=[
@@ -178,65 +251,306 @@ class SpeechProcessor:
                 )
                 
                 # Transcribe the audio
-                transcription = self._transcribe_wav_directly(temp_file.name)
+                transcription = self._transcribe_wav_directly(temp_file.name, routing)
                 
                 # Clean up temp file
                 os.unlink(temp_file.name)
                 
                 return transcription
                 
+        except (TranscoderBusyError, AudioTooLongError):
+            raise
         except Exception as e:
             logger.error(f"Audio transcription error: {str(e)}")
             return None
     
-    def _transcribe_wav_directly(self, wav_path: str) -> Optional[str]:
+    def transcribe_bytes(self, audio: Union[bytes, BinaryIO], file_ext: str = 'webm',
+                         routing: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Transcribe uploaded audio entirely in memory
+        
+        The upload is converted to raw 16kHz mono PCM16 and handed to the
+        recognizer as AudioData, so nothing is written to disk. WAV uploads
+        are read directly (16kHz mono PCM16 is used as-is, other WAVs are
+        converted in NumPy); everything else is piped through ffmpeg.
+        
+        Args:
+            audio: Encoded audio as bytes or a readable binary stream
+            file_ext: Extension of the uploaded file (used only for the fallback path)
+            routing: STT routing rule for this request (default: STT_ROUTING)
+            
+        Returns:
+            Dictionary with 'text' (transcription or None), 'duration' in seconds
+            and 'speech_detected' (False for silent clips, None if not analysed);
+            results served from the transcription cache also have 'cached': True
+            
+        Raises:
+            TranscoderBusyError: If the transcoding queue is full
+            AudioTooLongError: If the clip is longer than AUDIO_MAX_DURATION
+        """
+        result = {'text': None, 'duration': None, 'speech_detected': None}
+        
+        # Byte-identical uploads (client retries, replayed prompts) skip decoding entirely
+        cache = self.transcription_cache
+        signature = self.stt_router.signature(routing) if cache else None
+        raw_key = None
+        if cache and isinstance(audio, (bytes, bytearray)):
+            raw_key = cache.raw_key(audio, signature)
+            cached = cache.get_raw(raw_key)
+            if cached is not None:
+                logger.info("Transcription served from cache (upload hash)")
+                return cached
+        
+        # WAV needs no subprocess at all
+        max_duration = self.max_audio_duration or None
+        pcm = wav_to_pcm(audio, max_duration=max_duration) if isinstance(audio, (bytes, bytearray)) else None
+        if pcm is not None:
+            logger.debug("WAV upload read without transcoding")
+        else:
+            try:
+                pcm = self.transcoder.run(decode_to_pcm, audio, max_duration=max_duration)
+            except AudioDecodeError as e:
+                # Some containers (e.g. MP4 with a trailing index) cannot be decoded from a pipe
+                logger.warning(f"In-memory decode failed: {str(e)}, falling back to a temporary file")
+                if not isinstance(audio, (bytes, bytearray)):
+                    if not audio.seekable():
+                        return result
+                    audio.seek(0)
+                    audio = audio.read()
+                result['text'] = self._transcribe_via_temp_file(bytes(audio), file_ext, routing)
+                return result
+        
+        result['duration'] = len(pcm) / (TARGET_SAMPLE_RATE * TARGET_SAMPLE_WIDTH)
+        logger.info(f"Decoded {result['duration']:.2f}s of audio in memory")
+        
+        # The same audio in another container or encoding still skips recognition
+        pcm_key = None
+        if cache:
+            pcm_key = cache.pcm_key(pcm, signature)
+            cached = cache.get_pcm(pcm_key)
+            if cached is not None:
+                logger.info("Transcription served from cache (audio hash)")
+                cache.set(cached, raw_key)
+                return cached
+        
+        speech, threshold = self._trim_silence(pcm, TARGET_SAMPLE_RATE)
+        result['speech_detected'] = speech is not None
+        if speech is not None:
+            result['text'] = self._recognize_pcm(speech, TARGET_SAMPLE_RATE, routing, threshold)
+        
+        if cache:
+            cache.set(result, raw_key, pcm_key)
+        return result
+    
+    def _energy_threshold(self, energies) -> float:
+        """Estimate the speech energy threshold of a clip from its per-frame energies"""
+        return estimate_energy_threshold(
+            energies,
+            percentile=float(os.getenv('NOISE_FLOOR_PERCENTILE', 15)),
+            ratio=self.recognizer.dynamic_energy_ratio,
+            max_noise_floor=float(os.getenv('NOISE_FLOOR_MAX', 300))
+        )
+    
+    def _trim_silence(self, pcm: bytes, sample_rate: int) -> Tuple[Optional[bytes], float]:
+        """
+        Trim leading and trailing non-speech from PCM16 audio
+        
+        The energy threshold comes from the clip's own noise floor (the whole
+        clip is analysed in one vectorized pass, unlike adjust_for_ambient_noise,
+        which consumes audio). Frames are classed as speech by energy and
+        zero-crossing rate.
+        
+        Args:
+            pcm: Mono PCM16 audio (bytes or a buffer such as a memoryview)
+            sample_rate: Sample rate of the audio
+            
+        Returns:
+            Tuple of (the speech portion of the audio, or None if it contains
+            no speech; the clip's energy threshold)
+        """
+        samples = pcm_to_samples(pcm)
+        energies = frame_rms(samples, sample_rate)
+        threshold = self._energy_threshold(energies)
+        
+        if os.getenv('VAD_ENABLED', 'True').lower() != 'true':
+            return bytes(pcm), threshold
+        
+        frame_length = max(1, int(sample_rate * FRAME_MS / 1000))
+        is_speech = speech_frames(
+            energies,
+            zero_crossing_rate(samples, sample_rate),
+            threshold,
+            max_zcr=float(os.getenv('VAD_MAX_ZCR', 0.5))
+        )
+        bounds = speech_bounds(
+            is_speech, frame_length, len(samples),
+            min_speech_frames=max(1, int(os.getenv('VAD_MIN_SPEECH_MS', 90)) // FRAME_MS),
+            padding_frames=int(os.getenv('VAD_PADDING_MS', 210)) // FRAME_MS
+        )
+        
+        if bounds is None:
+            logger.info(f"No speech detected (energy threshold {threshold:.1f}), skipping recognition")
+            return None, threshold
+        
+        start, end = bounds
+        logger.debug(f"Speech from {start / sample_rate:.2f}s to {end / sample_rate:.2f}s "
+                     f"of {len(samples) / sample_rate:.2f}s (energy threshold {threshold:.1f})")
+        return samples[start:end].tobytes(), threshold
+    
+    def transcribe_pcm(self, pcm: bytes, sample_rate: int = TARGET_SAMPLE_RATE,
+                       routing: Optional[str] = None) -> Optional[str]:
+        """
+        Transcribe mono PCM16 speech that has already been decoded and trimmed
+        
+        Args:
+            pcm: Raw little-endian PCM16 samples
+            sample_rate: Sample rate of the audio
+            routing: STT routing rule for this request (default: STT_ROUTING)
+            
+        Returns:
+            Transcribed text or None if failed
+        """
+        return self._recognize_pcm(pcm, sample_rate, routing)
+    
+    def _split_segments(self, pcm: bytes, sample_rate: int,
+                        energy_threshold: Optional[float] = None) -> List[bytes]:
+        """
+        Split long PCM16 audio at pauses into segments of at most STT_SEGMENT_SECONDS
+        
+        Args:
+            pcm: Mono PCM16 audio
+            sample_rate: Sample rate of the audio
+            energy_threshold: Speech energy threshold of the clip (from _trim_silence);
+                estimated from this audio when not given
+        """
+        samples = pcm_to_samples(pcm)
+        frame_length = max(1, int(sample_rate * FRAME_MS / 1000))
+        max_frames = max(1, int(self.segment_seconds * 1000) // FRAME_MS)
+        if self.segment_seconds <= 0 or len(samples) <= max_frames * frame_length:
+            return [pcm]
+        
+        energies = frame_rms(samples, sample_rate)
+        if energy_threshold is None:
+            # Pre-trimmed audio (e.g. streamed utterances) skipped _trim_silence
+            energy_threshold = self._energy_threshold(energies)
+        is_speech = speech_frames(
+            energies,
+            zero_crossing_rate(samples, sample_rate),
+            energy_threshold,
+            max_zcr=float(os.getenv('VAD_MAX_ZCR', 0.5))
+        )
+        frames = split_at_silence(
+            is_speech, energies, max_frames,
+            min_silence_frames=max(1, int(os.getenv('STT_SEGMENT_MIN_PAUSE_MS', 300)) // FRAME_MS)
+        )
+        
+        # The last segment also takes the trailing partial frame
+        bounds = [start * frame_length for start, _ in frames] + [len(samples)]
+        return [samples[bounds[i]:bounds[i + 1]].tobytes() for i in range(len(frames))]
+    
+    def _recognize_pcm(self, pcm: bytes, sample_rate: int, routing: Optional[str] = None,
+                       energy_threshold: Optional[float] = None) -> Optional[str]:
+        """
+        Recognize PCM16 speech, transcribing long clips segment by segment
+        
+        Segments are recognized concurrently and their transcripts joined in
+        order, so latency follows the longest segment rather than the clip.
+        """
+        # Route on the length of the whole clip, not of its segments
+        routing = self.stt_router.resolve(routing, len(pcm) / (sample_rate * 2))
+        
+        segments = self._split_segments(pcm, sample_rate, energy_threshold)
+        if len(segments) == 1:
+            return self._recognize_audio_data(sr.AudioData(pcm, sample_rate, 2), routing)
+        
+        logger.info(f"Transcribing {len(segments)} segments concurrently")
+        futures = [
+            self.segment_executor.submit(self._recognize_audio_data, sr.AudioData(segment, sample_rate, 2), routing)
+            for segment in segments
+        ]
+        texts = [future.result() for future in futures]
+        
+        # Pauses and noise-only segments yield nothing; keep whatever was understood
+        text = " ".join(text for text in texts if text)
+        return text or None
+    
+    def _transcribe_via_temp_file(self, audio_bytes: bytes, file_ext: str,
+                                  routing: Optional[str] = None) -> Optional[str]:
+        """Transcribe audio that could not be decoded in memory"""
+        with tempfile.NamedTemporaryFile(suffix=f".{file_ext}", delete=False) as temp_file:
+            temp_file.write(audio_bytes)
+        try:
+            return self._transcribe_audio_file(temp_file.name, routing)
+        finally:
+            if os.path.exists(temp_file.name):
+                os.unlink(temp_file.name)
+    
+    def _transcribe_wav_directly(self, wav_path: str, routing: Optional[str] = None) -> Optional[str]:
         """Transcribe a WAV file directly using speech recognition"""
         try:
             with sr.AudioFile(wav_path) as source:
-                # Adjust for ambient noise
-                self.recognizer.adjust_for_ambient_noise(source, duration=1)
-                
-                # Record the audio
+                # Record the whole clip; none of it is spent on noise calibration
                 audio_data = self.recognizer.record(source)
-                
-                # Try multiple recognition services for better reliability
-                recognition_services = [
-                    ("Google (default)", lambda: self.recognizer.recognize_google(audio_data)),
-                    ("Google (en-US)", lambda: self.recognizer.recognize_google(audio_data, language='en-US')),
-                    ("Google (en-GB)", lambda: self.recognizer.recognize_google(audio_data, language='en-GB')),
-                ]
-                
-                for service_name, service_func in recognition_services:
-                    try:
-                        text = service_func()
-                        # Make sure text is a string
-                        if text is not None and isinstance(text, str) and text.strip():
-                            logger.info(f"Successfully transcribed with {service_name}: {text}")
-                            return text.strip()
-                        elif text is not None:
-                            # Handle case where text is not a string but can be converted to one
-                            text_str = str(text)
-                            if text_str.strip():
-                                logger.info(f"Successfully transcribed with {service_name}: {text_str}")
-                                return text_str.strip()
-                    except sr.UnknownValueError:
-                        logger.warning(f"{service_name} could not understand audio")
-                        continue
-                    except sr.RequestError as e:
-                        logger.warning(f"{service_name} service error: {str(e)}")
-                        continue
-                    except AttributeError as e:
-                        logger.warning(f"{service_name} returned non-string that can't be processed: {e}")
-                        continue
-                
-                # If all services failed
-                logger.error("All speech recognition services failed to transcribe")
+            
+            speech, threshold = self._trim_silence(audio_data.get_raw_data(convert_width=2), audio_data.sample_rate)
+            if speech is None:
                 return None
+            
+            return self._recognize_pcm(speech, audio_data.sample_rate, routing, threshold)
                 
         except Exception as e:
             logger.error(f"Direct WAV transcription error: {str(e)}")
             return None
     
+    def _recognize_audio_data(self, audio_data: sr.AudioData, routing: Optional[str] = None) -> Optional[str]:
+        """Run speech recognition on decoded audio using the engines selected by the routing rule"""
+        try:
+            text = self.stt_router.recognize(audio_data, routing)
+            if text is None:
+                logger.error("All speech recognition services failed to transcribe")
+            return text
+            
+        except Exception as e:
+            logger.error(f"Speech recognition error: {str(e)}")
+            return None
+    
+    def get_recognition_stats(self) -> Dict[str, Any]:
+        """Get recognition policy and engine statistics"""
+        stats = self.recognition.stats()
+        stats['stt'] = self.stt_router.stats()
+        return stats
+    
+    def get_startup_stats(self) -> Dict[str, Any]:
+        """Get how long initialization took and in which mode"""
+        return {
+            'server_mode': self.server_mode,
+            'startup_ms': round(self.startup_seconds * 1000, 1),
+            'microphone_available': self.microphone_available,
+            'playback_ready': self._mixer_ready
+        }
+    
+    def get_transcoder_stats(self) -> Dict[str, Any]:
+        """Get transcoding pool queue depth, wait times and rejections"""
+        return self.transcoder.stats()
+    
+    def get_tts_cache_stats(self) -> Dict[str, Any]:
+        """Get TTS cache statistics"""
+        if os.getenv('TTS_CACHE', 'True').lower() != 'true':
+            return {'enabled': False}
+        if not self._tts_cache:
+            return {'enabled': True, 'files': None}
+        stats = self._tts_cache.stats()
+        stats['enabled'] = True
+        return stats
+    
+    def get_transcription_cache_stats(self) -> Dict[str, Any]:
+        """Get transcription cache statistics"""
+        if not self.transcription_cache:
+            return {'enabled': False}
+        stats = self.transcription_cache.stats()
+        stats['enabled'] = True
+        return stats
+    
     def _record_and_transcribe(self, timeout: int) -> Optional[str]:
         """Record audio from microphone and transcribe"""
         if not self.microphone_available or not self.microphone:
@@ -290,17 +604,27 @@ class SpeechProcessor:
                 logger.warning("Empty text provided for TTS")
                 return None
             
-            # Generate unique filename
+            from gtts import gTTS
+            
+            def synthesize(audio_path: str):
+                tts = gTTS(text=text, lang=lang, slow=slow)
+                tts.save(audio_path)
+            
+            # Identical requests reuse the audio already on disk
+            tts_cache = self._get_tts_cache()
+            if tts_cache:
+                key = tts_key(text, lang, slow, self.tts_engine)
+                audio_path = tts_cache.get_or_create(key, synthesize)
+                logger.info(f"TTS audio ready: {audio_path}")
+                return audio_path
+            
+            # Generate unique filename in a sharded subdirectory (created if needed)
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
             audio_filename = f"tts_output_{timestamp}.mp3"
-            audio_path = os.path.join("static", "audio", audio_filename)
-            
-            # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(audio_path), exist_ok=True)
+            audio_path = sharded_path(os.path.join("static", "audio"), audio_filename)
             
             # Generate speech
-            tts = gTTS(text=text, lang=lang, slow=slow)
-            tts.save(audio_path)
+            synthesize(audio_path)
             
             logger.info(f"Generated TTS audio: {audio_path}")
             return audio_path
@@ -309,9 +633,41 @@ class SpeechProcessor:
             logger.error(f"Text-to-speech error: {str(e)}")
             return None
     
+    def text_to_speech_stream(self, text: str, lang: str = 'en', slow: bool = False) -> Iterator[bytes]:
+        """
+        Convert text to speech one sentence at a time
+        
+        Args:
+            text: Text to convert
+            lang: Language code
+            slow: Whether to speak slowly
+            
+        Returns:
+            Iterator of MP3 segments in reading order
+
+        Raises:
+            TTSStreamError: If no segment could be synthesized
+        """
+        return self.tts_stream.start(text, lang, slow)
+    
+    def _get_tts_cache(self) -> Optional[TTSCache]:
+        """Get the TTS cache, scanning existing audio files on first use"""
+        if not self._tts_cache_checked:
+            with self._tts_cache_lock:
+                if not self._tts_cache_checked:
+                    self._tts_cache = create_tts_cache()
+                    self._tts_cache_checked = True
+        return self._tts_cache
+    
     def play_audio(self, audio_path: str):
         """Play audio file"""
         try:
+            # Server mode sets up playback only when first needed
+            if not self._mixer_ready and not self._configure_audio_environment():
+                logger.error("Audio playback unavailable")
+                return
+            
+            import pygame
             pygame.mixer.music.load(audio_path)
             pygame.mixer.music.play()
             
@@ -359,7 +715,14 @@ class SpeechProcessor:
     def cleanup(self):
         """Cleanup resources"""
         try:
-            pygame.mixer.quit()
+            self.recognition.shutdown()
+            self.segment_executor.shutdown(wait=False)
+            self.transcoder.shutdown()
+            self.tts_stream.shutdown()
+            if self._mixer_ready:
+                import pygame
+                pygame.mixer.quit()
+                self._mixer_ready = False
             logger.info("Speech processor cleaned up")
         except Exception as e:
             logger.error(f"Cleanup error: {str(e)}")
@@ -0,0 +1,454 @@
+"""
+Streaming Voice Input
+Decodes audio chunks as they arrive and transcribes each utterance once speech ends
+"""
+
+import os
+import json
+import time
+import queue
+import logging
+import threading
+import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.voice.audio_analysis import (
+    FRAME_MS, estimate_energy_threshold, frame_rms, frame_samples, pcm_to_samples,
+    zero_crossing_rate
+)
+from src.voice.audio_decoder import AudioDecodeError, PIPE_CHUNK_SIZE, TARGET_SAMPLE_RATE, decode_command
+from src.voice.transcoder import TranscoderBusyError
+
+logger = logging.getLogger(__name__)
+
+# Utterances are transcribed on their own pool so that long ones can still be
+# split into segments on the speech processor's segment pool
+_transcribe_pool: Optional[ThreadPoolExecutor] = None
+_transcribe_pool_lock = threading.Lock()
+
+
+def _get_transcribe_pool() -> ThreadPoolExecutor:
+    global _transcribe_pool
+    with _transcribe_pool_lock:
+        if _transcribe_pool is None:
+            _transcribe_pool = ThreadPoolExecutor(
+                max_workers=int(os.getenv('STREAM_TRANSCRIBE_WORKERS', 4)),
+                thread_name_prefix='stt-stream'
+            )
+        return _transcribe_pool
+
+
+class PCMRingBuffer:
+    """Fixed-capacity store of the most recent samples, addressed by absolute sample position"""
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self._samples = np.zeros(self.capacity, dtype='<i2')
+        self.total = 0
+
+    @property
+    def start(self) -> int:
+        """Oldest absolute sample position still held"""
+        return max(0, self.total - self.capacity)
+
+    def append(self, samples: np.ndarray):
+        count = len(samples)
+        if count > self.capacity:
+            samples = samples[-self.capacity:]
+        position = (self.total + count - len(samples)) % self.capacity
+        first = min(len(samples), self.capacity - position)
+        self._samples[position:position + first] = samples[:first]
+        self._samples[:len(samples) - first] = samples[first:]
+        self.total += count
+
+    def read(self, start: int, end: int) -> np.ndarray:
+        """Copy samples between two absolute positions (clamped to what is still held)"""
+        start = max(start, self.start)
+        end = min(end, self.total)
+        if end <= start:
+            return np.zeros(0, dtype='<i2')
+        first, last = start % self.capacity, end % self.capacity
+        if first < last:
+            return self._samples[first:last].copy()
+        return np.concatenate((self._samples[first:], self._samples[:last]))
+
+
+class StreamingDecoder:
+    """
+    A long-running ffmpeg process decoding one connection's audio
+
+    Encoded chunks are written to ffmpeg's stdin as they arrive; decoded PCM
+    is handed to ``on_pcm`` from a reader thread as soon as ffmpeg emits it.
+    """
+
+    def __init__(self, on_pcm: Callable[[bytes], None], sample_rate: int = TARGET_SAMPLE_RATE):
+        try:
+            self.process = subprocess.Popen(
+                decode_command(sample_rate),
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+        except OSError as e:
+            raise AudioDecodeError(f"Could not start ffmpeg: {str(e)}")
+
+        self.on_pcm = on_pcm
+        self._errors = []
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._drainer = threading.Thread(target=lambda: self._errors.append(self.process.stderr.read()), daemon=True)
+        self._reader.start()
+        self._drainer.start()
+
+    def _read(self):
+        """Forward decoded PCM, keeping chunks aligned to whole samples"""
+        remainder = b''
+        try:
+            while True:
+                chunk = self.process.stdout.read1(PIPE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                chunk = remainder + chunk
+                usable = len(chunk) - len(chunk) % 2
+                remainder = chunk[usable:]
+                if usable:
+                    self.on_pcm(chunk[:usable])
+        except Exception as e:
+            logger.error(f"Streaming decode error: {str(e)}")
+
+    def feed(self, chunk: bytes):
+        """Pass an encoded chunk to ffmpeg"""
+        try:
+            self.process.stdin.write(chunk)
+            self.process.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            message = self._errors[0].decode('utf-8', 'replace').strip() if self._errors and self._errors[0] else ''
+            raise AudioDecodeError(f"ffmpeg stopped accepting audio: {message[-500:]}")
+
+    def close(self, timeout: float = 5.0):
+        """Signal end of input and wait until all decoded PCM has been delivered"""
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self._reader.join(timeout)
+        self._drainer.join(timeout)
+        self.process.stdout.close()
+        self.process.stderr.close()
+
+
+class UtteranceDetector:
+    """
+    Incremental voice activity detection with end-of-utterance events
+
+    Frames are classified by energy and zero-crossing rate, using a noise
+    floor estimated from the recent stream. An utterance ends once
+    ``end_silence_ms`` of non-speech follows it, or when it reaches
+    ``max_utterance_seconds``.
+    """
+
+    def __init__(self, sample_rate: int = TARGET_SAMPLE_RATE, end_silence_ms: Optional[int] = None,
+                 max_utterance_seconds: Optional[float] = None):
+        """
+        Initialize the detector
+
+        Args:
+            sample_rate: Sample rate of the stream
+            end_silence_ms: Silence that ends an utterance (default: STREAM_END_SILENCE_MS or 600)
+            max_utterance_seconds: Longest utterance before it is cut (default: STREAM_MAX_UTTERANCE_SECONDS or 30)
+        """
+        self.sample_rate = sample_rate
+        self.frame_length = max(1, int(sample_rate * FRAME_MS / 1000))
+
+        end_silence_ms = end_silence_ms or int(os.getenv('STREAM_END_SILENCE_MS', 600))
+        max_utterance_seconds = max_utterance_seconds or float(os.getenv('STREAM_MAX_UTTERANCE_SECONDS', 30))
+        self.end_silence_frames = max(1, end_silence_ms // FRAME_MS)
+        self.max_utterance_frames = max(1, int(max_utterance_seconds * 1000) // FRAME_MS)
+        self.min_speech_frames = max(1, int(os.getenv('VAD_MIN_SPEECH_MS', 90)) // FRAME_MS)
+        self.padding_frames = int(os.getenv('VAD_PADDING_MS', 210)) // FRAME_MS
+        self.max_zcr = float(os.getenv('VAD_MAX_ZCR', 0.5))
+        self.percentile = float(os.getenv('NOISE_FLOOR_PERCENTILE', 15))
+        self.max_noise_floor = float(os.getenv('NOISE_FLOOR_MAX', 300))
+
+        # Noise floor is estimated over roughly the last ten seconds
+        self._energies = np.zeros(0, dtype=np.float32)
+        self._history_frames = 10000 // FRAME_MS
+        self._carry = np.zeros(0, dtype='<i2')
+
+        self.frames = 0
+        self._start: Optional[int] = None
+        self._last_speech = 0
+        self._speech_count = 0
+
+    def _bounds(self, start: int, end: int) -> Tuple[int, int]:
+        """Convert a frame range to padded sample positions"""
+        start = max(0, start - self.padding_frames)
+        end = min(self.frames, end + self.padding_frames)
+        return start * self.frame_length, end * self.frame_length
+
+    def _close(self, end: int) -> Optional[Tuple[int, int]]:
+        utterance = None
+        if self._speech_count >= self.min_speech_frames:
+            utterance = self._bounds(self._start, end)
+        self._start = None
+        self._speech_count = 0
+        return utterance
+
+    def process(self, samples: np.ndarray) -> List[Tuple[int, int]]:
+        """
+        Analyse newly decoded samples
+
+        Returns:
+            (start, end) sample positions of utterances that have just ended
+        """
+        samples = np.concatenate((self._carry, samples))
+        frames = frame_samples(samples, self.sample_rate)
+        self._carry = samples[len(frames) * self.frame_length:]
+        if not len(frames):
+            return []
+
+        whole = samples[:len(frames) * self.frame_length]
+        energies = frame_rms(whole, self.sample_rate)
+        crossings = zero_crossing_rate(whole, self.sample_rate)
+
+        self._energies = np.concatenate((self._energies, energies))[-self._history_frames:]
+        threshold = estimate_energy_threshold(
+            self._energies, percentile=self.percentile, max_noise_floor=self.max_noise_floor
+        )
+        is_speech = (energies >= threshold) & (crossings < self.max_zcr)
+
+        ended = []
+        for speech in is_speech:
+            frame = self.frames
+            self.frames += 1
+
+            if speech:
+                if self._start is None:
+                    self._start = frame
+                self._speech_count += 1
+                self._last_speech = frame
+            elif self._start is not None and frame - self._last_speech >= self.end_silence_frames:
+                utterance = self._close(self._last_speech + 1)
+                if utterance:
+                    ended.append(utterance)
+
+            if self._start is not None and frame + 1 - self._start >= self.max_utterance_frames:
+                utterance = self._close(frame + 1)
+                if utterance:
+                    ended.append(utterance)
+
+        return ended
+
+    def flush(self) -> Optional[Tuple[int, int]]:
+        """End the stream, returning the utterance still in progress (if any)"""
+        if self._start is None:
+            return None
+        return self._close(self._last_speech + 1)
+
+
+class StreamingTranscriber:
+    """
+    Transcribes one streaming voice connection
+
+    Decoded audio is kept in a ring buffer; each utterance found by the
+    detector is cut from the buffer and transcribed immediately, while the
+    client may still be recording. Events for the client are queued and
+    read with ``drain_events``.
+    """
+
+    def __init__(self, speech_processor, routing: Optional[str] = None):
+        """
+        Initialize the transcriber
+
+        Args:
+            speech_processor: SpeechProcessor used for recognition
+            routing: STT routing rule for this connection
+        """
+        self.speech_processor = speech_processor
+        self.routing = routing
+        self.sample_rate = TARGET_SAMPLE_RATE
+
+        buffer_seconds = float(os.getenv('STREAM_BUFFER_SECONDS', 60))
+        self.buffer = PCMRingBuffer(int(buffer_seconds * self.sample_rate))
+        self.detector = UtteranceDetector(self.sample_rate)
+
+        self._events: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._futures: List[Future] = []
+        self._texts: Dict[int, Optional[str]] = {}
+
+        # The decoder's ffmpeg process counts against the transcoder's streaming limit
+        self.transcoder = speech_processor.transcoder
+        self.transcoder.acquire_stream()
+        try:
+            self.decoder = StreamingDecoder(self._on_pcm, self.sample_rate)
+        except Exception:
+            self.transcoder.release_stream()
+            raise
+        self._released = False
+
+    def _on_pcm(self, pcm: bytes):
+        samples = pcm_to_samples(pcm)
+        with self._lock:
+            self.buffer.append(samples)
+            for start, end in self.detector.process(samples):
+                self._submit(start, end)
+
+    def _submit(self, start: int, end: int):
+        """Start transcribing an utterance (caller holds the lock)"""
+        index = len(self._futures)
+        pcm = self.buffer.read(start, end).tobytes()
+        self._events.put({'type': 'speech_end', 'utterance': index,
+                          'duration': round((end - start) / self.sample_rate, 2)})
+        self._futures.append(_get_transcribe_pool().submit(self._transcribe, index, pcm))
+
+    def _transcribe(self, index: int, pcm: bytes):
+        try:
+            text = self.speech_processor.transcribe_pcm(pcm, self.sample_rate, self.routing)
+        except Exception as e:
+            logger.error(f"Streaming transcription error: {str(e)}")
+            text = None
+        self._texts[index] = text
+        self._events.put({'type': 'transcript', 'utterance': index, 'text': text})
+
+    def feed(self, chunk: bytes):
+        """Add an encoded audio chunk from the client"""
+        self.decoder.feed(chunk)
+
+    def finish(self, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        End the stream and wait for every utterance to be transcribed
+
+        Returns:
+            All transcripts joined in order, or None if nothing was understood
+        """
+        self.decoder.close()
+        with self._lock:
+            utterance = self.detector.flush()
+            if utterance:
+                self._submit(*utterance)
+            futures = list(self._futures)
+
+        timeout = timeout or float(os.getenv('SPEECH_RECOGNITION_TIMEOUT', 10)) * 3
+        for future in futures:
+            try:
+                future.result(timeout=timeout)
+            except Exception as e:
+                logger.warning(f"Streaming utterance not transcribed: {str(e)}")
+
+        text = " ".join(self._texts[i] for i in range(len(futures)) if self._texts.get(i))
+        self._events.put({
+            'type': 'done',
+            'text': text or None,
+            'speech_detected': bool(futures),
+            'utterances': len(futures)
+        })
+        return text or None
+
+    def drain_events(self) -> List[Dict[str, Any]]:
+        """Get the events queued since the last call"""
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def close(self):
+        """Release the decoder and its streaming slot (safe to call after finish)"""
+        if self.decoder.process.poll() is None:
+            self.decoder.close(timeout=1.0)
+        if not self._released:
+            self._released = True
+            self.transcoder.release_stream()
+
+
+def _close_stream(ws, reason: str):
+    """Tell the client why its stream is being closed, then close it"""
+    logger.info(f"Closing voice stream: {reason}")
+    ws.send(json.dumps({'type': 'error', 'error': reason}))
+    # 1008: policy violation
+    ws.close(reason=1008, message=reason)
+
+
+def serve_voice_stream(ws, speech_processor, routing: Optional[str] = None):
+    """
+    Run a streaming voice WebSocket connection
+
+    The client sends binary audio chunks (e.g. timesliced WebM/Opus from
+    MediaRecorder) followed by a {"type": "stop"} text message. The server
+    replies with JSON events: speech_end and transcript per utterance, then
+    done with the full transcription, or error. A connection that sends
+    nothing for STREAM_IDLE_SECONDS, or stays open longer than
+    STREAM_MAX_SESSION_SECONDS, is closed so its ffmpeg slot is freed.
+
+    Args:
+        ws: WebSocket connection (flask-sock)
+        speech_processor: SpeechProcessor used for recognition
+        routing: STT routing rule for this connection
+    """
+    max_bytes = int(os.getenv('STREAM_MAX_BYTES', 10 * 1024 * 1024))
+    poll_seconds = float(os.getenv('STREAM_POLL_MS', 100)) / 1000
+    idle_seconds = float(os.getenv('STREAM_IDLE_SECONDS', 30))
+    max_session_seconds = float(os.getenv('STREAM_MAX_SESSION_SECONDS', 300))
+    received = 0
+
+    try:
+        transcriber = StreamingTranscriber(speech_processor, routing)
+    except TranscoderBusyError as e:
+        logger.warning(f"Rejected voice stream: {str(e)}")
+        ws.send(json.dumps({'type': 'error', 'error': 'Server busy, please retry', 'retry_after': e.retry_after}))
+        # 1013: try again later
+        ws.close(reason=1013, message='Server busy')
+        return
+    except AudioDecodeError as e:
+        logger.error(f"Streaming voice unavailable: {str(e)}")
+        ws.send(json.dumps({'type': 'error', 'error': 'Streaming voice input is unavailable'}))
+        return
+
+    started = last_message = time.monotonic()
+    try:
+        while True:
+            message = ws.receive(timeout=poll_seconds)
+            for event in transcriber.drain_events():
+                ws.send(json.dumps(event))
+
+            now = time.monotonic()
+            if now - started > max_session_seconds:
+                _close_stream(ws, 'Voice stream exceeded the maximum session length')
+                break
+
+            if message is None:
+                if now - last_message > idle_seconds:
+                    _close_stream(ws, 'Voice stream idle for too long')
+                    break
+                continue
+            last_message = now
+
+            if isinstance(message, (bytes, bytearray)):
+                received += len(message)
+                if received > max_bytes:
+                    ws.send(json.dumps({'type': 'error', 'error': 'Audio stream too large'}))
+                    break
+                transcriber.feed(bytes(message))
+                continue
+
+            if json.loads(message).get('type') == 'stop':
+                transcriber.finish()
+                for event in transcriber.drain_events():
+                    ws.send(json.dumps(event))
+                break
+
+    except AudioDecodeError as e:
+        logger.error(f"Streaming decode failed: {str(e)}")
+        ws.send(json.dumps({'type': 'error', 'error': 'Could not decode audio stream'}))
+    except Exception as e:
+        # Usually the client going away mid-stream
+        logger.info(f"Voice stream ended: {str(e) or type(e).__name__}")
+    finally:
+        transcriber.close()
@@ -0,0 +1,199 @@
+"""
+Speech-to-Text Backends
+Pluggable recognition engines and the rules routing each request between them
+"""
+
+import os
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+import speech_recognition as sr
+
+from src.voice.recognition import Candidate, RecognitionStrategy
+
+logger = logging.getLogger(__name__)
+
+
+class STTBackend(ABC):
+    """Base class for speech recognition engines"""
+
+    name = 'base'
+    local = False
+
+    # Recognizer languages tried, in order (part of the transcription cache key)
+    languages = ()
+
+    def __init__(self, recognizer: sr.Recognizer):
+        self.recognizer = recognizer
+
+    def available(self) -> bool:
+        """Check whether the engine can be used in this environment"""
+        return True
+
+    @abstractmethod
+    def candidates(self, audio_data: sr.AudioData) -> List[Candidate]:
+        """
+        Build the recognition attempts for a clip
+
+        Args:
+            audio_data: Audio to recognize
+
+        Returns:
+            (name, callable) pairs in order of preference
+        """
+
+
+class GoogleSTTBackend(STTBackend):
+    """Google Web Speech API (network)"""
+
+    name = 'google'
+    languages = ('default', 'en-US', 'en-GB')
+
+    def candidates(self, audio_data: sr.AudioData) -> List[Candidate]:
+        # Try multiple recognition services for better reliability
+        return [
+            ("Google (default)", lambda: self.recognizer.recognize_google(audio_data)),
+            ("Google (en-US)", lambda: self.recognizer.recognize_google(audio_data, language='en-US')),
+            ("Google (en-GB)", lambda: self.recognizer.recognize_google(audio_data, language='en-GB')),
+        ]
+
+
+class SphinxSTTBackend(STTBackend):
+    """CMU Sphinx running locally on the CPU (needs the optional pocketsphinx package)"""
+
+    name = 'sphinx'
+    local = True
+
+    def __init__(self, recognizer: sr.Recognizer):
+        super().__init__(recognizer)
+        self.language = os.getenv('STT_SPHINX_LANGUAGE', 'en-US')
+        self.languages = (self.language,)
+        self._available = None
+
+    def available(self) -> bool:
+        if self._available is None:
+            try:
+                import pocketsphinx  # noqa: F401
+                self._available = True
+            except ImportError:
+                logger.warning("pocketsphinx is not installed, offline speech recognition disabled")
+                self._available = False
+        return self._available
+
+    def candidates(self, audio_data: sr.AudioData) -> List[Candidate]:
+        return [
+            (f"Sphinx ({self.language})",
+             lambda: self.recognizer.recognize_sphinx(audio_data, language=self.language)),
+        ]
+
+
+# Routing rules: the order in which engines are tried
+ROUTES = {
+    'remote': ['google'],
+    'local': ['sphinx'],
+    'local_first': ['sphinx', 'google'],
+    'remote_first': ['google', 'sphinx'],
+}
+
+# 'auto' picks local_first for short clips (commands) and remote for the rest
+ROUTING_RULES = tuple(ROUTES) + ('auto',)
+
+
+class STTRouter:
+    """
+    Routes each recognition to one or more engines
+
+    Engines in a route are tried in order; the next one runs only when the
+    previous engine produced no transcript. Each engine's own attempts (such
+    as Google's language fallbacks) go through the recognition strategy.
+    """
+
+    def __init__(self, recognizer: sr.Recognizer, strategy: RecognitionStrategy,
+                 routing: Optional[str] = None, local_max_seconds: Optional[float] = None):
+        """
+        Initialize the router
+
+        Args:
+            recognizer: Shared speech_recognition recognizer
+            strategy: Runs each engine's candidates
+            routing: Default routing rule (default: STT_ROUTING or remote)
+            local_max_seconds: Longest clip routed local-first by 'auto' (default: STT_LOCAL_MAX_SECONDS or 4)
+        """
+        self.strategy = strategy
+        self.routing = self._validate((routing or os.getenv('STT_ROUTING', 'remote')).lower())
+        self.local_max_seconds = local_max_seconds or float(os.getenv('STT_LOCAL_MAX_SECONDS', 4))
+
+        self.backends: Dict[str, STTBackend] = {
+            'google': GoogleSTTBackend(recognizer),
+            'sphinx': SphinxSTTBackend(recognizer),
+        }
+        self.requests: Dict[str, int] = {name: 0 for name in self.backends}
+        self.successes: Dict[str, int] = {name: 0 for name in self.backends}
+
+    @staticmethod
+    def _validate(routing: str) -> str:
+        if routing not in ROUTING_RULES:
+            raise ValueError(f"Unknown STT routing rule: {routing}")
+        return routing
+
+    def resolve(self, routing: Optional[str], duration: float) -> str:
+        """Turn a routing rule (or the default) into a concrete route for a clip of this length"""
+        routing = self._validate(routing.lower()) if routing else self.routing
+        if routing == 'auto':
+            routing = 'local_first' if duration <= self.local_max_seconds else 'remote'
+        return routing
+
+    def route(self, routing: Optional[str], duration: float) -> List[STTBackend]:
+        """Get the available engines to try for a clip, in order"""
+        backends = [self.backends[name] for name in ROUTES[self.resolve(routing, duration)]]
+        return [backend for backend in backends if backend.available()]
+
+    def signature(self, routing: Optional[str] = None) -> str:
+        """Identify the routing rule and recognizer languages a transcription was made with"""
+        routing = self._validate(routing.lower()) if routing else self.routing
+        languages = ",".join(
+            f"{name}={'+'.join(backend.languages)}" for name, backend in self.backends.items()
+        )
+        return f"{routing}|{languages}"
+
+    def recognize(self, audio_data: sr.AudioData, routing: Optional[str] = None) -> Optional[str]:
+        """
+        Recognize a clip following a routing rule
+
+        Args:
+            audio_data: Audio to recognize
+            routing: Rule for this request (default: the configured rule)
+
+        Returns:
+            Transcription, or None if every engine failed
+        """
+        duration = len(audio_data.frame_data) / (audio_data.sample_rate * audio_data.sample_width)
+        backends = self.route(routing, duration)
+        if not backends:
+            logger.error("No speech recognition engine available for this route")
+            return None
+
+        for backend in backends:
+            self.requests[backend.name] += 1
+            text = self.strategy.run(backend.candidates(audio_data))
+            if text:
+                self.successes[backend.name] += 1
+                return text
+            logger.warning(f"{backend.name} engine produced no transcript")
+
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'routing': self.routing,
+            'local_max_seconds': self.local_max_seconds,
+            'engines': {
+                name: {
+                    'local': backend.local,
+                    'requests': self.requests[name],
+                    'successes': self.successes[name]
+                }
+                for name, backend in self.backends.items()
+            }
+        }
@@ -0,0 +1,163 @@
+"""
+Transcoder
+Bounded worker pool for ffmpeg transcoding with backpressure
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TranscoderBusyError(Exception):
+    """Raised when the transcoding queue is full"""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Transcoder:
+    """
+    Runs transcoding jobs on a fixed number of workers
+
+    Each worker drives one ffmpeg process at a time, so the number of
+    concurrent ffmpeg processes never exceeds ``workers``. Jobs beyond that
+    wait in a bounded queue; once the queue is full new jobs are rejected
+    immediately with a retry hint instead of piling up.
+
+    Streaming connections keep an ffmpeg process for their whole lifetime,
+    so they cannot share the workers; they reserve one of ``max_streams``
+    slots instead and are turned away when none is free.
+    """
+
+    def __init__(self, workers: Optional[int] = None, queue_size: Optional[int] = None,
+                 max_streams: Optional[int] = None):
+        """
+        Initialize the transcoder
+
+        Args:
+            workers: Concurrent transcodes (default: TRANSCODE_WORKERS or the CPU count)
+            queue_size: Jobs allowed to wait for a worker (default: TRANSCODE_QUEUE_SIZE or 4 per worker)
+            max_streams: Concurrent streaming decoders (default: STREAM_MAX_CONNECTIONS or ``workers``)
+        """
+        self.workers = workers or int(os.getenv('TRANSCODE_WORKERS', os.cpu_count() or 2))
+        self.queue_size = queue_size if queue_size is not None \
+            else int(os.getenv('TRANSCODE_QUEUE_SIZE', self.workers * 4))
+        self.max_streams = max_streams or int(os.getenv('STREAM_MAX_CONNECTIONS', self.workers))
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='transcode')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._active = 0
+
+        self._waits = deque(maxlen=200)
+        self._durations = deque(maxlen=200)
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+        self._streams = 0
+        self.streams_rejected = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Jobs waiting for a worker"""
+        return self._pending - self._active
+
+    def _retry_after(self) -> int:
+        """Estimate seconds until a queue slot frees up"""
+        average = sum(self._durations) / len(self._durations) if self._durations else 1.0
+        return max(1, math.ceil(average * max(1, self.queue_depth) / self.workers))
+
+    def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a transcoding job and wait for its result
+
+        Args:
+            func: Job to run (e.g. decode_to_pcm)
+            *args, **kwargs: Arguments for the job
+
+        Returns:
+            The job's result
+
+        Raises:
+            TranscoderBusyError: If the queue is full
+        """
+        with self._lock:
+            if self._pending >= self.workers + self.queue_size:
+                self.rejected += 1
+                raise TranscoderBusyError("Transcoding queue is full", retry_after=self._retry_after())
+            self._pending += 1
+
+        submitted = time.monotonic()
+
+        def job():
+            started = time.monotonic()
+            with self._lock:
+                self._active += 1
+                self._waits.append(started - submitted)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._pending -= 1
+                    self._durations.append(time.monotonic() - started)
+
+        try:
+            result = self._executor.submit(job).result()
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        with self._lock:
+            self.completed += 1
+        return result
+
+    def acquire_stream(self):
+        """
+        Reserve a slot for a long-running streaming decoder
+
+        Raises:
+            TranscoderBusyError: If every streaming slot is taken
+        """
+        with self._lock:
+            if self._streams >= self.max_streams:
+                self.streams_rejected += 1
+                raise TranscoderBusyError("Too many streaming connections", retry_after=5)
+            self._streams += 1
+
+    def release_stream(self):
+        """Free a slot taken with acquire_stream"""
+        with self._lock:
+            self._streams = max(0, self._streams - 1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._waits)
+            durations = list(self._durations)
+            return {
+                'workers': self.workers,
+                'active': self._active,
+                'queue_depth': self._pending - self._active,
+                'queue_size': self.queue_size,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'avg_wait_ms': round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                'p95_wait_ms': round(waits[min(len(waits) - 1, int(0.95 * len(waits)))] * 1000, 1) if waits else 0.0,
+                'avg_transcode_ms': round(sum(durations) / len(durations) * 1000, 1) if durations else 0.0,
+                'streams': self._streams,
+                'max_streams': self.max_streams,
+                'streams_rejected': self.streams_rejected
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,106 @@
+"""
+Transcription Cache
+Content-addressed cache of transcription results for repeated uploads
+"""
+
+import os
+import hashlib
+import logging
+from typing import Any, Dict, Optional
+
+from src.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def audio_digest(data: bytes) -> str:
+    """Hash audio content (encoded upload or decoded PCM)"""
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+class TranscriptionCache:
+    """
+    Caches transcription results by audio content and recognizer settings
+
+    Two keys point at each result: a hash of the uploaded bytes, checked
+    before decoding so byte-identical retries skip ffmpeg entirely, and a
+    hash of the decoded PCM, which also matches the same audio re-encoded
+    in a different container. Both include the recognizer signature
+    (routing rule and languages), so changing engines never returns stale
+    text.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        """
+        Initialize the transcription cache
+
+        Args:
+            max_entries: Maximum cached keys (default: STT_CACHE_MAX_ENTRIES or 1024)
+            ttl: Seconds a result stays valid (default: STT_CACHE_TTL or 3600)
+        """
+        self.cache = TTLCache(
+            max_entries=max_entries or int(os.getenv('STT_CACHE_MAX_ENTRIES', 1024)),
+            ttl=ttl if ttl is not None else float(os.getenv('STT_CACHE_TTL', 3600))
+        )
+        self.raw_hits = 0
+        self.pcm_hits = 0
+
+    @staticmethod
+    def raw_key(audio: bytes, signature: str) -> str:
+        return f"raw:{signature}:{audio_digest(audio)}"
+
+    @staticmethod
+    def pcm_key(pcm: bytes, signature: str) -> str:
+        return f"pcm:{signature}:{audio_digest(pcm)}"
+
+    def _hit(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        hit = dict(result)
+        hit['cached'] = True
+        return hit
+
+    def get_raw(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a result by the hash of the uploaded bytes"""
+        result = self.cache.get(key)
+        if result is None:
+            return None
+        self.raw_hits += 1
+        return self._hit(result)
+
+    def get_pcm(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a result by the hash of the decoded audio"""
+        result = self.cache.get(key)
+        if result is None:
+            return None
+        self.pcm_hits += 1
+        return self._hit(result)
+
+    def set(self, result: Dict[str, Any], *keys: Optional[str]):
+        """
+        Store a result under every given key
+
+        Only results with a transcript are kept. A clip judged silent or a
+        failed recognition may come out differently on retry (after a VAD
+        setting or engine changes), so they are never served from the cache.
+        """
+        if not result.get('text'):
+            return
+        value = {k: v for k, v in result.items() if k != 'cached'}
+        for key in keys:
+            if key:
+                self.cache.set(key, value)
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.cache.stats()
+        stats['raw_hits'] = self.raw_hits
+        stats['pcm_hits'] = self.pcm_hits
+        return stats
+
+
+def create_transcription_cache() -> Optional[TranscriptionCache]:
+    """Create the transcription cache unless disabled with STT_CACHE=False"""
+    if os.getenv('STT_CACHE', 'True').lower() != 'true':
+        return None
+    return TranscriptionCache()
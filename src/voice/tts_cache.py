@@ -0,0 +1,202 @@
+"""
+TTS Cache
+Content-addressed store of synthesized speech with a disk budget
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Prefix of cached TTS files, followed by the content hash
+TTS_FILE_PREFIX = 'tts_'
+
+
+def tts_key(text: str, lang: str, slow: bool, engine: str) -> str:
+    """Hash everything that determines the synthesized audio"""
+    payload = json.dumps([text, lang, bool(slow), engine], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:40]
+
+
+class TTSCache:
+    """
+    Reuses synthesized audio for identical (text, lang, slow, engine) requests
+
+    Files are named after the content hash (in subdirectories named after
+    its first two characters), so a repeat phrase costs one stat() instead
+    of a synthesis call. Total size is kept under
+    ``max_bytes`` by deleting the least recently used files. Concurrent
+    requests for the same phrase share a single synthesis.
+    """
+
+    def __init__(self, directory: str = os.path.join('static', 'audio'), max_bytes: Optional[int] = None,
+                 extension: str = 'mp3'):
+        """
+        Initialize the TTS cache
+
+        Args:
+            directory: Where audio files are stored
+            max_bytes: Disk budget for cached audio (default: TTS_CACHE_MAX_BYTES or 256MB)
+            extension: File extension of synthesized audio
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes or int(os.getenv('TTS_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+        self.extension = extension
+
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._files: "OrderedDict[str, int]" = OrderedDict()
+        self.total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+
+    def path_for(self, key: str) -> str:
+        # Sharded by the first two hash characters so no directory grows huge
+        return os.path.join(self.directory, key[:2], f"{TTS_FILE_PREFIX}{key}.{self.extension}")
+
+    def _load_index(self):
+        """Rebuild the LRU order from files left by earlier runs (oldest modification first)"""
+        entries = []
+        suffix = f".{self.extension}"
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.is_file() and entry.name.startswith(TTS_FILE_PREFIX) and entry.name.endswith(suffix):
+                    key = entry.name[len(TTS_FILE_PREFIX):-len(suffix)]
+                    if key[:2] != shard.name:
+                        continue
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, key, stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._files[key] = size
+            self.total_bytes += size
+
+        if entries:
+            logger.info(f"TTS cache holds {len(entries)} files ({self.total_bytes} bytes)")
+        self._evict()
+
+    def _touch(self, key: str, path: str):
+        """Mark a file as recently used (in memory and on disk, so the order survives restarts)"""
+        with self._lock:
+            if key in self._files:
+                self._files.move_to_end(key)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Delete least recently used files until the cache fits its budget"""
+        while True:
+            with self._lock:
+                if self.total_bytes <= self.max_bytes or len(self._files) <= 1:
+                    return
+                key, size = self._files.popitem(last=False)
+                self.total_bytes -= size
+                self.evictions += 1
+            try:
+                os.remove(self.path_for(key))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not evict TTS file {key}: {str(e)}")
+
+    def get(self, key: str) -> Optional[str]:
+        """Get the path of cached audio, or None if it has not been synthesized"""
+        path = self.path_for(key)
+        try:
+            size = os.stat(path).st_size
+        except FileNotFoundError:
+            with self._lock:
+                # Deleted behind our back
+                size = self._files.pop(key, None)
+                if size is not None:
+                    self.total_bytes -= size
+            return None
+
+        with self._lock:
+            if key not in self._files:
+                self._files[key] = size
+                self.total_bytes += size
+        self._touch(key, path)
+        return path
+
+    def get_or_create(self, key: str, synthesize: Callable[[str], None]) -> str:
+        """
+        Get cached audio, synthesizing it first if needed
+
+        Args:
+            key: Content hash from tts_key
+            synthesize: Writes audio for the request to the given path
+
+        Returns:
+            Path of the audio file
+        """
+        path = self.get(key)
+        if path:
+            self.hits += 1
+            return path
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another request may have synthesized it while we waited
+            path = self.get(key)
+            if path:
+                self.hits += 1
+                return path
+
+            self.misses += 1
+            path = self.path_for(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                synthesize(temp_path)
+                # Readers never see a partially written file
+                os.replace(temp_path, path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                with self._lock:
+                    self._key_locks.pop(key, None)
+
+            size = os.path.getsize(path)
+            with self._lock:
+                self.total_bytes += size - self._files.pop(key, 0)
+                self._files[key] = size
+
+        self._evict()
+        return path
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'files': len(self._files),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+def create_tts_cache() -> Optional[TTSCache]:
+    """Create the TTS cache unless disabled with TTS_CACHE=False"""
+    if os.getenv('TTS_CACHE', 'True').lower() != 'true':
+        return None
+    return TTSCache()
@@ -0,0 +1,190 @@
+"""
+Streaming TTS
+Splits text into sentences and synthesizes them concurrently, delivering audio in order
+"""
+
+import os
+import re
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Sentence ends: terminal punctuation (optionally followed by quotes/brackets) then whitespace
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?…])["\')\]]*\s+')
+
+# Fallback split points for sentences that are too long
+CLAUSE_BOUNDARY = re.compile(r'(?<=[,;:])\s+')
+
+# Synthesizes (text, lang, slow) to an audio file, returning its path
+Synthesizer = Callable[[str, str, bool], Optional[str]]
+
+
+class TTSStreamError(Exception):
+    """Raised when no segment of a text could be synthesized"""
+
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    """Break an overlong sentence at clause boundaries, then at spaces"""
+    parts = []
+    current = ''
+    for piece in CLAUSE_BOUNDARY.split(sentence):
+        for word in piece.split(' ') if len(piece) > max_chars else [piece]:
+            candidate = f"{current} {word}".strip() if current else word
+            if len(candidate) <= max_chars or not current:
+                current = candidate
+            else:
+                parts.append(current)
+                current = word
+    if current:
+        parts.append(current)
+    return parts
+
+
+def split_sentences(text: str, max_chars: Optional[int] = None, min_chars: int = 20) -> List[str]:
+    """
+    Split text into segments for synthesis
+
+    Segments end at sentence boundaries; very short sentences are merged
+    into the next one and sentences over ``max_chars`` are broken at
+    clauses or words.
+
+    Args:
+        text: Text to split
+        max_chars: Longest segment (default: TTS_SEGMENT_MAX_CHARS or 200)
+        min_chars: Shortest segment worth a separate synthesis call
+
+    Returns:
+        Segments in reading order
+    """
+    max_chars = max_chars or int(os.getenv('TTS_SEGMENT_MAX_CHARS', 200))
+    segments = []
+    pending = ''
+    for sentence in SENTENCE_BOUNDARY.split(text.strip()):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        sentence = f"{pending} {sentence}".strip() if pending else sentence
+        pending = ''
+        if len(sentence) < min_chars:
+            pending = sentence
+            continue
+        segments.extend(_split_long(sentence, max_chars) if len(sentence) > max_chars else [sentence])
+    if pending:
+        if segments and len(segments[-1]) + len(pending) < max_chars:
+            segments[-1] = f"{segments[-1]} {pending}"
+        else:
+            segments.append(pending)
+    return segments
+
+
+class StreamingTTS:
+    """
+    Sentence-chunked text-to-speech
+
+    Segments are synthesized on a bounded pool, at most ``lookahead``
+    segments ahead of the one being delivered, and yielded strictly in
+    order as each becomes ready. The first audio is available after about
+    one sentence of synthesis time instead of the whole text.
+    """
+
+    def __init__(self, synthesize: Synthesizer, max_workers: Optional[int] = None,
+                 lookahead: Optional[int] = None):
+        """
+        Initialize streaming TTS
+
+        Args:
+            synthesize: Produces an audio file for one segment (e.g. SpeechProcessor.text_to_speech)
+            max_workers: Concurrent synthesis calls across all streams (default: TTS_STREAM_WORKERS or 4)
+            lookahead: Segments synthesized ahead of delivery per stream (default: TTS_STREAM_LOOKAHEAD or 3)
+        """
+        self.synthesize = synthesize
+        self.max_workers = max_workers or int(os.getenv('TTS_STREAM_WORKERS', 4))
+        self.lookahead = max(1, lookahead or int(os.getenv('TTS_STREAM_LOOKAHEAD', 3)))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='tts-stream')
+
+    def _synthesize_bytes(self, segment: str, lang: str, slow: bool) -> Optional[bytes]:
+        path = self.synthesize(segment, lang, slow)
+        if not path:
+            return None
+        with open(path, 'rb') as audio_file:
+            return audio_file.read()
+
+    def stream(self, text: str, lang: str = 'en', slow: bool = False) -> Iterator[bytes]:
+        """
+        Synthesize text, yielding each segment's audio in order
+
+        MP3 segments can be concatenated and played as one stream. A segment
+        that fails to synthesize is skipped so playback continues.
+
+        Args:
+            text: Text to speak
+            lang: Language code
+            slow: Whether to speak slowly
+
+        Yields:
+            Encoded audio for consecutive segments
+
+        Raises:
+            TTSStreamError: If every segment failed
+        """
+        segments = deque(split_sentences(text))
+        logger.info(f"Streaming TTS for {len(segments)} segments")
+
+        in_flight = deque()
+        delivered = False
+        try:
+            while segments or in_flight:
+                while segments and len(in_flight) < self.lookahead:
+                    in_flight.append(self._executor.submit(self._synthesize_bytes, segments.popleft(), lang, slow))
+
+                try:
+                    audio = in_flight.popleft().result()
+                except Exception as e:
+                    logger.error(f"TTS segment failed: {str(e)}")
+                    continue
+                if audio:
+                    delivered = True
+                    yield audio
+
+            if not delivered:
+                raise TTSStreamError("No segment could be synthesized")
+        finally:
+            # Client went away: don't synthesize segments nobody will hear
+            for future in in_flight:
+                future.cancel()
+
+    def start(self, text: str, lang: str = 'en', slow: bool = False) -> Iterator[bytes]:
+        """
+        Start a stream, waiting for its first segment
+
+        Call before sending response headers: a text that cannot be spoken
+        at all is reported as an error instead of an empty audio response.
+
+        Args:
+            text: Text to speak
+            lang: Language code
+            slow: Whether to speak slowly
+
+        Returns:
+            Iterator of encoded audio for consecutive segments
+
+        Raises:
+            TTSStreamError: If every segment failed
+        """
+        audio = self.stream(text, lang, slow)
+        first = next(audio)
+
+        def resume() -> Iterator[bytes]:
+            try:
+                yield first
+                yield from audio
+            finally:
+                audio.close()
+
+        return resume()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
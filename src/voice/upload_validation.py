@@ -0,0 +1,55 @@
+"""
+Upload Validation
+Size limits enforced while an audio upload is being read
+"""
+
+import os
+from typing import BinaryIO, Optional
+
+# Bytes read from the upload stream per step
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Default cap on a single audio upload
+DEFAULT_MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the size limit"""
+
+    def __init__(self, limit: int):
+        super().__init__(f"Upload exceeds {limit} bytes")
+        self.limit = limit
+
+
+def max_upload_bytes() -> int:
+    """Audio upload size limit (AUDIO_MAX_BYTES or 10MB)"""
+    return int(os.getenv('AUDIO_MAX_BYTES', DEFAULT_MAX_UPLOAD_BYTES))
+
+
+def read_upload(stream: BinaryIO, max_bytes: Optional[int] = None) -> bytes:
+    """
+    Read an uploaded file, stopping as soon as it exceeds the limit
+
+    Werkzeug already spools large multipart file parts to a temporary file,
+    so reading in chunks with a running total keeps an oversized upload from
+    ever being held in memory as a whole.
+
+    Args:
+        stream: Uploaded file stream (e.g. FileStorage.stream)
+        max_bytes: Size limit (default: AUDIO_MAX_BYTES or 10MB)
+
+    Returns:
+        Upload contents
+
+    Raises:
+        UploadTooLargeError: If the upload is larger than the limit
+    """
+    max_bytes = max_bytes or max_upload_bytes()
+    buffer = bytearray()
+    while True:
+        chunk = stream.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            return bytes(buffer)
+        if len(buffer) + len(chunk) > max_bytes:
+            raise UploadTooLargeError(max_bytes)
+        buffer += chunk
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for the NumPy voice activity detection helpers
+"""
+
+import numpy as np
+
+from src.voice.audio_analysis import (
+    FRAME_MS, estimate_energy_threshold, frame_rms, speech_bounds, speech_frames, zero_crossing_rate
+)
+
+SAMPLE_RATE = 16000
+
+
+def detect(samples: np.ndarray):
+    """Run the same steps as SpeechProcessor._trim_silence"""
+    samples = samples.astype('<i2')
+    energies = frame_rms(samples, SAMPLE_RATE)
+    threshold = estimate_energy_threshold(energies)
+    is_speech = speech_frames(energies, zero_crossing_rate(samples, SAMPLE_RATE), threshold)
+    frame_length = SAMPLE_RATE * FRAME_MS // 1000
+    return speech_bounds(is_speech, frame_length, len(samples))
+
+
+def tone(seconds: float, frequency: float = 220.0, amplitude: float = 8000.0) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return amplitude * np.sin(2 * np.pi * frequency * t)
+
+
+def test_steady_tone_is_speech():
+    assert detect(tone(2.0)) is not None
+
+
+def test_modulated_signal_is_speech():
+    t = np.arange(2 * SAMPLE_RATE) / SAMPLE_RATE
+    envelope = 1 + 0.3 * np.sin(2 * np.pi * 4 * t)
+    assert detect(tone(2.0) * envelope) is not None
+
+
+def test_quiet_noise_is_not_speech():
+    noise = np.random.default_rng(0).normal(0, 40, 2 * SAMPLE_RATE)
+    assert detect(noise) is None
+
+
+def test_digital_silence_is_not_speech():
+    assert detect(np.zeros(SAMPLE_RATE)) is None
+
+
+def test_speech_between_pauses_is_trimmed():
+    rng = np.random.default_rng(1)
+    silence = rng.normal(0, 40, SAMPLE_RATE)
+    samples = np.concatenate((silence, tone(1.0), silence))
+
+    start, end = detect(samples)
+    assert 0 < start < SAMPLE_RATE
+    assert 2 * SAMPLE_RATE < end < len(samples)
+
+
+def test_threshold_caps_noise_floor():
+    loud = np.full(100, 5000.0)
+    assert estimate_energy_threshold(loud, ratio=1.5, max_noise_floor=300) == 450
+    quiet = np.full(100, 100.0)
+    assert estimate_energy_threshold(quiet, ratio=1.5) == 150
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests for reading WAV uploads without ffmpeg
+"""
+
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from src.voice.audio_decoder import AudioTooLongError, parse_wav_header, wav_to_pcm
+
+
+def make_wav(samples: np.ndarray, sample_rate: int = 16000, channels: int = 1) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(samples.astype('<i2').tobytes())
+    return buffer.getvalue()
+
+
+def test_target_format_is_returned_without_copy():
+    samples = np.arange(1600, dtype='<i2')
+    pcm = wav_to_pcm(make_wav(samples))
+    assert isinstance(pcm, memoryview)
+    assert bytes(pcm) == samples.tobytes()
+
+
+def test_stereo_48k_is_downmixed_and_resampled():
+    stereo = np.zeros((4800, 2), dtype='<i2')
+    pcm = wav_to_pcm(make_wav(stereo.reshape(-1), sample_rate=48000, channels=2))
+    assert len(pcm) == 1600 * 2
+
+
+def test_too_long_is_rejected_from_header():
+    with pytest.raises(AudioTooLongError):
+        wav_to_pcm(make_wav(np.zeros(32000)), max_duration=1)
+
+
+def test_not_a_wav():
+    assert parse_wav_header(b'OggS' + b'\0' * 40) is None
+    assert wav_to_pcm(b'') is None
+
+
+@pytest.mark.parametrize('cut', [14, 20, 24, 30, 35])
+def test_truncated_fmt_chunk_falls_back(cut):
+    data = make_wav(np.zeros(100))
+    assert parse_wav_header(data[:cut]) is None
+    assert wav_to_pcm(data[:cut]) is None
+
+
+def test_chunk_size_past_end_falls_back():
+    data = bytearray(make_wav(np.zeros(100)))
+    # fmt chunk claiming far more bytes than the file holds
+    data[16:20] = (1 << 30).to_bytes(4, 'little')
+    assert parse_wav_header(bytes(data)) is None
+
+
+def test_extensible_fmt_truncated_falls_back():
+    header = b'RIFF' + (100).to_bytes(4, 'little') + b'WAVE'
+    fmt = b'fmt ' + (40).to_bytes(4, 'little') + (0xFFFE).to_bytes(2, 'little') + b'\x01\x00' + b'\0' * 12
+    assert parse_wav_header(header + fmt) is None
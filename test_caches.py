@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for the response and TTL caches
+"""
+
+import time
+
+import pytest
+
+from src.api.response_cache import (
+    MemoryResponseCache, ResponseCache, SQLiteResponseCache, make_cache_key
+)
+from src.utils.ttl_cache import TTLCache
+
+
+def test_ttl_cache_expires_and_evicts():
+    cache = TTLCache(max_entries=2, ttl=0.05)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.set('c', 3)
+    assert cache.get('a') is None
+    assert cache.get('c') == 3
+
+    time.sleep(0.06)
+    assert cache.get('c') is None
+
+
+def test_cache_key_normalizes_input():
+    params = {'max_output_tokens': 10}
+    assert make_cache_key("Hello!", "ctx", params) == make_cache_key("  hello ", "ctx", params)
+    assert make_cache_key("Hello", "ctx", params) != make_cache_key("Hello", "other", params)
+
+
+@pytest.mark.parametrize('kind', ['memory', 'sqlite'])
+def test_response_cache_counts_hits(kind, tmp_path):
+    if kind == 'memory':
+        cache = MemoryResponseCache(max_entries=8, ttl=60)
+    else:
+        cache = SQLiteResponseCache(str(tmp_path / 'cache.db'), max_entries=8, ttl=60)
+
+    assert cache.get('k') is None
+    cache.set('k', 'reply')
+    assert cache.get('k') == 'reply'
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+    cache.clear()
+    assert cache.get('k') is None
+
+
+def test_sqlite_cache_evicts_in_batches(tmp_path):
+    cache = SQLiteResponseCache(str(tmp_path / 'cache.db'), max_entries=2, ttl=0, evict_interval=3)
+    for index in range(3):
+        cache.set(f'k{index}', 'reply')
+        time.sleep(0.001)
+    assert cache.stats()['entries'] == 2
+    assert cache.get('k0') is None
+
+    cache.set('k3', 'reply')
+    assert cache.stats()['entries'] == 3
+
+
+def test_response_cache_base_is_abstract():
+    with pytest.raises(TypeError):
+        ResponseCache()
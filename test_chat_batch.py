@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests for chat batch item validation and session resolution
+"""
+
+import uuid
+
+import pytest
+
+from src.api.batch import BatchSessionResolver, parse_parallelism, prepare_batch_items
+
+
+class FakeSession:
+    def __init__(self, session_id: str):
+        self.id = session_id
+
+
+class FakeDatabaseManager:
+    """Stands in for DatabaseManager's session lookups"""
+
+    def __init__(self, existing=()):
+        self.sessions = {session_id: FakeSession(session_id) for session_id in existing}
+
+    def get_session(self, session_id):
+        return self.sessions.get(session_id)
+
+    def create_session(self):
+        chat_session = FakeSession(str(uuid.uuid4()))
+        self.sessions[chat_session.id] = chat_session
+        return chat_session
+
+
+def make_resolver(db, owned=('mine',)):
+    return BatchSessionResolver(db, owned, lambda: 'mine')
+
+
+def test_items_without_session_use_callers_session():
+    db = FakeDatabaseManager(['mine'])
+    results, pending = prepare_batch_items([{'message': 'hi'}], make_resolver(db))
+    assert results == [None]
+    assert pending[0].session_id == 'mine'
+
+
+def test_other_users_session_is_refused():
+    db = FakeDatabaseManager(['mine', 'theirs'])
+    results, pending = prepare_batch_items([{'message': 'hi', 'session_id': 'theirs'}], make_resolver(db))
+    assert results[0]['error'] == 'Unknown session_id'
+    assert pending == []
+
+
+def test_unknown_id_creates_one_session_per_label():
+    db = FakeDatabaseManager(['mine'])
+    resolver = make_resolver(db)
+    items = [
+        {'message': 'one', 'session_id': 'a'},
+        {'message': 'two', 'session_id': 'b'},
+        {'message': 'three', 'session_id': 'a'},
+    ]
+    results, pending = prepare_batch_items(items, resolver)
+
+    assert results == [None, None, None]
+    assert pending[0].session_id == pending[2].session_id != pending[1].session_id
+    assert pending[0].session_id in db.sessions
+    assert len(resolver.created) == 2
+
+
+def test_created_session_can_be_reused_by_owner():
+    db = FakeDatabaseManager(['mine'])
+    first = make_resolver(db)
+    _, pending = prepare_batch_items([{'message': 'one', 'session_id': 'a'}], first)
+
+    second = make_resolver(db, owned=['mine'] + first.created)
+    results, again = prepare_batch_items([{'message': 'two', 'session_id': pending[0].session_id}], second)
+    assert results == [None]
+    assert again[0].session_id == pending[0].session_id
+    assert second.created == []
+
+
+@pytest.mark.parametrize('session_id', ['x' * 37, 42, ['a']])
+def test_invalid_session_id_is_a_per_item_error(session_id):
+    db = FakeDatabaseManager(['mine'])
+    items = [{'message': 'bad', 'session_id': session_id}, {'message': 'good'}]
+    results, pending = prepare_batch_items(items, make_resolver(db))
+    assert 'error' in results[0]
+    assert [item.index for item in pending] == [1]
+
+
+def test_empty_message_is_a_per_item_error():
+    db = FakeDatabaseManager(['mine'])
+    results, pending = prepare_batch_items([{'message': '  '}, 'not an object'], make_resolver(db))
+    assert results[0]['error'] == 'Message is required'
+    assert results[1]['error'] == 'Message is required'
+    assert pending == []
+
+
+def test_overlong_message_is_a_per_item_error():
+    db = FakeDatabaseManager(['mine'])
+    items = [{'message': 'x' * 1001}, {'message': 'x' * 1000}]
+    results, pending = prepare_batch_items(items, make_resolver(db))
+    assert results[0]['error'] == 'Message too long (max 1000 characters)'
+    assert [item.index for item in pending] == [1]
+
+
+def test_parse_parallelism():
+    assert parse_parallelism(None, 8, 32) == 8
+    assert parse_parallelism('4', 8, 32) == 4
+    assert parse_parallelism(100, 8, 32) == 32
+    assert parse_parallelism(0, 8, 32) == 1
+    for value in ('abc', 1.5, True, {}):
+        with pytest.raises(ValueError):
+            parse_parallelism(value, 8, 32)
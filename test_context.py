@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Tests for the conversation context store and the context builder
+"""
+
+import asyncio
+
+from src.api.context_builder import ContextBuilder
+from src.api.context_store import ConversationContextStore
+
+
+def make_store(**kwargs) -> ConversationContextStore:
+    options = dict(max_turns=10, max_sessions=100, max_bytes=1024 * 1024, idle_timeout=3600)
+    options.update(kwargs)
+    return ConversationContextStore(**options)
+
+
+def test_ring_buffer_keeps_newest_turns():
+    store = make_store(max_turns=3)
+    for index in range(5):
+        store.append('a', 'User', f"message {index}")
+
+    assert [text for _, text in store.get_turns('a')] == ['message 2', 'message 3', 'message 4']
+    assert store.get_turns('a', limit=1) == [('User', 'message 4')]
+
+
+def test_clear_releases_bytes():
+    store = make_store()
+    store.append('a', 'User', 'hello')
+    store.clear('a')
+
+    assert store.get_turns('a') == []
+    assert store.stats()['bytes'] == 0
+
+
+def test_least_recently_used_session_is_evicted():
+    store = make_store(max_sessions=2)
+    store.append('a', 'User', 'one')
+    store.append('b', 'User', 'two')
+    store.get_turns('a')
+    store.append('c', 'User', 'three')
+
+    assert store.get_turns('b') == []
+    assert store.get_turns('a') == [('User', 'one')]
+    assert store.stats()['evictions'] == 1
+
+
+def test_byte_cap_evicts_other_sessions():
+    store = make_store(max_bytes=300)
+    store.append('a', 'User', 'x' * 100)
+    store.append('b', 'User', 'y' * 100)
+
+    assert store.get_turns('a') == []
+    assert store.stats()['sessions'] == 1
+
+
+def test_fold_replaces_oldest_turns():
+    store = make_store()
+    for index in range(4):
+        store.append('a', 'User', f"message {index}")
+    _, _, turns = store.get_snapshot('a')
+
+    assert store.fold('a', turns[:2], 'summary')
+    _, summary, remaining = store.get_snapshot('a')
+    assert summary == 'summary'
+    assert remaining == turns[2:]
+
+    # A summary of turns that are no longer the oldest is discarded
+    assert not store.fold('a', turns[:2], 'stale')
+
+
+def test_build_keeps_newest_turns_within_budget():
+    store = make_store()
+    for index in range(6):
+        store.append('a', 'User', f"message {index} " + 'x' * 40)
+    context = ContextBuilder(store, token_budget=40).build('a')
+
+    assert 'message 5' in context
+    assert 'message 0' not in context
+
+
+def test_fold_moves_turns_into_summary():
+    store = make_store()
+    builder = ContextBuilder(store, token_budget=1500, fold_chunk_turns=2)
+    for index in range(3):
+        store.append('a', 'User', f"message {index}")
+
+    async def summarize(previous, turns):
+        return f"{previous or ''}{len(turns)} turns"
+
+    assert asyncio.run(builder.fold('a', summarize))
+    context = builder.build('a')
+    assert '2 turns' in context
+    assert 'message 0' not in context
+    assert 'message 2' in context
+
+
+def test_cached_summary_is_not_reused_after_clear():
+    store = make_store()
+    builder = ContextBuilder(store)
+    store.append('a', 'User', 'first conversation')
+    _, key = builder.get_cached_summary('a')
+    builder.cache_summary(key, 'about the first conversation')
+
+    store.clear('a')
+    store.append('a', 'User', 'second conversation')
+    cached, _ = builder.get_cached_summary('a')
+    assert cached is None
+
+
+def test_cached_summary_is_not_reused_after_eviction():
+    store = make_store(max_sessions=1)
+    builder = ContextBuilder(store)
+    store.append('a', 'User', 'first conversation')
+    _, key = builder.get_cached_summary('a')
+    builder.cache_summary(key, 'about the first conversation')
+
+    store.append('b', 'User', 'pushes a out')
+    store.append('a', 'User', 'another conversation')
+    cached, _ = builder.get_cached_summary('a')
+    assert cached is None
+
+
+def test_cached_summary_follows_fold():
+    store = make_store()
+    builder = ContextBuilder(store, fold_chunk_turns=1)
+    store.append('a', 'User', 'one')
+    store.append('a', 'Assistant', 'two')
+    _, key = builder.get_cached_summary('a')
+    builder.cache_summary(key, 'before the fold')
+
+    async def summarize(previous, turns):
+        return 'folded'
+
+    assert asyncio.run(builder.fold('a', summarize))
+    cached, _ = builder.get_cached_summary('a')
+    assert cached is None
+
+    # The same content hits the cache again
+    _, key = builder.get_cached_summary('a')
+    builder.cache_summary(key, 'after the fold')
+    assert builder.get_cached_summary('a')[0] == 'after the fold'
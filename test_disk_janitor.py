@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for the generated-audio janitor
+"""
+
+import os
+import time
+
+from src.utils.disk_janitor import DirectoryPolicy, DiskJanitor, sharded_path
+from src.voice.tts_cache import TTSCache
+
+
+def write(path: str, size: int, age: float = 0.0):
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+
+
+def test_age_then_size_budget(tmp_path):
+    audio = str(tmp_path / 'audio')
+    for index in range(5):
+        write(sharded_path(audio, f'tts_output_{index}.mp3'), 1000, age=index * 100)
+
+    policy = DirectoryPolicy(audio, max_age=350, max_bytes=2500, pattern='tts_output_*')
+    janitor = DiskJanitor([policy], lock_path=str(tmp_path / 'janitor.lock'))
+    janitor.sweep()
+
+    # The 400s-old file goes for age, the next oldest for size
+    assert policy.files == 2
+    assert policy.bytes == 2000
+    assert policy.files_deleted == 3
+    assert policy.bytes_reclaimed == 3000
+
+
+def test_tts_cache_files_are_left_alone(tmp_path):
+    audio = str(tmp_path / 'audio')
+    cache = TTSCache(directory=audio, max_bytes=10 ** 6)
+    cached = cache.get_or_create('ab' * 20, lambda path: write(path, 1000))
+    os.utime(cached, (1, 1))
+    write(sharded_path(audio, 'tts_output_old.mp3'), 1000, age=10 ** 6)
+
+    policy = DirectoryPolicy(audio, max_age=60, max_bytes=1, pattern='tts_output_*')
+    DiskJanitor([policy], lock_path=str(tmp_path / 'janitor.lock')).sweep()
+
+    assert os.path.exists(cached)
+    assert policy.files_deleted == 1
+
+
+def test_only_one_process_sweeps(tmp_path):
+    lock_path = str(tmp_path / 'janitor.lock')
+    first = DiskJanitor([], lock_path=lock_path)
+    second = DiskJanitor([], lock_path=lock_path)
+
+    assert first._acquire_leadership()
+    # flock is per open file, so a second janitor in this process stands in for another worker
+    assert not second._acquire_leadership()
+
+    first.stop()
+    assert second._acquire_leadership()
+    second.stop()
+
+
+def test_temp_pattern(tmp_path):
+    temp = str(tmp_path / 'audio_files')
+    os.makedirs(temp)
+    write(os.path.join(temp, 'temp_1.wav'), 10, age=3600)
+    write(os.path.join(temp, 'keep.wav'), 10, age=3600)
+
+    DiskJanitor([DirectoryPolicy(temp, max_age=60, pattern='temp_*')], lock_path=str(tmp_path / 'l')).sweep()
+    assert os.listdir(temp) == ['keep.wav']
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for the Gemini client using the offline stub backend
+"""
+
+import pytest
+
+from src.api.backends import LLMBackendError, StubBackend
+from src.api.gemini_client import ERROR_RESPONSE, GeminiClient
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv('LLM_BACKEND', 'stub')
+    monkeypatch.setenv('STUB_LATENCY_MS', '1')
+    monkeypatch.setenv('STUB_LATENCY_DISTRIBUTION', 'fixed')
+    monkeypatch.setenv('STUB_TOKENS_PER_SECOND', '10000')
+    monkeypatch.setenv('RESPONSE_CACHE', 'memory')
+    gemini_client = GeminiClient()
+    yield gemini_client
+    gemini_client.close()
+
+
+def test_stats_report_cache_and_coalescing(client):
+    first = client.get_response("hello", session_id='a')
+    client.clear_conversation('a')
+    second = client.get_response("hello", session_id='a')
+    assert first == second
+
+    stats = client.get_stats()
+    assert stats['response_cache']['enabled'] is True
+    assert stats['response_cache']['hits'] == 1
+    assert stats['coalescing']['upstream_calls'] == 1
+    assert stats['resilience']['circuit']['state'] == 'closed'
+    assert stats['native_chat'] == {'enabled': False}
+
+
+class FailingStreamBackend(StubBackend):
+    """Stub backend whose streams break after a few chunks"""
+
+    def __init__(self, fail_after: int):
+        super().__init__(latency_ms=0, distribution='fixed', tokens_per_second=10000)
+        self.fail_after = fail_after
+
+    async def stream(self, prompt, params):
+        sent = 0
+        async for chunk in super().stream(prompt, params):
+            if sent == self.fail_after:
+                raise LLMBackendError("connection reset")
+            sent += 1
+            yield chunk
+
+
+def test_mid_stream_failure_reaches_consumer(client):
+    client.async_client.backend = FailingStreamBackend(fail_after=3)
+
+    received = []
+    with pytest.raises(LLMBackendError):
+        for chunk in client.stream_response("tell me a story", session_id='s'):
+            received.append(chunk)
+
+    assert len(received) == 3
+    assert ERROR_RESPONSE not in received
+    assert client.get_conversation_history('s') == []
+    assert client.get_cache_stats()['entries'] == 0
+
+
+def test_failure_before_first_chunk_yields_error_reply(client):
+    client.async_client.backend = FailingStreamBackend(fail_after=0)
+    assert list(client.stream_response("hello", session_id='s')) == [ERROR_RESPONSE]
+
+
+def test_batch_keeps_item_order(client):
+    replies = client.get_responses_batch([('a', 'one'), ('b', 'two'), ('a', 'three')])
+    assert len(replies) == 3
+    assert 'one' in replies[0] and 'two' in replies[1] and 'three' in replies[2]
+
+
+def test_backend_bases_are_abstract():
+    from src.api.backends import LLMBackend, LLMChat
+
+    with pytest.raises(TypeError):
+        LLMBackend()
+    with pytest.raises(TypeError):
+        LLMChat()
+
+
+def test_sqlite_response_cache_is_used_off_the_loop(monkeypatch, tmp_path):
+    monkeypatch.setenv('LLM_BACKEND', 'stub')
+    monkeypatch.setenv('STUB_LATENCY_MS', '1')
+    monkeypatch.setenv('RESPONSE_CACHE', 'sqlite')
+    monkeypatch.setenv('RESPONSE_CACHE_PATH', str(tmp_path / 'cache.db'))
+    gemini_client = GeminiClient()
+    try:
+        first = gemini_client.get_response("hello", session_id='a')
+        gemini_client.clear_conversation('a')
+        assert gemini_client.get_response("hello", session_id='a') == first
+        assert gemini_client.get_cache_stats()['hits'] == 1
+    finally:
+        gemini_client.close()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for native chat sessions behind the resilience layer
+"""
+
+import asyncio
+
+import pytest
+
+from src.api.backends import LLMBackendError, StubBackend, StubChat
+from src.api.context_store import ConversationContextStore
+from src.api.native_chat import NativeChatManager
+from src.api.resilience import ResilientCaller
+
+
+class SlowStubChat(StubChat):
+    """Counts sends and can fail after recording the turn"""
+
+    sends = 0
+    fail_after_recording = False
+
+    async def send(self, message, params):
+        SlowStubChat.sends += 1
+        reply = await super().send(message, params)
+        if SlowStubChat.fail_after_recording:
+            SlowStubChat.fail_after_recording = False
+            raise LLMBackendError("lost reply", retryable=True)
+        return reply
+
+
+class SlowStubBackend(StubBackend):
+    def start_chat(self, history):
+        return SlowStubChat(self, history)
+
+
+def make_manager():
+    SlowStubChat.sends = 0
+    backend = SlowStubBackend(latency_ms=50, distribution='fixed', tokens_per_second=1000, reply_tokens=5)
+    store = ConversationContextStore()
+    return NativeChatManager(backend, store), store
+
+
+def make_caller():
+    caller = ResilientCaller(deadline=5, max_retries=2, backoff_base=0.001, hedging=True)
+    # Recent calls were fast, so any normal attempt would be hedged
+    for _ in range(50):
+        caller.latency.record(0.001)
+    return caller
+
+
+def test_send_is_not_hedged():
+    async def scenario():
+        manager, store = make_manager()
+        caller = make_caller()
+        store.append('s', 'User', 'hello')
+        reply = await manager.send('s', 'hello', {}, caller.call)
+
+        assert reply
+        assert SlowStubChat.sends == 1
+        assert caller.hedges == 0
+        assert store.get_chat('s').chat.history_length() == 4
+
+    asyncio.run(scenario())
+
+
+def test_attempt_that_reached_chat_is_not_retried():
+    async def scenario():
+        manager, store = make_manager()
+        caller = make_caller()
+        store.append('s', 'User', 'hello')
+        SlowStubChat.fail_after_recording = True
+
+        with pytest.raises(LLMBackendError):
+            await manager.send('s', 'hello', {}, caller.call)
+        assert SlowStubChat.sends == 1
+        assert store.get_chat('s').chat.history_length() == 4
+
+    asyncio.run(scenario())
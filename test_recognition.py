@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Tests for the sequential, parallel and hedged recognition policies
+"""
+
+import threading
+import time
+
+import pytest
+
+sr = pytest.importorskip('speech_recognition')
+
+from src.voice.recognition import RecognitionStrategy
+
+
+class FakeCandidate:
+    """Recognition attempt that answers after a delay and records when it ran"""
+
+    def __init__(self, name, text=None, delay=0.0, error=None):
+        self.name = name
+        self.text = text
+        self.delay = delay
+        self.error = error
+        self.started_at = None
+        self.finished = threading.Event()
+
+    def __call__(self):
+        self.started_at = time.monotonic()
+        try:
+            time.sleep(self.delay)
+            if self.error:
+                raise self.error
+            return self.text
+        finally:
+            self.finished.set()
+
+    @property
+    def candidate(self):
+        return (self.name, self)
+
+
+def run(strategy, fakes):
+    started = time.monotonic()
+    try:
+        return strategy.run([fake.candidate for fake in fakes]), started
+    finally:
+        strategy.shutdown()
+
+
+def test_sequential_follows_preference_order():
+    fakes = [
+        FakeCandidate('google', error=sr.UnknownValueError()),
+        FakeCandidate('sphinx', text=' hello '),
+        FakeCandidate('other', text='unused'),
+    ]
+    strategy = RecognitionStrategy(policy='sequential')
+    text, _ = run(strategy, fakes)
+
+    assert text == 'hello'
+    assert fakes[2].started_at is None
+    assert strategy.stats()['attempts'] == 2
+    assert strategy.stats()['wins'] == {'sphinx': 1}
+
+
+def test_every_candidate_failing_returns_none():
+    fakes = [FakeCandidate('google', text='  '), FakeCandidate('sphinx', error=sr.RequestError('down'))]
+    for policy in ('sequential', 'parallel', 'hedged'):
+        strategy = RecognitionStrategy(policy=policy, hedge_delay=0.01)
+        assert run(strategy, fakes)[0] is None
+
+
+def test_parallel_starts_all_and_ignores_slow_losers():
+    slow = FakeCandidate('google', text='slow', delay=0.3)
+    fast = FakeCandidate('sphinx', text='fast')
+    strategy = RecognitionStrategy(policy='parallel', max_workers=4)
+    text, _ = run(strategy, [slow, fast])
+
+    assert text == 'fast'
+    assert slow.started_at is not None
+    slow.finished.wait(1)
+    assert strategy.stats()['wins'] == {'sphinx': 1}
+
+
+def test_hedged_waits_for_the_preferred_candidate():
+    first = FakeCandidate('google', text='first', delay=0.01)
+    second = FakeCandidate('sphinx', text='second')
+    text, _ = run(RecognitionStrategy(policy='hedged', hedge_delay=0.5), [first, second])
+
+    assert text == 'first'
+    assert second.started_at is None
+
+
+def test_hedged_starts_next_candidate_after_the_delay():
+    slow = FakeCandidate('google', text='slow', delay=0.5)
+    backup = FakeCandidate('sphinx', text='backup')
+    strategy = RecognitionStrategy(policy='hedged', hedge_delay=0.05)
+    text, started = run(strategy, [slow, backup])
+
+    assert text == 'backup'
+    assert backup.started_at - started >= 0.05
+    assert strategy.stats()['attempts'] == 2
+
+
+def test_hedged_moves_on_immediately_after_a_failure():
+    failing = FakeCandidate('google', error=sr.UnknownValueError())
+    backup = FakeCandidate('sphinx', text='backup')
+    text, started = run(RecognitionStrategy(policy='hedged', hedge_delay=5), [failing, backup])
+
+    assert text == 'backup'
+    assert backup.started_at - started < 1
+
+
+def test_queued_losers_are_cancelled():
+    winner = FakeCandidate('google', text='winner', delay=0.05)
+    blocked = [FakeCandidate(f'queued{index}', text='late') for index in range(3)]
+    strategy = RecognitionStrategy(policy='parallel', max_workers=1)
+    text, _ = run(strategy, [winner] + blocked)
+
+    assert text == 'winner'
+    # The worker may pick up the next attempt before it is cancelled, but no more
+    assert sum(fake.started_at is not None for fake in blocked) <= 1
+    assert strategy.stats()['wins'] == {'google': 1}
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        RecognitionStrategy(policy='fastest')
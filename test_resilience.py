@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for the circuit breaker and its use by the Gemini client
+"""
+
+import asyncio
+
+import pytest
+
+from src.api.backends import StubBackend
+from src.api.gemini_client import AsyncGeminiClient, ERROR_RESPONSE
+from src.api.resilience import CircuitBreaker, CircuitOpenError, ResilientCaller
+
+
+def half_open_breaker() -> CircuitBreaker:
+    """A breaker whose cooldown has just expired"""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    breaker._opened_at -= 31
+    return breaker
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_half_open_allows_one_trial():
+    breaker = half_open_breaker()
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_released_trial_lets_next_call_through():
+    breaker = half_open_breaker()
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_stale_trial_expires():
+    breaker = half_open_breaker()
+    assert breaker.allow()
+    breaker._trial_started_at -= 31
+    assert breaker.allow()
+
+
+def test_cancelled_call_releases_trial():
+    async def scenario():
+        caller = ResilientCaller(deadline=5, max_retries=0, hedging=False, breaker=half_open_breaker())
+        task = asyncio.ensure_future(caller.call(lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert await caller.call(lambda: asyncio.sleep(0, result='ok')) == 'ok'
+        assert caller.breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_open_circuit_fails_fast():
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        breaker.record_failure()
+        caller = ResilientCaller(deadline=5, hedging=False, breaker=breaker)
+        with pytest.raises(CircuitOpenError):
+            await caller.call(lambda: asyncio.sleep(0, result='ok'))
+
+    asyncio.run(scenario())
+
+
+def test_abandoned_stream_releases_trial():
+    async def scenario():
+        backend = StubBackend(latency_ms=0, distribution='fixed', tokens_per_second=1000, reply_tokens=20)
+        client = AsyncGeminiClient(backend=backend)
+        client.resilience.breaker = half_open_breaker()
+
+        stream = client.stream_response("hello", session_id='stream')
+        first = await stream.__anext__()
+        assert first != ERROR_RESPONSE
+        await stream.aclose()
+
+        reply = await client.get_response("hello again", session_id='after')
+        assert reply != ERROR_RESPONSE
+        assert client.resilience.breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
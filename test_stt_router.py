@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for routing recognition between the speech-to-text engines
+"""
+
+import pytest
+
+sr = pytest.importorskip('speech_recognition')
+
+from src.voice.recognition import RecognitionStrategy
+from src.voice.stt_backends import STTRouter
+
+SAMPLE_RATE = 16000
+
+
+class FakeRecognizer:
+    """Answers for each engine; None means the engine does not understand the audio"""
+
+    def __init__(self, google=None, sphinx=None):
+        self.replies = {'google': google, 'sphinx': sphinx}
+        self.calls = []
+
+    def _reply(self, engine):
+        self.calls.append(engine)
+        if self.replies[engine] is None:
+            raise sr.UnknownValueError()
+        return self.replies[engine]
+
+    def recognize_google(self, audio_data, language=None):
+        return self._reply('google')
+
+    def recognize_sphinx(self, audio_data, language=None):
+        return self._reply('sphinx')
+
+
+def make_router(recognizer, sphinx_available=True, **kwargs):
+    router = STTRouter(recognizer, RecognitionStrategy(policy='sequential'), **kwargs)
+    router.backends['sphinx']._available = sphinx_available
+    return router
+
+
+def clip(seconds):
+    return sr.AudioData(b'\x00\x00' * int(SAMPLE_RATE * seconds), SAMPLE_RATE, 2)
+
+
+def test_auto_routes_short_clips_local_first():
+    router = make_router(FakeRecognizer(), routing='auto', local_max_seconds=4)
+    assert router.resolve(None, 4.0) == 'local_first'
+    assert router.resolve(None, 4.1) == 'remote'
+    assert router.resolve('remote_first', 1.0) == 'remote_first'
+
+
+def test_auto_picks_engine_by_duration():
+    recognizer = FakeRecognizer(google='long clip', sphinx='short clip')
+    router = make_router(recognizer, routing='auto', local_max_seconds=2)
+
+    assert router.recognize(clip(1)) == 'short clip'
+    assert router.recognize(clip(3)) == 'long clip'
+    assert recognizer.calls == ['sphinx', 'google']
+
+
+def test_unavailable_sphinx_is_skipped():
+    recognizer = FakeRecognizer(google='hello', sphinx='unused')
+    router = make_router(recognizer, sphinx_available=False)
+
+    assert [backend.name for backend in router.route('local_first', 1.0)] == ['google']
+    assert router.recognize(clip(1), routing='local_first') == 'hello'
+    assert router.recognize(clip(1), routing='local') is None
+    assert 'sphinx' not in recognizer.calls
+
+
+def test_falls_back_to_next_engine():
+    recognizer = FakeRecognizer(google='from google', sphinx=None)
+    router = make_router(recognizer)
+
+    assert router.recognize(clip(1), routing='local_first') == 'from google'
+    engines = router.stats()['engines']
+    assert engines['sphinx'] == {'local': True, 'requests': 1, 'successes': 0}
+    assert engines['google']['successes'] == 1
+
+
+def test_every_engine_failing_returns_none():
+    router = make_router(FakeRecognizer())
+    assert router.recognize(clip(1), routing='remote_first') is None
+
+
+def test_unknown_routing_is_rejected():
+    with pytest.raises(ValueError):
+        make_router(FakeRecognizer(), routing='fastest')
+    router = make_router(FakeRecognizer())
+    with pytest.raises(ValueError):
+        router.resolve('fastest', 1.0)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded transcoding pool
+"""
+
+import shutil
+import threading
+
+import pytest
+
+from src.voice.transcoder import Transcoder, TranscoderBusyError
+
+
+def test_runs_jobs():
+    transcoder = Transcoder(workers=2, queue_size=2)
+    assert transcoder.run(lambda x: x * 2, 21) == 42
+    assert transcoder.stats()['completed'] == 1
+    transcoder.shutdown()
+
+
+def test_rejects_when_queue_is_full():
+    transcoder = Transcoder(workers=1, queue_size=0)
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+
+    worker = threading.Thread(target=transcoder.run, args=(slow,))
+    worker.start()
+    started.wait(5)
+    with pytest.raises(TranscoderBusyError):
+        transcoder.run(lambda: None)
+    release.set()
+    worker.join()
+
+    assert transcoder.stats()['rejected'] == 1
+    transcoder.shutdown()
+
+
+def test_stream_slots_are_bounded():
+    transcoder = Transcoder(workers=2, queue_size=0, max_streams=2)
+    transcoder.acquire_stream()
+    transcoder.acquire_stream()
+    with pytest.raises(TranscoderBusyError):
+        transcoder.acquire_stream()
+
+    transcoder.release_stream()
+    transcoder.acquire_stream()
+
+    stats = transcoder.stats()
+    assert stats['streams'] == 2
+    assert stats['streams_rejected'] == 1
+    transcoder.shutdown()
+
+
+class FakeWebSocket:
+    def __init__(self, messages=()):
+        self.sent = []
+        self.closed_with = None
+        self.messages = list(messages)
+
+    def receive(self, timeout=None):
+        if self.messages:
+            return self.messages.pop(0)
+        return None
+
+    def send(self, message):
+        self.sent.append(message)
+
+    def close(self, reason=None, message=None):
+        self.closed_with = reason
+
+
+class FakeSpeechProcessor:
+    def __init__(self, transcoder):
+        self.transcoder = transcoder
+
+
+def test_excess_voice_stream_is_rejected():
+    from src.voice.streaming import serve_voice_stream
+
+    transcoder = Transcoder(workers=1, queue_size=0, max_streams=1)
+    transcoder.acquire_stream()
+
+    ws = FakeWebSocket()
+    serve_voice_stream(ws, FakeSpeechProcessor(transcoder))
+
+    assert '"retry_after"' in ws.sent[0]
+    assert ws.closed_with == 1013
+    assert transcoder.stats()['streams'] == 1
+    transcoder.shutdown()
+
+
+needs_ffmpeg = pytest.mark.skipif(shutil.which('ffmpeg') is None, reason="ffmpeg is not installed")
+
+
+@needs_ffmpeg
+def test_idle_voice_stream_is_closed(monkeypatch):
+    from src.voice.streaming import serve_voice_stream
+
+    monkeypatch.setenv('STREAM_POLL_MS', '1')
+    monkeypatch.setenv('STREAM_IDLE_SECONDS', '0.05')
+    transcoder = Transcoder(workers=1, queue_size=0, max_streams=1)
+
+    ws = FakeWebSocket()
+    serve_voice_stream(ws, FakeSpeechProcessor(transcoder))
+
+    assert 'idle' in ws.sent[-1]
+    assert ws.closed_with == 1008
+    assert transcoder.stats()['streams'] == 0
+    transcoder.shutdown()
+
+
+@needs_ffmpeg
+def test_voice_stream_session_length_is_capped(monkeypatch):
+    from src.voice.streaming import serve_voice_stream
+
+    monkeypatch.setenv('STREAM_POLL_MS', '1')
+    monkeypatch.setenv('STREAM_MAX_SESSION_SECONDS', '0')
+    transcoder = Transcoder(workers=1, queue_size=0, max_streams=1)
+
+    ws = FakeWebSocket([b'\x00' * 64])
+    serve_voice_stream(ws, FakeSpeechProcessor(transcoder))
+
+    assert 'maximum session length' in ws.sent[-1]
+    assert ws.closed_with == 1008
+    assert transcoder.stats()['streams'] == 0
+    transcoder.shutdown()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Tests for the transcription cache
+"""
+
+from src.voice.transcription_cache import TranscriptionCache
+
+
+def make_cache() -> TranscriptionCache:
+    return TranscriptionCache(max_entries=16, ttl=60)
+
+
+def test_transcript_is_served_by_both_keys():
+    cache = make_cache()
+    raw_key = cache.raw_key(b'upload', 'remote')
+    pcm_key = cache.pcm_key(b'pcm', 'remote')
+    cache.set({'text': 'hello', 'duration': 1.0, 'speech_detected': True}, raw_key, pcm_key)
+
+    assert cache.get_raw(raw_key)['text'] == 'hello'
+    assert cache.get_pcm(pcm_key)['cached'] is True
+    assert cache.stats()['raw_hits'] == 1
+
+
+def test_no_speech_result_is_not_cached():
+    cache = make_cache()
+    key = cache.raw_key(b'upload', 'remote')
+    cache.set({'text': None, 'duration': 1.0, 'speech_detected': False}, key)
+    assert cache.get_raw(key) is None
+
+
+def test_failed_recognition_is_not_cached():
+    cache = make_cache()
+    key = cache.raw_key(b'upload', 'remote')
+    cache.set({'text': None, 'duration': 1.0, 'speech_detected': True}, key)
+    assert cache.get_raw(key) is None
+
+
+def test_signature_separates_entries():
+    cache = make_cache()
+    cache.set({'text': 'hello'}, cache.raw_key(b'upload', 'remote'))
+    assert cache.get_raw(cache.raw_key(b'upload', 'local')) is None
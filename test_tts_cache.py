@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Tests for the synthesized speech cache
+"""
+
+import os
+
+from src.voice.tts_cache import TTSCache, tts_key
+
+
+def test_tts_cache_synthesizes_once(tmp_path):
+    cache = TTSCache(directory=str(tmp_path), max_bytes=10 ** 6)
+    calls = []
+
+    def synthesize(path):
+        calls.append(path)
+        with open(path, 'wb') as f:
+            f.write(b'mp3')
+
+    key = tts_key("hello", 'en', False, 'gtts')
+    first = cache.get_or_create(key, synthesize)
+    second = cache.get_or_create(key, synthesize)
+
+    assert first == second
+    assert len(calls) == 1
+    assert os.path.dirname(first) == os.path.join(str(tmp_path), key[:2])
+    assert cache.stats()['hits'] == 1
+
+
+def test_tts_cache_evicts_least_recently_used(tmp_path):
+    cache = TTSCache(directory=str(tmp_path), max_bytes=2500)
+
+    def synthesize(path):
+        with open(path, 'wb') as f:
+            f.write(b'x' * 1000)
+
+    keys = [tts_key(text, 'en', False, 'gtts') for text in ('one', 'two', 'three')]
+    for key in keys:
+        cache.get_or_create(key, synthesize)
+
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[2]) is not None
+    assert cache.stats()['evictions'] == 1
+
+
+def test_tts_cache_rebuilds_index(tmp_path):
+    cache = TTSCache(directory=str(tmp_path), max_bytes=10 ** 6)
+    key = tts_key("hello", 'en', False, 'gtts')
+    cache.get_or_create(key, lambda path: open(path, 'wb').write(b'mp3'))
+
+    reopened = TTSCache(directory=str(tmp_path), max_bytes=10 ** 6)
+    assert reopened.stats()['files'] == 1
+    assert reopened.get(key) is not None
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for sentence splitting and streaming text-to-speech
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.voice.tts_streaming import StreamingTTS, TTSStreamError, split_sentences
+
+
+def test_splits_at_sentence_boundaries():
+    text = "The weather is lovely today. Shall we go for a walk? I would like that a lot!"
+    assert split_sentences(text) == [
+        "The weather is lovely today.",
+        "Shall we go for a walk?",
+        "I would like that a lot!",
+    ]
+
+
+def test_short_sentences_are_merged():
+    assert split_sentences("Hi. Okay. This sentence is long enough to stand alone.") == [
+        "Hi. Okay. This sentence is long enough to stand alone."
+    ]
+    assert split_sentences("This sentence is long enough to stand alone. Bye.") == [
+        "This sentence is long enough to stand alone. Bye."
+    ]
+
+
+def test_long_sentences_are_split_under_the_limit(monkeypatch):
+    monkeypatch.setenv('TTS_SEGMENT_MAX_CHARS', '40')
+    text = "First clause with several words, second clause with more words, " + "word " * 20
+    segments = split_sentences(text)
+
+    assert len(segments) > 2
+    assert all(len(segment) <= 40 for segment in segments)
+    assert " ".join(segments).split() == text.split()
+
+
+class FakeSynthesizer:
+    """Writes each segment's text as its audio, after a delay that shrinks along the text"""
+
+    def __init__(self, tmp_path, fail=()):
+        self.tmp_path = tmp_path
+        self.fail = set(fail)
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, text, lang, slow):
+        with self._lock:
+            index = self.calls
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(0.05 / (index + 1))
+            if index in self.fail:
+                raise RuntimeError("synthesis failed")
+            path = self.tmp_path / f"segment_{index}.mp3"
+            path.write_text(text)
+            return str(path)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+SENTENCES = [f"This is sentence number {index} of the text." for index in range(6)]
+
+
+def test_segments_are_delivered_in_order(tmp_path):
+    synthesizer = FakeSynthesizer(tmp_path)
+    tts = StreamingTTS(synthesizer, max_workers=4, lookahead=2)
+    try:
+        audio = list(tts.start(" ".join(SENTENCES)))
+    finally:
+        tts.shutdown()
+
+    assert [chunk.decode() for chunk in audio] == SENTENCES
+    assert synthesizer.max_active <= 2
+
+
+def test_failed_segment_is_skipped(tmp_path):
+    tts = StreamingTTS(FakeSynthesizer(tmp_path, fail={1}), max_workers=2, lookahead=3)
+    try:
+        audio = list(tts.start(" ".join(SENTENCES[:3])))
+    finally:
+        tts.shutdown()
+
+    assert [chunk.decode() for chunk in audio] == [SENTENCES[0], SENTENCES[2]]
+
+
+def test_every_segment_failing_is_an_error(tmp_path):
+    tts = StreamingTTS(FakeSynthesizer(tmp_path, fail=range(3)), max_workers=2, lookahead=3)
+    try:
+        with pytest.raises(TTSStreamError):
+            tts.start(" ".join(SENTENCES[:3]))
+    finally:
+        tts.shutdown()
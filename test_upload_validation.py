@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Tests for audio upload size limits
+"""
+
+import io
+
+import pytest
+
+from src.voice.upload_validation import UPLOAD_CHUNK_SIZE, UploadTooLargeError, max_upload_bytes, read_upload
+
+
+def test_read_upload_stops_at_limit():
+    assert read_upload(io.BytesIO(b'x' * 100), max_bytes=100) == b'x' * 100
+    with pytest.raises(UploadTooLargeError):
+        read_upload(io.BytesIO(b'x' * 101), max_bytes=100)
+
+
+def test_read_upload_spans_chunks():
+    data = b'x' * (UPLOAD_CHUNK_SIZE * 2 + 1)
+    assert read_upload(io.BytesIO(data), max_bytes=len(data)) == data
+
+
+def test_limit_comes_from_environment(monkeypatch):
+    monkeypatch.setenv('AUDIO_MAX_BYTES', '1234')
+    assert max_upload_bytes() == 1234